@@ -0,0 +1,17 @@
+"""
+benchmarks
+Mediciones de rendimiento de negocio.py con datos sintéticos de ferretería.
+
+ - generador.py: catálogo e historial de ventas configurables (1k-500k productos, 10k-10M ventas,
+   rango de fechas, mezcla de formas de pago), escritos en streaming en data/ de un directorio.
+ - medicion.py: tiempos por llamada (percentiles, throughput) y pico de memoria (RSS) del proceso.
+ - ejecutar.py: corre cada función pública de negocio, guarda los resultados en JSON y los compara
+   con una base guardada para marcar regresiones.
+ - cajeros.py: prueba de carga de negocio_servidor.py con N cajas concurrentes (latencias,
+   tickets por segundo y cuadre de stock).
+
+Uso (desde la carpeta del proyecto):
+    python -m benchmarks --productos 10000 --ventas 200000 --salida resultados.json
+    python -m benchmarks --productos 10000 --ventas 200000 --base base.json
+    python -m benchmarks.cajeros --cajeros 8 --tickets 200
+"""
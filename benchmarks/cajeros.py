@@ -0,0 +1,165 @@
+"""
+Prueba de carga de negocio_servidor.py: N cajas concurrentes, cada una con su conexión, registran
+tickets y de vez en cuando consultan catálogo y reporte. Informa latencias por operación,
+tickets por segundo y comprueba al final que el stock vendido cuadra con las ventas.
+
+Sin --servidor genera datos sintéticos en una carpeta y arranca ahí su propio servidor.
+    python -m benchmarks.cajeros --cajeros 8 --tickets 200
+    python -m benchmarks.cajeros --servidor 127.0.0.1:8765 --cajeros 4
+"""
+
+import argparse
+import json
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import negocio_cliente
+from benchmarks import generador
+from benchmarks.medicion import resumir
+
+# de cada 100 operaciones de una caja: el resto son tickets
+CONSULTAS = {'buscar_productos': 10, 'listar_productos': 2, 'generar_reporte_ventas': 3,
+             'productos_mas_vendidos': 3, 'ultimas_ventas': 2}
+
+
+class _Caja(threading.Thread):
+    """Una caja: su propia conexión y sus propias latencias (sin locks compartidos al medir)."""
+
+    def __init__(self, numero, servidor, ids, tickets, semilla):
+        super().__init__(name=f'caja-{numero}', daemon=True)
+        self.cliente = negocio_cliente.Cliente(servidor)
+        self.ids = ids
+        self.tickets = tickets
+        self.rng = random.Random(semilla + numero)
+        self.tiempos = {}
+        self.vendidas = {}  # id_producto -> unidades de tickets aceptados
+        self.rechazados = 0
+        self.errores = 0
+
+    def _medir(self, op, *args):
+        t0 = time.perf_counter_ns()
+        try:
+            resultado = self.cliente.llamar(op, *args)
+        except negocio_cliente.ErrorServidor as e:
+            self.errores += 1
+            print(f"[cajeros] {self.name} {op}: {e}")
+            return None
+        self.tiempos.setdefault(op, []).append(time.perf_counter_ns() - t0)
+        return resultado
+
+    def run(self):
+        consultas, pesos = list(CONSULTAS), list(CONSULTAS.values())
+        hechos = 0
+        while hechos < self.tickets:
+            if self.rng.randrange(100) < sum(pesos):
+                op = self.rng.choices(consultas, weights=pesos)[0]
+                args = {'buscar_productos': ('tornillo',), 'ultimas_ventas': (50,)}.get(op, ())
+                self._medir(op, *args)
+                continue
+            lineas = [{'id_producto': self.rng.choice(self.ids), 'cantidad': self.rng.randint(1, 3)}
+                      for _ in range(self.rng.randint(1, 4))]
+            r = self._medir('registrar_venta_lote', lineas, 'Efectivo')
+            hechos += 1
+            if r and r.get('ok'):
+                for ln in lineas:
+                    self.vendidas[ln['id_producto']] = self.vendidas.get(ln['id_producto'], 0) + ln['cantidad']
+            elif r is not None:
+                self.rechazados += 1
+        self.cliente.cerrar()
+
+
+def _arrancar_servidor(directorio):
+    """negocio_servidor.py en `directorio` con un puerto libre; retorna (proceso, 'host:puerto')."""
+    script = Path(__file__).resolve().parent.parent / 'negocio_servidor.py'
+    proceso = subprocess.Popen([sys.executable, str(script), '--puerto', '0'], cwd=directorio,
+                               stdout=subprocess.PIPE, text=True)
+    for linea in proceso.stdout:
+        print(linea.rstrip())
+        if 'escuchando en' in linea:
+            # seguir mostrando (y vaciando) su salida: con el pipe lleno el servidor se bloquearía
+            threading.Thread(target=lambda: [print(l.rstrip()) for l in proceso.stdout], daemon=True).start()
+            return proceso, linea.split('escuchando en ')[1].split()[0]
+    raise RuntimeError('el servidor terminó sin empezar a escuchar')
+
+
+def correr(servidor, cajeros, tickets, semilla=1):
+    """Lanza las cajas contra `servidor` y retorna el dict de resultados."""
+    control = negocio_cliente.Cliente(servidor)
+    ids = [p['id'] for p in control.listar_productos()]
+    stock_antes = {p['id']: p['stock'] for p in control.listar_productos()}
+    cajas = [_Caja(k, servidor, ids, tickets, semilla) for k in range(cajeros)]
+    t0 = time.perf_counter()
+    for caja in cajas:
+        caja.start()
+    for caja in cajas:
+        caja.join()
+    duracion = time.perf_counter() - t0
+
+    tiempos, vendidas = {}, {}
+    for caja in cajas:
+        for op, ts in caja.tiempos.items():
+            tiempos.setdefault(op, []).extend(ts)
+        for pid, n in caja.vendidas.items():
+            vendidas[pid] = vendidas.get(pid, 0) + n
+    # cada unidad aceptada tiene que haber salido del stock, ni una más ni una menos
+    stock_despues = {p['id']: p['stock'] for p in control.listar_productos()}
+    descuadres = {pid: (stock_antes[pid] - stock_despues.get(pid, 0), n) for pid, n in vendidas.items()
+                  if stock_antes[pid] - stock_despues.get(pid, 0) != n}
+    control.cerrar()
+    tickets_ok = sum(len(c.tiempos.get('registrar_venta_lote', ())) for c in cajas) - sum(c.rechazados for c in cajas)
+    return {
+        'cajeros': cajeros,
+        'duracion_s': round(duracion, 2),
+        'tickets_s': round(tickets_ok / duracion, 1) if duracion > 0 else None,
+        'tickets_ok': tickets_ok,
+        'rechazados_sin_stock': sum(c.rechazados for c in cajas),
+        'errores': sum(c.errores for c in cajas),
+        'descuadres_stock': descuadres,
+        'operaciones': {op: resumir(ts) for op, ts in sorted(tiempos.items())},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.cajeros', description=__doc__.strip())
+    parser.add_argument('--servidor', help='host:puerto de un servidor ya corriendo')
+    parser.add_argument('--cajeros', type=int, default=8)
+    parser.add_argument('--tickets', type=int, default=200, help='tickets por caja')
+    parser.add_argument('--productos', type=int, default=2000, help='catálogo sintético (sin --servidor)')
+    parser.add_argument('--ventas', type=int, default=50_000, help='historial sintético (sin --servidor)')
+    parser.add_argument('--dir', help='carpeta para los datos sintéticos (por defecto una temporal)')
+    parser.add_argument('--semilla', type=int, default=1)
+    parser.add_argument('--salida', help='archivo JSON donde guardar los resultados')
+    args = parser.parse_args(argv)
+
+    proceso, servidor = None, args.servidor
+    if servidor is None:
+        directorio = args.dir or tempfile.mkdtemp(prefix='negocio-cajeros-')
+        generador.generar(directorio, args.productos, args.ventas, semilla=args.semilla)
+        proceso, servidor = _arrancar_servidor(directorio)
+    try:
+        print(f"[cajeros] {args.cajeros} caja(s) x {args.tickets} ticket(s) contra {servidor}")
+        res = correr(servidor, args.cajeros, args.tickets, args.semilla)
+    finally:
+        if proceso is not None:
+            proceso.terminate()
+            proceso.wait()
+    for op, r in res['operaciones'].items():
+        print(f"  {op:24s} n {r['n']:6d}  p50 {r['p50_ms']:8.3f} ms  p99 {r['p99_ms']:8.3f} ms  max {r['max_ms']:8.3f} ms")
+    print(f"[cajeros] {res['tickets_ok']} ticket(s) en {res['duracion_s']} s ({res['tickets_s']} tickets/s), "
+          f"{res['rechazados_sin_stock']} sin stock, {res['errores']} error(es)")
+    if res['descuadres_stock']:
+        print(f"[cajeros] ERROR stock descuadrado (descontado, vendido): {res['descuadres_stock']}")
+    if args.salida:
+        Path(args.salida).write_text(json.dumps(res, indent=2, ensure_ascii=False), encoding='utf-8')
+    return 1 if res['descuadres_stock'] or res['errores'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
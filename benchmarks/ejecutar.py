@@ -0,0 +1,221 @@
+"""
+Corre las funciones públicas de negocio sobre datos sintéticos y guarda los resultados en JSON.
+Con --base compara contra una corrida guardada y termina con código 1 si algo empeoró.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# negocio.py está en la carpeta de arriba; el benchmark cambia de directorio para usar sus datos
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import negocio
+from benchmarks import generador
+from benchmarks.medicion import medir, rss_pico_mb
+
+VERSION_RESULTADOS = 1
+# diferencias menores a esto (ms) son ruido aunque superen la tolerancia relativa
+PISO_RUIDO_MS = 0.05
+
+
+class _Contexto:
+    """Estado compartido por los casos: ids existentes, fechas del historial y productos dados de alta."""
+
+    def __init__(self, info, semilla):
+        self.rng = random.Random(semilla)
+        self.primer_id = info['primer_id']
+        self.ultimo_id = info['primer_id'] + info['productos'] - 1
+        self.hasta = datetime.fromisoformat(info['hasta'])
+        self.altas = 0
+        palabras = sorted({p['nombre'].split()[0] for p in negocio.listar_productos()[:1000]})
+        self.consultas = [w[:k] for w in palabras for k in (3, 5)] or ['a']
+
+    def id_existente(self):
+        return self.rng.randint(self.primer_id, self.ultimo_id)
+
+
+def _agregar(ctx):
+    ctx.altas += 1
+    return negocio.agregar_producto({'nombre': f'BENCH ARTICULO {ctx.altas}', 'categoria': 'Benchmark',
+                                     'precio_unitario': 10.0, 'stock': 1000, 'unidad': 'Pieza'})
+
+
+def _eliminar_altas(ctx):
+    # borra de a uno los productos que dio de alta el caso agregar_producto
+    altas = [p['id'] for p in negocio.listar_productos() if p['categoria'] == 'Benchmark']
+    return lambda: negocio.eliminar_producto(altas.pop() if altas else ctx.ultimo_id + 1)
+
+
+def _importar(ctx, filas=1000):
+    # dos listas de proveedor con precios distintos para los mismos ids: cada corrida actualiza algo
+    archivos = []
+    for k in range(2):
+        ruta = Path(f'bench_importar_{k}.csv').resolve()
+        with ruta.open('w', encoding='utf-8') as f:
+            f.write('codigo;descripcion;precio\n')
+            for i in range(filas):
+                pid = ctx.primer_id + i % (ctx.ultimo_id - ctx.primer_id + 1)
+                f.write(f'{pid};BENCH IMPORTADO {pid};{10 + k + i % 90},50\n')
+        archivos.append(ruta)
+    return lambda: negocio.importar_productos(archivos.append(archivos.pop(0)) or archivos[0])
+
+
+def _rango(ctx, dias):
+    return (ctx.hasta - timedelta(days=dias)).isoformat(), ctx.hasta.isoformat()
+
+
+# (nombre, fábrica(ctx) -> función sin argumentos, repeticiones)
+CASOS = [
+    ('listar_productos', lambda ctx: negocio.listar_productos, 30),
+    ('obtener_producto', lambda ctx: lambda: negocio.obtener_producto(ctx.id_existente()), 2000),
+    ('buscar_productos', lambda ctx: lambda: negocio.buscar_productos(ctx.rng.choice(ctx.consultas)), 500),
+    ('agregar_producto', lambda ctx: lambda: _agregar(ctx), 200),
+    ('actualizar_producto', lambda ctx: lambda: negocio.actualizar_producto(
+        ctx.id_existente(), {'precio_unitario': round(ctx.rng.uniform(10, 500), 2)}), 200),
+    ('eliminar_producto', _eliminar_altas, 100),
+    ('registrar_venta', lambda ctx: lambda: negocio.registrar_venta(
+        {'id_producto': ctx.id_existente(), 'cantidad': 1, 'forma_pago': 'Efectivo'}), 500),
+    ('registrar_venta_lote', lambda ctx: lambda: negocio.registrar_venta_lote(
+        [{'id_producto': ctx.id_existente(), 'cantidad': 2} for _ in range(3)], 'Tarjeta'), 200),
+    ('importar_productos', _importar, 20),
+    ('sincronizar', lambda ctx: negocio.sincronizar, 20),
+    ('generar_reporte_ventas', lambda ctx: negocio.generar_reporte_ventas, 100),
+    ('generar_reporte_ventas_30d', lambda ctx: lambda: negocio.generar_reporte_ventas(*_rango(ctx, 30)), 50),
+    ('generar_reporte_ventas_365d', lambda ctx: lambda: negocio.generar_reporte_ventas(*_rango(ctx, 365)), 10),
+    ('productos_mas_vendidos', lambda ctx: negocio.productos_mas_vendidos, 100),
+    ('productos_mas_vendidos_30d', lambda ctx: lambda: negocio.productos_mas_vendidos(10, *_rango(ctx, 30)), 50),
+    ('ultimas_ventas', lambda ctx: negocio.ultimas_ventas, 200),
+    ('iter_ventas_producto', lambda ctx: lambda: sum(1 for _ in negocio.iter_ventas(
+        id_producto=ctx.id_existente())), 5),
+    ('listar_ventas', lambda ctx: negocio.listar_ventas, 3),
+]
+
+
+def correr(directorio, productos, ventas, dias=365, formas_pago=None, backend='csv', semilla=1,
+           reusar=False, casos=None, omitir=(), tiempo_max=10.0, calentamiento=2):
+    """
+    Genera los datos (salvo reusar=True con datos ya generados) y mide cada caso.
+    Retorna el dict de resultados (el mismo que se guarda en JSON).
+    """
+    directorio = Path(directorio).resolve()
+    info_path = directorio / 'benchmark_datos.json'
+    t0 = time.perf_counter()
+    if reusar and info_path.exists():
+        info = json.loads(info_path.read_text(encoding='utf-8'))
+    else:
+        info = generador.generar(directorio, productos, ventas, dias=dias, formas_pago=formas_pago,
+                                  semilla=semilla)
+        info_path.write_text(json.dumps(info), encoding='utf-8')
+    generacion_s = time.perf_counter() - t0
+
+    os.chdir(directorio)  # negocio resuelve data/ desde el directorio actual
+    if backend != 'csv':
+        negocio.copiar_datos('csv', backend)
+    negocio.usar_backend(backend)
+
+    resultados = {}
+    # arranque en frío: la primera lectura carga catálogo y agregados desde los CSV
+    for nombre, fn in (('carga_inicial_productos', negocio.listar_productos),
+                       ('carga_inicial_reporte', negocio.generar_reporte_ventas)):
+        resultados[nombre] = medir(fn, repeticiones=1, calentamiento=0)
+        print(f"  {nombre:28s} {resultados[nombre]['p50_ms']:10.2f} ms")
+
+    ctx = _Contexto(info, semilla)
+    for nombre, fabrica, repeticiones in CASOS:
+        if (casos and nombre not in casos) or nombre in omitir:
+            continue
+        res = medir(fabrica(ctx), repeticiones=repeticiones, calentamiento=calentamiento,
+                    tiempo_max=tiempo_max)
+        resultados[nombre] = res
+        print(f"  {nombre:28s} p50 {res['p50_ms']:10.3f} ms  p99 {res['p99_ms']:10.3f} ms  "
+              f"{res['ops_s'] or 0:10.1f} ops/s  rss {res['rss_pico_mb']} MB")
+    negocio.sincronizar()
+
+    return {
+        'version': VERSION_RESULTADOS,
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'backend': backend,
+        'datos': info,
+        'generacion_s': round(generacion_s, 2),
+        'rss_pico_mb': rss_pico_mb(),
+        'casos': resultados,
+    }
+
+
+def comparar(actual, base, tolerancia=0.2):
+    """
+    Compara p50 caso por caso. Retorna lista de dicts {'caso', 'base_ms', 'actual_ms', 'cambio',
+    'regresion'}; es regresión si empeoró más que `tolerancia` (0.2 = 20 %) y más que PISO_RUIDO_MS.
+    """
+    filas = []
+    for caso, res in actual.get('casos', {}).items():
+        previo = base.get('casos', {}).get(caso)
+        if previo is None:
+            continue
+        antes, ahora = previo['p50_ms'], res['p50_ms']
+        cambio = (ahora - antes) / antes if antes > 0 else 0.0
+        filas.append({'caso': caso, 'base_ms': antes, 'actual_ms': ahora, 'cambio': round(cambio, 3),
+                      'regresion': cambio > tolerancia and ahora - antes > PISO_RUIDO_MS})
+    return filas
+
+
+def _formas_pago(texto):
+    """'Efectivo=0.6,Tarjeta=0.4' -> {'Efectivo': 0.6, 'Tarjeta': 0.4}"""
+    try:
+        pares = (parte.split('=') for parte in texto.split(','))
+        return {nombre.strip(): float(peso) for nombre, peso in pares}
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"formas de pago inválidas: {texto!r}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description=__doc__.strip())
+    parser.add_argument('--productos', type=int, default=10_000, help='productos del catálogo (1k-500k)')
+    parser.add_argument('--ventas', type=int, default=100_000, help='ventas del historial (10k-10M)')
+    parser.add_argument('--dias', type=int, default=365, help='días que abarca el historial')
+    parser.add_argument('--pagos', type=_formas_pago, help='mezcla de pagos, p. ej. Efectivo=0.6,Tarjeta=0.4')
+    parser.add_argument('--backend', default='csv', choices=['csv', 'sqlite'])
+    parser.add_argument('--semilla', type=int, default=1)
+    parser.add_argument('--dir', help='carpeta de trabajo (por defecto una temporal)')
+    parser.add_argument('--reusar', action='store_true', help='no regenerar si --dir ya tiene datos (la carga inicial '
+                        'usa entonces el snapshot y los agregados de la corrida anterior)')
+    parser.add_argument('--casos', nargs='*', help='sólo estos casos')
+    parser.add_argument('--omitir', nargs='*', default=[], help='casos a saltear (p. ej. listar_ventas)')
+    parser.add_argument('--tiempo-max', type=float, default=10.0, help='segundos máximos por caso')
+    parser.add_argument('--salida', help='archivo JSON donde guardar los resultados')
+    parser.add_argument('--base', help='resultados JSON anteriores contra los que comparar')
+    parser.add_argument('--tolerancia', type=float, default=0.2, help='empeoramiento tolerado (0.2 = 20%%)')
+    args = parser.parse_args(argv)
+
+    salida = Path(args.salida).resolve() if args.salida else None
+    base = json.loads(Path(args.base).read_text(encoding='utf-8')) if args.base else None
+    directorio = args.dir or tempfile.mkdtemp(prefix='negocio-bench-')
+    print(f"[benchmark] {args.productos} productos, {args.ventas} ventas, motor {args.backend}, en {directorio}")
+    resultados = correr(directorio, args.productos, args.ventas, dias=args.dias, formas_pago=args.pagos,
+                        backend=args.backend, semilla=args.semilla, reusar=args.reusar, casos=args.casos,
+                        omitir=args.omitir, tiempo_max=args.tiempo_max)
+    if salida:
+        salida.write_text(json.dumps(resultados, indent=2, ensure_ascii=False), encoding='utf-8')
+        print(f"[benchmark] resultados en {salida}")
+    if base is None:
+        return 0
+    if base.get('datos', {}).get('ventas') != args.ventas or base.get('backend') != args.backend:
+        print("[benchmark] ADVERTENCIA: la base se midió con otros datos o motor")
+    regresiones = 0
+    for fila in comparar(resultados, base, args.tolerancia):
+        marca = 'REGRESION' if fila['regresion'] else ''
+        regresiones += fila['regresion']
+        print(f"  {fila['caso']:28s} {fila['base_ms']:10.3f} -> {fila['actual_ms']:10.3f} ms "
+              f"({fila['cambio']:+.0%}) {marca}")
+    print(f"[benchmark] {regresiones} regresión(es) con tolerancia {args.tolerancia:.0%}")
+    return 1 if regresiones else 0
@@ -0,0 +1,117 @@
+"""
+Generador de datos sintéticos de ferretería con el mismo formato que data/productos.csv y
+data/ventas.csv. Todo sale de una semilla: con los mismos parámetros se obtienen los mismos archivos.
+"""
+
+import csv
+import random
+from datetime import datetime, timedelta
+from itertools import accumulate
+from pathlib import Path
+
+import negocio
+
+# nombre base, categoría, unidad y rango de precio
+_ARTICULOS = [
+    ('ACOPLE SANITARIO', 'Plomeria', 'Pieza', (40, 600)),
+    ('CODO GALVANIZADO', 'Plomeria', 'Pieza', (10, 120)),
+    ('TUBO PVC', 'Plomeria', 'Pieza', (60, 450)),
+    ('LLAVE DE PASO', 'Plomeria', 'Pieza', (90, 700)),
+    ('ALAMBRE GALVANIZADO', 'Materiales de construccion', 'Rollo', (200, 900)),
+    ('LAMINA ACANALADA PVC', 'Materiales de construccion', 'Pieza', (600, 2200)),
+    ('CEMENTO GRIS', 'Materiales de construccion', 'Bulto', (180, 320)),
+    ('VARILLA CORRUGADA', 'Materiales de construccion', 'Pieza', (90, 400)),
+    ('AZADON', 'Jardineria', 'Pieza', (250, 700)),
+    ('FUMIGADORA', 'Jardineria', 'Pieza', (180, 1500)),
+    ('MANGUERA JARDIN', 'Jardineria', 'Metro', (15, 60)),
+    ('BROCA', 'Electricidad', 'Pieza', (20, 300)),
+    ('CABLE COAXIAL', 'Electricidad', 'Metro', (20, 90)),
+    ('CANALETA', 'Electricidad', 'Pieza', (15, 80)),
+    ('APAGADOR SENCILLO', 'Electricidad', 'Pieza', (25, 150)),
+    ('CLAVOS DE HIERRO', 'Tornilleria y anclajes', 'KG', (35, 90)),
+    ('TORNILLO PIJA', 'Tornilleria y anclajes', 'Caja', (40, 260)),
+    ('TAQUETE PLASTICO', 'Tornilleria y anclajes', 'Caja', (20, 120)),
+    ('DISCO CORTE', 'Herramientas eléctricas', 'Pieza', (60, 450)),
+    ('ROTOMARTILLO', 'Herramientas eléctricas', 'Pieza', (900, 4500)),
+    ('ESMERILADORA', 'Herramientas eléctricas', 'Pieza', (800, 3800)),
+    ('FLEXOMETRO', 'Herramientas de medición', 'Pieza', (60, 350)),
+    ('NIVEL', 'Herramientas de medición', 'Pieza', (45, 600)),
+    ('MALLA HEXAGONAL', 'Cercas y Mallas', 'Rollo', (900, 3200)),
+    ('TELA GALLINERO', 'Cercas y Mallas', 'Rollo', (800, 2500)),
+    ('MARTILLO', 'Herramientas manuales', 'Pieza', (120, 600)),
+    ('MARCO SEGUETA', 'Herramientas manuales', 'Pieza', (90, 350)),
+    ('DESARMADOR PLANO', 'Herramientas manuales', 'Pieza', (35, 220)),
+    ('PINTURA VINILICA', 'Pinturas', 'Litro', (80, 400)),
+    ('BROCHA', 'Pinturas', 'Pieza', (25, 180)),
+]
+_MEDIDAS = ['1/4', '3/8', '1/2', '3/4', '1"', '2"', '4 1/2', '7"', '14"', '3MTS', '5LT', '16', '25MM', '2MT']
+_MARCAS = ['TRUPER', 'PRETUL', 'URREA', 'GRIVAL', 'ARAUTEL', 'BARIQUI', 'FOSET', 'COFLEX', 'VOLTECK', 'HERMEX']
+
+FORMAS_PAGO = {'Efectivo': 0.55, 'Tarjeta': 0.35, 'Transferencia': 0.10}
+
+# filas por llamada a writerows (la memoria no crece con el tamaño del historial)
+_TANDA = 50_000
+
+
+def _catalogo(n, rng, primer_id):
+    for k in range(n):
+        base, categoria, unidad, (minimo, maximo) = rng.choice(_ARTICULOS)
+        nombre = f"{base} {rng.choice(_MARCAS)} {rng.choice(_MEDIDAS)}"
+        precio = round(rng.uniform(minimo, maximo), 2)
+        yield [primer_id + k, nombre, categoria, f"{precio:.2f}", rng.randint(50, 5000), unidad, 0]
+
+
+def generar(directorio, productos=1000, ventas=10_000, dias=365, fin=None, formas_pago=None,
+            sesgo=1.1, semilla=1, primer_id=11001):
+    """
+    Escribe <directorio>/data/productos.csv y <directorio>/data/ventas.csv (reemplaza los que haya).
+    - ventas en orden cronológico repartidas en `dias` días hasta `fin` (hoy por defecto).
+    - popularidad tipo Zipf (`sesgo`): pocos productos concentran la mayoría de las ventas.
+    - formas_pago: {nombre: peso}; por defecto FORMAS_PAGO.
+    Retorna dict con lo generado: {'productos', 'ventas', 'desde', 'hasta', 'primer_id'}.
+    """
+    rng = random.Random(semilla)
+    datos = Path(directorio) / 'data'
+    datos.mkdir(parents=True, exist_ok=True)
+    for auxiliar in datos.iterdir():
+        # índices, journal, agregados y snapshot de una corrida anterior ya no corresponden
+        if auxiliar.is_file() and auxiliar.name not in ('productos.csv', 'ventas.csv'):
+            auxiliar.unlink()
+
+    precios = []
+    with (datos / 'productos.csv').open('w', newline='', encoding='utf-8') as f:
+        w = csv.writer(f)
+        w.writerow(negocio.PRODUCTOS_FIELDS)
+        for fila in _catalogo(productos, rng, primer_id):
+            precios.append(fila[3])
+            w.writerow(fila)
+
+    formas_pago = formas_pago or FORMAS_PAGO
+    pagos, pesos_pago = list(formas_pago), list(accumulate(formas_pago.values()))
+    pesos = list(accumulate(1.0 / (k + 1) ** sesgo for k in range(productos)))
+    orden = list(range(productos))
+    rng.shuffle(orden)  # los más vendidos no son siempre los primeros ids
+    fin = fin or datetime.now().replace(microsecond=0)
+    inicio = fin - timedelta(days=dias)
+    paso = dias * 86400 / max(ventas, 1)
+
+    with (datos / 'ventas.csv').open('w', newline='', encoding='utf-8') as f:
+        w = csv.writer(f)
+        w.writerow(negocio.VENTAS_FIELDS)
+        hecho = 0
+        while hecho < ventas:
+            n = min(_TANDA, ventas - hecho)
+            elegidos = rng.choices(orden, cum_weights=pesos, k=n)
+            formas = rng.choices(pagos, cum_weights=pesos_pago, k=n)
+            filas = []
+            for k in range(n):
+                i = hecho + k
+                fecha = inicio + timedelta(seconds=int((i + rng.random()) * paso))
+                cantidad = 1 if rng.random() < 0.6 else rng.randint(2, 12)
+                indice = elegidos[k]
+                filas.append([i + 1, fecha.isoformat(), primer_id + indice, cantidad, precios[indice], formas[k]])
+            w.writerows(filas)
+            hecho += n
+
+    return {'productos': productos, 'ventas': ventas, 'desde': inicio.isoformat(),
+            'hasta': fin.isoformat(), 'primer_id': primer_id}
@@ -0,0 +1,66 @@
+"""
+Medición de tiempos y memoria: percentiles de latencia, throughput y pico de RSS del proceso.
+"""
+
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # Windows: sin getrusage
+    resource = None
+
+
+def percentil(ordenados, p):
+    """Percentil p (0-100) con interpolación lineal sobre una lista ya ordenada."""
+    if not ordenados:
+        return 0.0
+    pos = (len(ordenados) - 1) * p / 100
+    i = int(pos)
+    if i + 1 >= len(ordenados):
+        return ordenados[-1]
+    return ordenados[i] + (ordenados[i + 1] - ordenados[i]) * (pos - i)
+
+
+def rss_pico_mb():
+    """Pico de memoria residente del proceso en MB, o None si el sistema no lo informa."""
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa KB; macOS, bytes
+    return round(pico / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def resumir(tiempos_ns):
+    """dict con n, media, p50, p90, p99, max (milisegundos) y ops_s a partir de tiempos en ns."""
+    ordenados = sorted(t / 1e6 for t in tiempos_ns)
+    total_s = sum(tiempos_ns) / 1e9
+    return {
+        'n': len(ordenados),
+        'media_ms': round(sum(ordenados) / len(ordenados), 4) if ordenados else 0.0,
+        'p50_ms': round(percentil(ordenados, 50), 4),
+        'p90_ms': round(percentil(ordenados, 90), 4),
+        'p99_ms': round(percentil(ordenados, 99), 4),
+        'max_ms': round(ordenados[-1], 4) if ordenados else 0.0,
+        'ops_s': round(len(ordenados) / total_s, 1) if total_s > 0 else None,
+    }
+
+
+def medir(fn, repeticiones=50, calentamiento=3, tiempo_max=None):
+    """
+    Llama fn() `calentamiento` veces sin medir y luego hasta `repeticiones` veces midiendo cada
+    llamada (o hasta superar tiempo_max segundos). Retorna resumir(...) más rss_pico_mb.
+    """
+    for _ in range(calentamiento):
+        fn()
+    tiempos = []
+    limite = None if tiempo_max is None else time.perf_counter() + tiempo_max
+    for _ in range(repeticiones):
+        t0 = time.perf_counter_ns()
+        fn()
+        tiempos.append(time.perf_counter_ns() - t0)
+        if limite is not None and time.perf_counter() > limite:
+            break
+    res = resumir(tiempos)
+    res['rss_pico_mb'] = rss_pico_mb()
+    return res
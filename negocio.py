@@ -1,30 +1,321 @@
 """
 negocio.py
-Backend para gestión de inventario y ventas con CSV.
+Backend para gestión de inventario y ventas con CSV (por defecto) o SQLite.
 
 Funciones principales:
  - listar_productos() -> list[dict]
+ - obtener_producto(id_producto: int) -> dict | None
+ - buscar_productos(consulta: str, limite=20) -> list[dict]   (búsqueda mientras se escribe)
  - agregar_producto(producto: dict) -> bool
- - actualizar_producto(id_producto: int, nuevos_datos: dict) -> bool
+ - actualizar_producto(id_producto: int, nuevos_datos: dict, version=None) -> bool
  - eliminar_producto(id_producto: int) -> bool
  - listar_ventas() -> list[dict]
- - registrar_venta(venta: dict) -> bool
+ - iter_ventas(desde=None, hasta=None, id_producto=None) -> generador de dicts
+ - ultimas_ventas(n=200) -> list[dict]   (más recientes primero)
+ - registrar_venta(venta: dict) -> dict
+ - registrar_venta_lote(items: list[dict], forma_pago: str) -> dict   (ticket completo, todo o nada)
  - calcular_total_venta(items: list[dict]) -> float
- - productos_mas_vendidos(top_n=10) -> list[tuple(producto_id, cantidad_total)]
+ - sincronizar(forzar=True) -> bool   (checkpoint del journal a los CSV)
+ - productos_mas_vendidos(top_n=10, fecha_inicio=None, fecha_fin=None) -> list[tuple(producto_id, cantidad_total)]
+ - generar_reporte_ventas(fecha_inicio=None, fecha_fin=None) -> dict
+ - reconstruir_agregados() -> bool   (también: python negocio.py --reconstruir-agregados)
+ - migrar_ventas_a_particiones() -> dict   (también: python negocio.py --migrar-particiones)
+ - usar_backend(nombre) -> bool, backend_actual() -> str
+ - copiar_datos(origen, destino) -> dict   (también: python negocio.py --copiar-datos csv sqlite)
+ - compactar_ventas(antes_de=None, dias=365) -> dict   (también: python negocio.py --compactar-ventas [FECHA])
+ - iter_ventas_archivadas(desde=None, hasta=None, id_producto=None) -> generador de dicts
+ - metricas() -> dict, activar_metricas(activas=True), reiniciar_metricas()   (rendimiento por función)
+
+El motor se elige con la variable de entorno NEGOCIO_BACKEND ('csv' o 'sqlite') o con
+{"backend": "sqlite"} en data/config.json; la API es la misma con cualquiera de los dos.
+
+Motor CSV: el catálogo se mantiene en memoria (ProductoStore) y se relee sólo si productos.csv cambia por fuera.
+Cada cambio se anota primero en un journal (data/negocio.journal) y los CSV se actualizan por grupos
+con escrituras atómicas; al iniciar se reaplica lo que haya quedado en el journal.
+Al salir guarda un snapshot binario (data/negocio.snap) del catálogo y de los totales de ventas;
+el próximo arranque lo usa en vez de parsear los CSV si estos no cambiaron desde entonces.
+Las rutas de datos se resuelven recién cuando se usan (importar negocio no toca el disco).
+Varias terminales pueden compartir data/: las escrituras toman un bloqueo corto (data/negocio.lock)
+y se ponen al día con el journal de las demás antes de validar; las lecturas no bloquean y cada
+producto lleva un contador 'version' para detectar ediciones sobre datos viejos.
+El motor CSV está en negocio_csv.py y sus partes más grandes en módulos aparte: negocio_journal
+(journal y checkpoints), negocio_agregados (totales de ventas), negocio_indice (índice de fechas),
+negocio_archivo (ventas compactadas) y negocio_importar (listas de proveedores).
 
 Robusto: maneja archivos faltantes creando cabeceras, valida tipos y captura errores para evitar crasheos.
 """
 
+import argparse
+import atexit
+import bisect
+import codecs
 import csv
+import heapq
+import json
+import marshal
 import os
+import random
+import re
+import shutil
+import struct
+import sys
+import threading
+import time
+import unicodedata
+from array import array
+from functools import cached_property, lru_cache, wraps
+from itertools import islice
 from pathlib import Path
-from datetime import datetime
-from collections import defaultdict
+from datetime import datetime, timedelta
+from collections import OrderedDict, defaultdict
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# los módulos negocio_* hacen `import negocio`: si este archivo se ejecuta directamente, que
+# reciban este mismo módulo y no una segunda copia
+if __name__ == '__main__':
+    sys.modules.setdefault('negocio', sys.modules[__name__])
+
+import negocio_agregados
+import negocio_archivo
+import negocio_indice
+import negocio_journal
 
 # Campos esperados
-PRODUCTOS_FIELDS = ['id', 'nombre', 'categoria', 'precio_unitario', 'stock', 'unidad']
+# version: contador por fila que sube con cada cambio (concurrencia optimista entre terminales)
+PRODUCTOS_FIELDS = ['id', 'nombre', 'categoria', 'precio_unitario', 'stock', 'unidad', 'version']
 VENTAS_FIELDS = ['id_venta', 'fecha', 'id_producto', 'cantidad', 'precio_unitario_venta', 'forma_pago']
 
+# -------------------------
+# Métricas
+# -------------------------
+# Latencias en cubetas de potencias de 2: la cubeta k cuenta llamadas de menos de 2**k µs.
+_CUBETAS = 32
+
+class _Metricas:
+    """
+    Métricas del proceso: llamadas y latencia (histograma) por función pública, filas leídas,
+    bytes leídos/escritos y aciertos/fallos por caché. Desactivadas, cada punto de medición
+    sólo consulta `activas` y sigue de largo.
+    """
+
+    def __init__(self):
+        self.activas = False
+        self._lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self._lock:
+            self._funciones = {}  # nombre -> [llamadas, total_ns, max_ns, cubetas]
+            self._contadores = defaultdict(int)
+            self._desde = time.time()
+
+    def llamada(self, nombre, ns):
+        cubeta = min((ns // 1000).bit_length(), _CUBETAS - 1)
+        with self._lock:
+            f = self._funciones.get(nombre)
+            if f is None:
+                f = self._funciones[nombre] = [0, 0, 0, [0] * _CUBETAS]
+            f[0] += 1
+            f[1] += ns
+            f[2] = max(f[2], ns)
+            f[3][cubeta] += 1
+
+    def sumar(self, clave, n=1):
+        with self._lock:
+            self._contadores[clave] += n
+
+    def lectura(self, filas, bytes_leidos=0):
+        with self._lock:
+            self._contadores['filas_leidas'] += filas
+            self._contadores['bytes_leidos'] += bytes_leidos
+
+    def escritura(self, bytes_escritos):
+        self.sumar('bytes_escritos', bytes_escritos)
+
+    def cache(self, nombre, acierto):
+        self.sumar(f"cache.{nombre}.{'aciertos' if acierto else 'fallos'}")
+
+    @staticmethod
+    def _percentil(cubetas, n, p, max_ns):
+        objetivo = n * p / 100
+        acumulado = 0
+        for k, c in enumerate(cubetas):
+            acumulado += c
+            if acumulado >= objetivo:
+                # cota superior de la cubeta, sin pasar del máximo observado
+                return min(2 ** k / 1000, max_ns / 1e6)
+        return max_ns / 1e6
+
+    def foto(self):
+        """dict serializable con todo lo medido desde el último reiniciar()."""
+        with self._lock:
+            funciones = {k: (v[0], v[1], v[2], list(v[3])) for k, v in self._funciones.items()}
+            contadores = dict(self._contadores)
+            desde = self._desde
+        res_funciones = {}
+        for nombre, (n, total, maximo, cubetas) in sorted(funciones.items()):
+            res_funciones[nombre] = {
+                'llamadas': n,
+                'total_ms': round(total / 1e6, 3),
+                'media_ms': round(total / n / 1e6, 4),
+                'max_ms': round(maximo / 1e6, 4),
+                'p50_ms': round(self._percentil(cubetas, n, 50, maximo), 4),
+                'p90_ms': round(self._percentil(cubetas, n, 90, maximo), 4),
+                'p99_ms': round(self._percentil(cubetas, n, 99, maximo), 4),
+                'histograma_us': {f'<{2 ** k}': c for k, c in enumerate(cubetas) if c},
+            }
+        caches = {}
+        for clave, n in contadores.items():
+            if clave.startswith('cache.'):
+                _, nombre, tipo = clave.split('.')
+                caches.setdefault(nombre, {'aciertos': 0, 'fallos': 0})[tipo] = n
+        for c in caches.values():
+            consultas = c['aciertos'] + c['fallos']
+            c['ratio'] = round(c['aciertos'] / consultas, 4) if consultas else None
+        return {
+            'activas': self.activas,
+            'desde': datetime.fromtimestamp(desde).isoformat(timespec='seconds'),
+            'segundos': round(time.time() - desde, 1),
+            'funciones': res_funciones,
+            'filas_leidas': contadores.get('filas_leidas', 0),
+            'bytes_leidos': contadores.get('bytes_leidos', 0),
+            'bytes_escritos': contadores.get('bytes_escritos', 0),
+            'bloqueos_contendidos': contadores.get('bloqueo.contendidos', 0),
+            'conflictos_version': contadores.get('conflictos_version', 0),
+            'caches': caches,
+        }
+
+_metricas = _Metricas()
+
+def _medido(fn):
+    """Cuenta llamadas y latencia de una función pública cuando las métricas están activas."""
+    nombre = fn.__name__
+    @wraps(fn)
+    def medida(*args, **kwargs):
+        if not _metricas.activas:
+            return fn(*args, **kwargs)
+        t0 = time.perf_counter_ns()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _metricas.llamada(nombre, time.perf_counter_ns() - t0)
+    return medida
+
+class _VolcadoMetricas:
+    """Hilo que guarda metricas() en METRICAS_FILE cada `intervalo` segundos mientras estén activas."""
+
+    def __init__(self):
+        self._hilo = None
+        self._parar = threading.Event()
+        self.intervalo = 60.0
+
+    def iniciar(self, intervalo):
+        self.detener()
+        self.intervalo = intervalo
+        if intervalo <= 0:
+            return
+        self._parar = threading.Event()
+        self._hilo = threading.Thread(target=self._bucle, args=(self._parar,), name='negocio-metricas', daemon=True)
+        self._hilo.start()
+
+    def _bucle(self, parar):
+        while not parar.wait(self.intervalo):
+            volcar_metricas()
+
+    def detener(self):
+        self._parar.set()
+        self._hilo = None
+
+_volcado_metricas = _VolcadoMetricas()
+
+# -------------------------
+# Caché de consultas
+# -------------------------
+# resultados guardados como máximo (los menos usados salen primero)
+CACHE_CONSULTAS = 128
+
+def _copia(valor):
+    """Copia de listas y dicts (un nivel adentro): quien recibe un resultado no altera el caché."""
+    if isinstance(valor, dict):
+        return {k: dict(v) if isinstance(v, dict) else v for k, v in valor.items()}
+    if isinstance(valor, list):
+        return [dict(v) if isinstance(v, dict) else v for v in valor]
+    if isinstance(valor, tuple):
+        return tuple(_copia(v) for v in valor)
+    return valor
+
+class _CacheConsultas:
+    """
+    Resultados de consultas de sólo lectura (reporte, top, catálogo, últimas ventas) con
+    desalojo LRU. Cada resultado queda atado a:
+     - la generación local, que sube al terminar cada función pública que escribe (_modifica);
+     - la firma de datos del motor (Backend.firma_datos), que cambia si otra terminal o una
+       edición a mano tocó los datos.
+    Mientras ninguna de las dos cambie, repetir la consulta no recalcula nada.
+    """
+
+    def __init__(self, capacidad):
+        self.capacidad = capacidad
+        self._lock = threading.Lock()
+        self._entradas = OrderedDict()  # clave -> (generación, firma, resultado)
+        self.generacion = 0
+
+    def invalidar(self):
+        with self._lock:
+            self.generacion += 1
+            self._entradas.clear()
+
+    def obtener(self, clave, calcular):
+        """Resultado de calcular() para `clave`, del caché si los datos no cambiaron desde que se guardó."""
+        # generación y firma se toman antes de calcular: una escritura a la par deja el resultado vencido
+        generacion, firma = self.generacion, _backend().firma_datos()
+        if firma is None:
+            return calcular()  # el motor no puede detectar cambios ajenos: sin caché
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            acierto = entrada is not None and entrada[0] == generacion and entrada[1] == firma
+            if acierto:
+                self._entradas.move_to_end(clave)
+        if _metricas.activas:
+            _metricas.cache('consultas', acierto)
+        if acierto:
+            return _copia(entrada[2])
+        resultado = calcular()
+        with self._lock:
+            self._entradas[clave] = (generacion, firma, _copia(resultado))
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.capacidad:
+                self._entradas.popitem(last=False)
+        return resultado
+
+_consultas = _CacheConsultas(CACHE_CONSULTAS)
+
+def _modifica(fn):
+    """Función pública que escribe datos: al terminar (bien o mal) vence el caché de consultas."""
+    @wraps(fn)
+    def escritura(*args, **kwargs):
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _consultas.invalidar()
+    return escritura
+
+def _firma_de(*archivos):
+    """(tamaño, mtime) de cada archivo, None si no existe: cambia con cualquier escritura."""
+    firma = []
+    for archivo in archivos:
+        try:
+            st = archivo.stat()
+            firma.append((st.st_size, st.st_mtime_ns))
+        except OSError:
+            firma.append(None)
+    return tuple(firma)
+
 def _find_csv(filename):
     """
     Busca el archivo en rutas comunes:
@@ -57,9 +348,105 @@ def _find_csv(filename):
             pass
     return target
 
-# Rutas resueltas
-PRODUCTOS_FILE = _find_csv('productos.csv')
-VENTAS_FILE = _find_csv('ventas.csv')
+def _ruta(valor):
+    """Las clases de abajo aceptan la ruta ya resuelta o una función que la resuelve al usarla."""
+    return valor() if callable(valor) else valor
+
+class _Rutas:
+    """
+    Rutas de los archivos de datos, resueltas recién al primer uso: importar negocio no sondea
+    directorios ni crea archivos. Desde fuera se leen como negocio.PRODUCTOS_FILE, etc.
+    """
+
+    @cached_property
+    def productos(self):
+        return _find_csv('productos.csv')
+
+    @cached_property
+    def ventas(self):
+        return _find_csv('ventas.csv')
+
+    @property
+    def datos(self):
+        return self.ventas.parent
+
+    @property
+    def secuencias(self):
+        # próximos ids (id_venta / id de producto), junto a los CSV
+        return self.datos / 'secuencias.json'
+
+    @property
+    def journal(self):
+        # journal write-ahead de ventas y cambios de stock
+        return self.datos / 'negocio.journal'
+
+    @property
+    def agregados(self):
+        # totales acumulados de ventas (unidades e ingresos por producto)
+        return self.datos / 'ventas_agregados.json'
+
+    @property
+    def ventas_dir(self):
+        # ventas particionadas por mes (data/ventas/YYYY-MM.csv); se activa con migrar_ventas_a_particiones()
+        return self.datos / 'ventas'
+
+    @property
+    def sqlite(self):
+        # motor SQLite (negocio_sqlite.py)
+        return self.datos / 'negocio.db'
+
+    @property
+    def config(self):
+        # selección de motor y opciones ({"backend": ..., "reportes": ...})
+        return self.datos / 'config.json'
+
+    @property
+    def snapshot(self):
+        # catálogo y agregados en binario para arrancar sin parsear los CSV
+        return self.datos / 'negocio.snap'
+
+    @property
+    def archivo(self):
+        # ventas viejas compactadas (.csv.gz por mes) y su resumen por producto y día
+        return self.datos / 'archivo'
+
+    @property
+    def bloqueo(self):
+        # bloqueo entre procesos para escribir (varias terminales sobre la misma carpeta data/)
+        return self.datos / 'negocio.lock'
+
+    @property
+    def metricas(self):
+        # volcado periódico de metricas() cuando están activas
+        return self.datos / 'metricas.json'
+
+_rutas = _Rutas()
+
+# nombres públicos de las rutas (negocio.PRODUCTOS_FILE, ...), resueltos al pedirlos
+_NOMBRES_RUTAS = {
+    'PRODUCTOS_FILE': 'productos',
+    'VENTAS_FILE': 'ventas',
+    'SECUENCIAS_FILE': 'secuencias',
+    'JOURNAL_FILE': 'journal',
+    'AGREGADOS_FILE': 'agregados',
+    'VENTAS_DIR': 'ventas_dir',
+    'SQLITE_FILE': 'sqlite',
+    'CONFIG_FILE': 'config',
+    'SNAPSHOT_FILE': 'snapshot',
+    'METRICAS_FILE': 'metricas',
+    'LOCK_FILE': 'bloqueo',
+    'ARCHIVO_DIR': 'archivo',
+}
+
+def __getattr__(nombre):
+    if nombre in _NOMBRES_RUTAS:
+        return getattr(_rutas, _NOMBRES_RUTAS[nombre])
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
+
+# Group commit del journal: fsync + checkpoint cada JOURNAL_LOTE cambios o cuando el
+# cambio pendiente más antiguo supera JOURNAL_VENTANA_S segundos (lo que ocurra primero).
+JOURNAL_LOTE = 32
+JOURNAL_VENTANA_S = 2.0
 
 # -------------------------
 # Utilidades internas
@@ -76,6 +463,31 @@ def _asegurar_archivo(filepath: Path, fieldnames):
         print(f"[negocio] ERROR al asegurar archivo {filepath}: {e}")
         return False
 
+# CSV heredados que no están en UTF-8 (ver _leer_csv): se vuelven a guardar en su codificación
+_codificaciones = {}
+
+def _codificacion(filepath: Path):
+    """
+    Codificación con la que se reescribe un CSV: la que se detectó al leerlo o, si se cargó de
+    otra forma (snapshot), revisando el archivo una vez. Un archivo que no existe será UTF-8.
+    """
+    filepath = Path(filepath)
+    if filepath not in _codificaciones:
+        codificacion = 'utf-8'
+        try:
+            decodificador = codecs.getincrementaldecoder('utf-8')()
+            with filepath.open('rb') as f:
+                for bloque in iter(lambda: f.read(1 << 20), b''):
+                    decodificador.decode(bloque)
+            decodificador.decode(b'', final=True)
+        except UnicodeDecodeError:
+            codificacion = 'cp1252'
+            print(f"[negocio] ADVERTENCIA: {filepath} no está en UTF-8; se guarda en cp1252")
+        except OSError:
+            pass
+        _codificaciones[filepath] = codificacion
+    return _codificaciones[filepath]
+
 def _leer_csv(filepath: Path, fieldnames):
     if not _asegurar_archivo(filepath, fieldnames):
         return []
@@ -85,243 +497,2069 @@ def _leer_csv(filepath: Path, fieldnames):
             reader = csv.DictReader(f)
             for row in reader:
                 rows.append(row)
+        _codificaciones[filepath] = 'utf-8'
+    except UnicodeDecodeError:
+        # CSV guardado desde Excel en Windows (cp1252): se lee y se sigue guardando así, para no
+        # cambiarle la codificación a las planillas que lo abren
+        rows = []
+        try:
+            with filepath.open('r', newline='', encoding='cp1252') as f:
+                rows = list(csv.DictReader(f))
+            if _codificaciones.get(filepath) != 'cp1252':
+                print(f"[negocio] ADVERTENCIA: {filepath} no está en UTF-8; se lee y se guarda en cp1252")
+            _codificaciones[filepath] = 'cp1252'
+        except Exception as e:
+            print(f"[negocio] ERROR al leer {filepath}: {e}")
     except Exception as e:
         print(f"[negocio] ERROR al leer {filepath}: {e}")
+    if _metricas.activas:
+        try:
+            _metricas.lectura(len(rows), filepath.stat().st_size)
+        except OSError:
+            pass
     return rows
 
 def _escribir_csv(filepath: Path, fieldnames, rows):
     if not _asegurar_archivo(filepath, fieldnames):
         return False
     try:
-        with filepath.open('w', newline='', encoding='utf-8') as f:
+        with filepath.open('w', newline='', encoding=_codificacion(filepath), errors='replace') as f:
             writer = csv.DictWriter(f, fieldnames=fieldnames)
             writer.writeheader()
             for r in rows:
                 # asegurar cadenas
                 safe = {k: ('' if r.get(k) is None else str(r.get(k))) for k in fieldnames}
                 writer.writerow(safe)
+            if _metricas.activas:
+                _metricas.escritura(f.tell())
         return True
     except Exception as e:
         print(f"[negocio] ERROR al escribir {filepath}: {e}")
         return False
 
-# -------------------------
-# Productos (CRUD)
-# -------------------------
-def listar_productos():
-    raw = _leer_csv(PRODUCTOS_FILE, PRODUCTOS_FIELDS)
-    productos = []
-    for r in raw:
-        try:
-            prod = {
-                'id': int(r.get('id', 0)),
-                'nombre': r.get('nombre', '') or '',
-                'categoria': r.get('categoria', '') or '',
-                'precio_unitario': float(r.get('precio_unitario', 0) or 0),
-                'stock': int(r.get('stock', 0) or 0),
-                'unidad': r.get('unidad', '') or ''
-            }
-            productos.append(prod)
-        except Exception:
-            # Ignorar fila corrupta pero no crashear
-            continue
-    return productos
-
-def _siguiente_id_productos(productos):
-    ids = [p['id'] for p in productos if isinstance(p.get('id'), int)]
-    return (max(ids) + 1) if ids else 1
+def _anexar_csv(filepath: Path, fieldnames, rows, fsync=False):
+    """Agrega filas al final del CSV sin reescribirlo: el costo no depende del tamaño del archivo."""
+    if not _asegurar_archivo(filepath, fieldnames):
+        return False
+    try:
+        falta_salto = False
+        with filepath.open('rb') as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() > 0:
+                f.seek(-1, os.SEEK_END)
+                falta_salto = f.read(1) not in (b'\n', b'\r')
+        with filepath.open('a', newline='', encoding='utf-8') as f:
+            inicio = f.tell()
+            if falta_salto:
+                f.write('\r\n')
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            for r in rows:
+                safe = {k: ('' if r.get(k) is None else str(r.get(k))) for k in fieldnames}
+                writer.writerow(safe)
+            if _metricas.activas:
+                _metricas.escritura(f.tell() - inicio)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        return True
+    except Exception as e:
+        print(f"[negocio] ERROR al anexar en {filepath}: {e}")
+        return False
 
-def agregar_producto(producto):
+def _escribir_csv_atomico(filepath: Path, fieldnames, rows):
     """
-    producto: dict con keys: nombre, categoria, precio_unitario, stock, unidad
-    Retorna True/False.
+    Escribe a un temporal en la misma carpeta, hace fsync y lo renombra sobre el original:
+    el CSV queda completo (nuevo o anterior) aunque el proceso muera a mitad de la escritura.
     """
+    if not _asegurar_archivo(filepath, fieldnames):
+        return False
+    tmp = filepath.with_name(filepath.name + '.tmp')
     try:
-        productos = listar_productos()
-        nuevo_id = _siguiente_id_productos(productos)
-        p = {
-            'id': int(nuevo_id),
-            'nombre': str(producto.get('nombre', '')).strip(),
-            'categoria': str(producto.get('categoria', '')).strip(),
-            'precio_unitario': float(producto.get('precio_unitario', 0) or 0),
-            'stock': int(producto.get('stock', 0) or 0),
-            'unidad': str(producto.get('unidad', '')).strip()
-        }
-        productos.append(p)
-        # convertir a dicts string para escribir
-        rows = [{k: str(v) for k, v in prod.items()} for prod in productos]
-        return _escribir_csv(PRODUCTOS_FILE, PRODUCTOS_FIELDS, rows)
+        # errors='replace': en cp1252 un carácter sin equivalente queda como '?' en vez de frenar el guardado
+        with tmp.open('w', newline='', encoding=_codificacion(filepath), errors='replace') as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+            for r in rows:
+                safe = {k: ('' if r.get(k) is None else str(r.get(k))) for k in fieldnames}
+                writer.writerow(safe)
+            f.flush()
+            os.fsync(f.fileno())
+            if _metricas.activas:
+                _metricas.escritura(f.tell())
+        os.replace(tmp, filepath)
+        _fsync_directorio(filepath.parent)
+        return True
     except Exception as e:
-        print(f"[negocio] ERROR agregar_producto: {e}")
+        print(f"[negocio] ERROR al escribir {filepath}: {e}")
         return False
 
-def actualizar_producto(id_producto, nuevos_datos):
-    try:
-        productos = listar_productos()
-        found = False
-        for prod in productos:
-            if prod['id'] == int(id_producto):
-                # actualizar sólo campos presentes
-                for k in ('nombre', 'categoria', 'precio_unitario', 'stock', 'unidad'):
-                    if k in nuevos_datos:
-                        if k == 'precio_unitario':
-                            prod[k] = float(nuevos_datos[k] or 0)
-                        elif k == 'stock':
-                            prod[k] = int(nuevos_datos[k] or 0)
-                        else:
-                            prod[k] = str(nuevos_datos[k])
-                found = True
-                break
-        if not found:
-            return False
-        rows = [{k: str(v) for k, v in p.items()} for p in productos]
-        return _escribir_csv(PRODUCTOS_FILE, PRODUCTOS_FIELDS, rows)
+def _fsync_directorio(directorio: Path):
+    # En POSIX el rename sólo es durable tras fsync de la carpeta; Windows no lo permite ni lo necesita
+    if os.name == 'nt':
+        return
+    try:
+        fd = os.open(str(directorio), os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+    except OSError:
+        pass
+
+def _lineas_hacia_atras(f, bloque=64 * 1024, fin=None):
+    """
+    Genera (offset, línea en bytes) desde el final del archivo binario f (o desde `fin`) hacia
+    el inicio, omitiendo líneas vacías. offset es la posición donde empieza la línea.
+    """
+    if fin is None:
+        f.seek(0, os.SEEK_END)
+        fin = f.tell()
+    pos = fin
+    resto = b''
+    while pos > 0:
+        leer = min(bloque, pos)
+        pos -= leer
+        f.seek(pos)
+        partes = (f.read(leer) + resto).split(b'\n')
+        # la primera parte puede ser una línea cortada por el bloque
+        resto = partes[0]
+        offset = pos + len(resto) + 1
+        lineas = []
+        for p in partes[1:]:
+            lineas.append((offset, p))
+            offset += len(p) + 1
+        for offset, p in reversed(lineas):
+            p = p.rstrip(b'\r')
+            if p:
+                yield offset, p
+    resto = resto.rstrip(b'\r')
+    if resto:
+        yield 0, resto
+
+def _lineas_finales(filepath: Path, n, bloque=64 * 1024):
+    """
+    Lee las últimas n líneas no vacías del archivo recorriéndolo hacia atrás por bloques.
+    Puede incluir la cabecera si el archivo tiene menos de n filas.
+    """
+    lineas = []
+    try:
+        with filepath.open('rb') as f:
+            for _, linea in _lineas_hacia_atras(f, bloque):
+                lineas.append(linea)
+                if len(lineas) >= n:
+                    break
+    except OSError:
+        return []
+    return [l.decode('utf-8', errors='replace') for l in reversed(lineas)]
+
+def _escribir_json_atomico(filepath: Path, datos):
+    tmp = filepath.with_name(filepath.name + '.tmp')
+    try:
+        with tmp.open('w', encoding='utf-8') as f:
+            json.dump(datos, f)
+            f.flush()
+            os.fsync(f.fileno())
+            if _metricas.activas:
+                _metricas.escritura(f.tell())
+        os.replace(tmp, filepath)
+        _fsync_directorio(filepath.parent)
+        return True
     except Exception as e:
-        print(f"[negocio] ERROR actualizar_producto: {e}")
+        print(f"[negocio] ERROR al guardar {filepath}: {e}")
         return False
 
-def eliminar_producto(id_producto):
+def _filas_desde(filepath: Path, offset):
+    """
+    Genera (offset_fin, campos) por cada línea completa a partir de `offset`.
+    Una última línea sin salto (escritura en curso o cortada) no se entrega.
+    """
+    inicio, filas = offset, 0
     try:
-        productos = listar_productos()
-        productos_filtrados = [p for p in productos if p['id'] != int(id_producto)]
-        if len(productos_filtrados) == len(productos):
-            return False  # no existía
-        rows = [{k: str(v) for k, v in p.items()} for p in productos_filtrados]
-        return _escribir_csv(PRODUCTOS_FILE, PRODUCTOS_FIELDS, rows)
-    except Exception as e:
-        print(f"[negocio] ERROR eliminar_producto: {e}")
+        with filepath.open('rb') as f:
+            f.seek(offset)
+            for linea in f:
+                if not linea.endswith(b'\n'):
+                    break
+                offset += len(linea)
+                texto = linea.decode('utf-8', errors='replace').rstrip('\r\n')
+                if texto:
+                    filas += 1
+                    yield offset, next(csv.reader([texto]))
+    finally:
+        if _metricas.activas:
+            _metricas.lectura(filas, offset - inicio)
+
+def _archivo_cubre(filepath: Path, offset, ultimo_id):
+    """
+    True si el archivo sigue conteniendo lo que se leyó hasta `offset`: no se achicó y la
+    fila que termina en `offset` tiene id `ultimo_id`. Detecta truncados y reescrituras.
+    """
+    try:
+        if offset > filepath.stat().st_size:
+            return False
+        if offset == 0:
+            return True
+        with filepath.open('rb') as f:
+            for _, linea in _lineas_hacia_atras(f, fin=offset):
+                try:
+                    return int(next(csv.reader([linea.decode('utf-8', errors='replace')]))[0]) == ultimo_id
+                except (ValueError, IndexError, StopIteration):
+                    return ultimo_id == 0
+    except OSError:
         return False
+    return ultimo_id == 0
 
 # -------------------------
-# Ventas
+# Bloqueo entre procesos
 # -------------------------
-def listar_ventas():
-    raw = _leer_csv(VENTAS_FILE, VENTAS_FIELDS)
-    ventas = []
-    for r in raw:
+# Reintentos de una actualización optimista que encontró la fila cambiada por otra terminal
+REINTENTOS_OPTIMISTAS = 5
+ESPERA_REINTENTO_S = 0.002
+
+if fcntl is not None:
+    def _bloquear(fd, esperar):
         try:
-            v = {
-                'id_venta': int(r.get('id_venta', 0)),
-                'fecha': r.get('fecha', ''),
-                'id_producto': int(r.get('id_producto', 0)),
-                'cantidad': int(r.get('cantidad', 0)),
-                'precio_unitario_venta': float(r.get('precio_unitario_venta', 0) or 0),
-                'forma_pago': r.get('forma_pago', '')
-            }
-            ventas.append(v)
-        except Exception:
-            continue
-    return ventas
+            fcntl.flock(fd, fcntl.LOCK_EX if esperar else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            return False
 
-def _siguiente_id_venta(ventas):
-    ids = [v['id_venta'] for v in ventas if isinstance(v.get('id_venta'), int)]
-    return (max(ids) + 1) if ids else 1
+    def _desbloquear(fd):
+        fcntl.flock(fd, fcntl.LOCK_UN)
+else:
+    def _bloquear(fd, esperar):
+        # msvcrt.locking bloquea bytes desde la posición actual: siempre el primer byte
+        while True:
+            try:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+                return True
+            except OSError:
+                if not esperar:
+                    return False
+                time.sleep(0.002)
 
-def registrar_venta(venta):
+    def _desbloquear(fd):
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+class _Bloqueo:
     """
-    venta: dict con keys: id_producto(int), cantidad(int), precio_unitario_venta(float), forma_pago(str)
-    - agrega registro a ventas.csv y decrementa stock si hay suficiente stock.
-    Retorna dict {'ok': bool, 'mensaje': str}
+    Bloqueo exclusivo entre procesos (fcntl.flock; msvcrt.locking en Windows) sobre LOCK_FILE.
+    Lo toman sólo las escrituras del motor CSV y por poco tiempo (validar en memoria + anotar
+    en el journal, o un checkpoint); las lecturas no lo toman. Reentrante dentro del proceso.
+    La espera se mide en las métricas como 'espera_bloqueo'.
     """
-    try:
-        productos = listar_productos()
-        prod = next((p for p in productos if p['id'] == int(venta.get('id_producto'))), None)
-        if prod is None:
-            return {'ok': False, 'mensaje': 'Producto no encontrado.'}
-        cantidad = int(venta.get('cantidad', 0) or 0)
-        if cantidad <= 0:
-            return {'ok': False, 'mensaje': 'Cantidad inválida.'}
-        if prod['stock'] < cantidad:
-            return {'ok': False, 'mensaje': f'Stock insuficiente. Disponible: {prod["stock"]}'}
-        ventas = listar_ventas()
-        idv = _siguiente_id_venta(ventas)
-        fecha = venta.get('fecha') or datetime.now().isoformat(timespec='seconds')
-        precio_unitario_venta = float(venta.get('precio_unitario_venta', prod['precio_unitario']))
-        nuevo = {
-            'id_venta': int(idv),
-            'fecha': fecha,
-            'id_producto': int(prod['id']),
-            'cantidad': int(cantidad),
-            'precio_unitario_venta': float(precio_unitario_venta),
-            'forma_pago': str(venta.get('forma_pago', ''))
-        }
-        # escribir venta
-        ventas_rows = [{k: str(v) for k, v in vrow.items()} for vrow in ventas] + [{k: str(v) for k, v in nuevo.items()}]
-        if not _escribir_csv(VENTAS_FILE, VENTAS_FIELDS, ventas_rows):
-            return {'ok': False, 'mensaje': 'Fallo al guardar la venta.'}
-        # decrementar stock y guardar productos
-        prod['stock'] = prod['stock'] - cantidad
-        prod_rows = [{k: str(p[k]) for k in PRODUCTOS_FIELDS} for p in productos]
-        _escribir_csv(PRODUCTOS_FILE, PRODUCTOS_FIELDS, prod_rows)
-        return {'ok': True, 'mensaje': f'Venta registrada (id {idv}).'}
-    except Exception as e:
-        print(f"[negocio] ERROR registrar_venta: {e}")
-        return {'ok': False, 'mensaje': 'Error interno al registrar venta.'}
 
-def calcular_total_venta(items):
+    def __init__(self, filepath):
+        self._filepath = filepath
+        self._hilo = threading.RLock()
+        self._fd = None
+        self._pid = None
+        self._nivel = 0
+
+    @property
+    def filepath(self):
+        return _ruta(self._filepath)
+
+    def __enter__(self):
+        self._hilo.acquire()
+        try:
+            if self._nivel == 0:
+                self._tomar()
+        except BaseException:
+            self._hilo.release()
+            raise
+        self._nivel += 1
+        return self
+
+    def __exit__(self, *exc):
+        self._nivel -= 1
+        try:
+            if self._nivel == 0:
+                _desbloquear(self._fd)
+        finally:
+            self._hilo.release()
+
+    def _tomar(self):
+        if self._pid != os.getpid():
+            # proceso hijo (fork): el descriptor heredado comparte el bloqueo con el padre
+            self._fd = None
+            self._pid = os.getpid()
+        if self._fd is None:
+            self.filepath.parent.mkdir(parents=True, exist_ok=True)
+            self._fd = os.open(str(self.filepath), os.O_RDWR | os.O_CREAT, 0o666)
+        t0 = time.perf_counter_ns()
+        if not _bloquear(self._fd, esperar=False):
+            if _metricas.activas:
+                _metricas.sumar('bloqueo.contendidos')
+            _bloquear(self._fd, esperar=True)
+        if _metricas.activas:
+            _metricas.llamada('espera_bloqueo', time.perf_counter_ns() - t0)
+
+    def cerrar(self):
+        with self._hilo:
+            if self._fd is not None and self._nivel == 0:
+                os.close(self._fd)
+                self._fd = None
+
+_bloqueo = _Bloqueo(lambda: _rutas.bloqueo)
+
+def _con_reintentos(intento):
     """
-    items: lista de dicts {'id_producto': int, 'cantidad': int, 'precio_unitario': float}
-    Retorna float total.
+    Concurrencia optimista: intento() lee sin bloqueo, prepara el cambio y lo confirma bajo el
+    bloqueo sólo si la versión leída sigue vigente. Retorna (hecho, resultado); si otra terminal
+    ganó la carrera (hecho=False) se reintenta con espera exponencial y algo de azar.
     """
-    total = 0.0
-    try:
-        for it in items:
-            c = int(it.get('cantidad', 0) or 0)
-            pu = float(it.get('precio_unitario', 0) or 0)
-            total += c * pu
-    except Exception:
-        return 0.0
-    return round(total, 2)
+    for n in range(REINTENTOS_OPTIMISTAS):
+        hecho, resultado = intento()
+        if hecho:
+            return resultado
+        if _metricas.activas:
+            _metricas.sumar('conflictos_version')
+        time.sleep(ESPERA_REINTENTO_S * (2 ** n) * random.uniform(0.5, 1.5))
+    print(f"[negocio] ERROR: cambio descartado tras {REINTENTOS_OPTIMISTAS} conflictos de versión")
+    return False
 
-def productos_mas_vendidos(top_n=10):
-    ventas = listar_ventas()
-    conteo = defaultdict(int)
-    for v in ventas:
+def _conflicto(id_producto, actual, esperada):
+    """Actualización rechazada: quien llama editó una versión vieja del producto."""
+    if _metricas.activas:
+        _metricas.sumar('conflictos_version')
+    print(f"[negocio] conflicto: el producto {id_producto} cambió (versión {actual}, se editó la {esperada})")
+    return False
+
+class _Secuencias:
+    """
+    Próximos ids guardados en un JSON pequeño (SECUENCIAS_FILE) para no recorrer
+    todo el historial en cada alta. Los ids nunca se reutilizan, aunque se borren filas.
+    """
+
+    def __init__(self, filepath: Path):
+        self._filepath = filepath
+        self._valores = None
+
+    @property
+    def filepath(self):
+        return _ruta(self._filepath)
+
+    def _cargar(self):
+        if self._valores is None:
+            try:
+                with self.filepath.open('r', encoding='utf-8') as f:
+                    self._valores = {k: int(v) for k, v in json.load(f).items()}
+            except FileNotFoundError:
+                self._valores = {}
+            except Exception as e:
+                print(f"[negocio] ADVERTENCIA: secuencias ilegibles, se recalculan: {e}")
+                self._valores = {}
+        return self._valores
+
+    def _guardar(self):
+        _escribir_json_atomico(self.filepath, self._valores)
+
+    def tomar(self, nombre, minimo, semilla, cantidad=1):
+        """
+        Reserva `cantidad` ids consecutivos de la secuencia `nombre` y retorna el primero.
+        minimo: cota barata (p.ej. último id en disco + 1) que cubre altas hechas por fuera.
+        semilla(): cálculo completo, sólo se usa si la secuencia aún no existe.
+        """
+        self._valores = None  # otra terminal pudo avanzarla: se relee (se llama bajo el bloqueo)
+        valores = self._cargar()
+        actual = valores.get(nombre)
+        if actual is None:
+            actual = semilla()
+        actual = max(int(actual), int(minimo))
+        valores[nombre] = actual + cantidad
+        self._guardar()
+        return actual
+
+_secuencias = _Secuencias(lambda: _rutas.secuencias)
+
+# -------------------------
+# Fechas
+# -------------------------
+_EPOCA = datetime(1970, 1, 1)
+# formatos heredados (el ventas.csv de ejemplo usa DD/MM/YYYY); ISO se prueba primero
+_FORMATOS_FECHA = ('%d/%m/%Y', '%d/%m/%Y %H:%M', '%d/%m/%Y %H:%M:%S', '%d-%m-%Y', '%Y/%m/%d')
+
+@lru_cache(maxsize=4096)
+def _parsear_fecha(texto):
+    """datetime (sin zona) de una fecha ISO o en formato heredado; None si no se reconoce."""
+    texto = (texto or '').strip()
+    if not texto:
+        return None
+    try:
+        return datetime.fromisoformat(texto).replace(tzinfo=None)
+    except ValueError:
+        pass
+    for fmt in _FORMATOS_FECHA:
         try:
-            conteo[int(v['id_producto'])] += int(v['cantidad'])
-        except Exception:
+            return datetime.strptime(texto, fmt)
+        except ValueError:
             continue
-    orden = sorted(conteo.items(), key=lambda x: x[1], reverse=True)
-    return orden[:top_n]
+    return None
 
-def generar_reporte_ventas(fecha_inicio=None, fecha_fin=None):
+def _timestamp(texto):
+    """Segundos desde 1970 (hora local, sin zona) de la fecha, o None: clave ordenable única."""
+    dt = _parsear_fecha(texto)
+    return None if dt is None else int((dt - _EPOCA).total_seconds())
+
+def _normalizar_fecha(texto=None):
+    """Fecha a guardar: ISO YYYY-MM-DDTHH:MM:SS (ahora si no viene). ValueError si no se reconoce."""
+    if not texto:
+        return datetime.now().isoformat(timespec='seconds')
+    dt = _parsear_fecha(str(texto))
+    if dt is None:
+        raise ValueError(f"fecha no reconocida: {texto!r}")
+    return dt.isoformat(timespec='seconds')
+
+def _rango_timestamps(fecha_inicio=None, fecha_fin=None):
     """
-    Genera resumen simple: ventas totales y cantidad por producto entre fechas (ISO strings or None).
-    Retorna dict con resumen.
+    Convierte los límites de un reporte a timestamps (una sola vez por reporte).
+    Un fecha_fin sin hora incluye todo ese día. ValueError si alguna no se reconoce.
     """
-    ventas = listar_ventas()
-    total = 0.0
-    conteo = defaultdict(int)
+    lo, hi = None, None
+    if fecha_inicio:
+        lo = _timestamp(fecha_inicio)
+        if lo is None:
+            raise ValueError(f"fecha_inicio no reconocida: {fecha_inicio!r}")
+    if fecha_fin:
+        hi = _timestamp(fecha_fin)
+        if hi is None:
+            raise ValueError(f"fecha_fin no reconocida: {fecha_fin!r}")
+        if ':' not in str(fecha_fin):
+            hi += 86399
+    return lo, hi
+
+# -------------------------
+# Segmentos de ventas
+# -------------------------
+def _particionado():
+    return _rutas.ventas_dir.is_dir()
+
+def _segmentos_ventas():
+    """
+    Archivos que forman el historial de ventas, en orden: ventas.csv (histórico sin particionar,
+    queda sólo con la cabecera tras migrar) y luego data/ventas/YYYY-MM.csv.
+    """
+    segmentos = [_rutas.ventas]
+    if _particionado():
+        segmentos.extend(sorted(_rutas.ventas_dir.glob('*.csv')))
+    return segmentos
+
+def _segmento_para(fecha):
+    """Archivo donde se anexa una venta: la partición de su mes (o ventas.csv sin particionar)."""
+    if not _particionado():
+        return _rutas.ventas
+    dt = _parsear_fecha(fecha)
+    return _rutas.ventas_dir / (f"{dt:%Y-%m}.csv" if dt is not None else 'sin-fecha.csv')
+
+def _clave_segmento(segmento: Path):
+    return segmento.relative_to(_rutas.datos).as_posix()
+
+def _segmento_en_rango(segmento: Path, lo=None, hi=None):
+    """Poda de particiones: False si el mes del archivo no se cruza con [lo, hi]."""
+    if segmento == _rutas.ventas:
+        return True  # sin particionar: decide su índice de fechas
+    try:
+        inicio = datetime.strptime(segmento.stem, '%Y-%m')
+    except ValueError:
+        # sin-fecha: sólo cuenta cuando no hay rango
+        return lo is None and hi is None
+    fin = (inicio.replace(day=28) + timedelta(days=4)).replace(day=1)
+    t0 = int((inicio - _EPOCA).total_seconds())
+    t1 = int((fin - _EPOCA).total_seconds()) - 1
+    return (lo is None or t1 >= lo) and (hi is None or t0 <= hi)
+
+def _agrupar_por_segmento(ventas):
+    """[(archivo, [ventas...]), ...] conservando el orden de llegada."""
+    grupos = {}
     for v in ventas:
+        grupos.setdefault(_segmento_para(v.get('fecha')), []).append(v)
+    return list(grupos.items())
+
+# -------------------------
+# Catálogo en memoria
+# -------------------------
+def _producto_desde_fila(r):
+    return {
+        'id': int(r.get('id', 0)),
+        'nombre': r.get('nombre', '') or '',
+        'categoria': r.get('categoria', '') or '',
+        'precio_unitario': float(r.get('precio_unitario', 0) or 0),
+        'stock': int(r.get('stock', 0) or 0),
+        'unidad': r.get('unidad', '') or '',
+        'version': int(r.get('version', 0) or 0)
+    }
+
+def _siguiente_id_productos(productos):
+    ids = [p['id'] for p in productos if isinstance(p.get('id'), int)]
+    return (max(ids) + 1) if ids else 1
+
+def _normalizar_texto(texto):
+    """Minúsculas sin tildes ni diéresis: 'Acoplé Ñandú' -> 'acople nandu'."""
+    texto = str(texto)
+    if texto.isascii():
+        return texto.lower()
+    descompuesto = unicodedata.normalize('NFKD', str(texto))
+    return ''.join(c for c in descompuesto if not unicodedata.combining(c)).casefold()
+
+_PALABRA = re.compile(r'\w+')
+
+def _tokens_de(texto):
+    return _PALABRA.findall(_normalizar_texto(texto))
+
+def _trigramas(token):
+    return {token[i:i + 3] for i in range(len(token) - 2)}
+
+class _IndiceBusqueda:
+    """
+    Índice en memoria para buscar productos mientras se escribe, por nombre, categoría o id.
+    - Textos normalizados (sin tildes, minúsculas) y partidos en palabras.
+    - Prefijos: lista ordenada de palabras + bisect ('aco' encuentra 'acople').
+    - Trigramas de cada palabra para coincidencias en medio de la palabra ('ople' -> 'acople');
+      esa parte se arma recién con la primera búsqueda que la necesita.
+    Se actualiza por producto (agregar / quitar) sin reconstruir el resto.
+    """
+
+    def __init__(self):
+        self._palabras_de = {}  # id -> palabras indexadas
+        self._nombre_de = {}  # id -> nombre normalizado (para ordenar resultados)
+        self._ids_por_palabra = defaultdict(set)
+        self._palabras = []  # ordenadas, sin repetir
+        self._ids_por_trigrama = None
+
+    def reconstruir(self, productos):
+        self.__init__()
+        for p in productos:
+            self._indexar(p, ordenar=False)
+        self._palabras = sorted(self._ids_por_palabra)
+
+    def agregar(self, producto):
+        pid = int(producto['id'])
+        self.quitar(pid)
+        self._indexar(producto)
+
+    def _indexar(self, producto, ordenar=True):
+        pid = int(producto['id'])
+        nombre = _normalizar_texto(producto.get('nombre', ''))
+        palabras = set(_PALABRA.findall(nombre)) | set(_tokens_de(producto.get('categoria', '')))
+        palabras.add(str(pid))
+        self._palabras_de[pid] = palabras
+        self._nombre_de[pid] = nombre
+        for palabra in palabras:
+            ids = self._ids_por_palabra[palabra]
+            if not ids and ordenar:
+                bisect.insort(self._palabras, palabra)
+            ids.add(pid)
+            if self._ids_por_trigrama is not None:
+                for tri in _trigramas(palabra):
+                    self._ids_por_trigrama[tri].add(pid)
+
+    def quitar(self, pid):
+        palabras = self._palabras_de.pop(pid, None)
+        if palabras is None:
+            return
+        del self._nombre_de[pid]
+        for palabra in palabras:
+            ids = self._ids_por_palabra[palabra]
+            ids.discard(pid)
+            if not ids:
+                del self._ids_por_palabra[palabra]
+                i = bisect.bisect_left(self._palabras, palabra)
+                del self._palabras[i]
+            if self._ids_por_trigrama is None:
+                continue
+            for tri in _trigramas(palabra):
+                # otra palabra del producto puede compartir el trigrama
+                if not any(tri in p for p in palabras if p != palabra and len(p) >= 3):
+                    ids_tri = self._ids_por_trigrama[tri]
+                    ids_tri.discard(pid)
+                    if not ids_tri:
+                        del self._ids_por_trigrama[tri]
+
+    def _por_prefijo(self, q):
+        ids = set()
+        i = bisect.bisect_left(self._palabras, q)
+        while i < len(self._palabras) and self._palabras[i].startswith(q):
+            ids |= self._ids_por_palabra[self._palabras[i]]
+            i += 1
+        return ids
+
+    def _por_trigramas(self, q):
+        tris = _trigramas(q)
+        if not tris:
+            return set()
+        if self._ids_por_trigrama is None:
+            self._ids_por_trigrama = defaultdict(set)
+            for palabra, ids in self._ids_por_palabra.items():
+                for tri in _trigramas(palabra):
+                    self._ids_por_trigrama[tri] |= ids
+        conjuntos = sorted((self._ids_por_trigrama.get(t, set()) for t in tris), key=len)
+        ids = set(conjuntos[0])
+        for c in conjuntos[1:]:
+            ids &= c
+        # los trigramas pueden venir de palabras distintas: confirmar la subcadena
+        return {pid for pid in ids if any(q in p for p in self._palabras_de[pid])}
+
+    def buscar(self, consulta, limite=20):
+        """Ids de los productos que contienen todas las palabras de la consulta, mejores primero."""
+        qs = _tokens_de(consulta)
+        if not qs:
+            return []
+        candidatos = None
+        exactos = set()
+        for q in qs:
+            por_prefijo = self._por_prefijo(q)
+            ids = por_prefijo | (self._por_trigramas(q) if len(q) >= 3 else set())
+            exactos = por_prefijo if candidatos is None else exactos & por_prefijo
+            candidatos = ids if candidatos is None else candidatos & ids
+            if not candidatos:
+                return []
+        frase = ' '.join(qs)
+        def orden(pid):
+            nombre = self._nombre_de[pid]
+            return (
+                str(pid) != frase,  # id exacto primero
+                not nombre.startswith(frase),  # luego nombres que empiezan con lo escrito
+                pid not in exactos,  # palabras que empiezan con lo escrito antes que subcadenas
+                nombre,
+                pid
+            )
+        return heapq.nsmallest(limite, candidatos, key=orden)
+
+class ProductoStore:
+    """
+    Catálogo de productos en memoria, indexado por id.
+    - Carga productos.csv una vez y sólo lo vuelve a leer si su mtime/tamaño cambian
+      (edición externa del archivo).
+    - Los cambios llegan ya anotados en el journal (aplicar) y se vuelcan al CSV con
+      una escritura atómica en el siguiente checkpoint (guardar).
+    - Las consultas devuelven copias, así quien llama no altera el caché por accidente.
+    - Mantiene el índice de búsqueda (buscar) al día con cada alta, cambio y baja; se arma
+      con la primera búsqueda.
+    - En frío toma el catálogo del snapshot binario si sigue vigente para productos.csv.
+    """
+
+    def __init__(self, filepath: Path):
+        self._filepath = filepath
+        self._por_id = {}
+        self._siguiente = 1
+        self._firma = None
+        self._sucio = False
+        self._indice = None
+
+    @property
+    def filepath(self):
+        return _ruta(self._filepath)
+
+    def _firma_archivo(self):
         try:
-            fecha = v.get('fecha')
-            if fecha_inicio or fecha_fin:
-                # comparar como strings ISO si vienen; intentar parseo
-                if fecha:
-                    try:
-                        fdt = datetime.fromisoformat(fecha)
-                    except Exception:
-                        continue
-                    if fecha_inicio:
-                        fi = datetime.fromisoformat(fecha_inicio)
-                        if fdt < fi:
-                            continue
-                    if fecha_fin:
-                        ff = datetime.fromisoformat(fecha_fin)
-                        if fdt > ff:
-                            continue
-            # acumular
-            total += float(v.get('precio_unitario_venta', 0)) * int(v.get('cantidad', 0))
-            conteo[int(v.get('id_producto', 0))] += int(v.get('cantidad', 0))
-        except Exception:
-            continue
-    return {'total_ventas': round(total, 2), 'por_producto': dict(conteo)}
+            st = self.filepath.stat()
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def _sincronizar(self):
+        if self._sucio:
+            return  # hay cambios sin checkpoint: manda la memoria
+        firma = self._firma_archivo()
+        vigente = firma is not None and firma == self._firma
+        if _metricas.activas:
+            _metricas.cache('productos', vigente)
+        if vigente:
+            return
+        por_id = None
+        if self._firma is None and firma is not None:
+            # arranque: el snapshot sirve si se escribió con este mismo productos.csv
+            por_id = self._desde_snapshot(firma)
+            if _metricas.activas:
+                _metricas.cache('snapshot', por_id is not None)
+        if por_id is None:
+            por_id = {}
+            for r in _leer_csv(self.filepath, PRODUCTOS_FIELDS):
+                try:
+                    prod = _producto_desde_fila(r)
+                except Exception:
+                    # Ignorar fila corrupta pero no crashear
+                    continue
+                por_id[prod['id']] = prod
+            firma = self._firma_archivo()
+        self._por_id = por_id
+        self._indice = None
+        self._siguiente = _siguiente_id_productos(por_id.values())
+        self._firma = firma
+
+    def _desde_snapshot(self, firma):
+        datos = _snapshot().get('productos')
+        if not datos or tuple(datos['firma']) != firma:
+            return None
+        try:
+            ids, precios, stocks, versiones = array('q'), array('d'), array('q'), array('q')
+            ids.frombytes(datos['id'])
+            precios.frombytes(datos['precio'])
+            stocks.frombytes(datos['stock'])
+            versiones.frombytes(datos['version'])
+            return {pid: {'id': pid, 'nombre': nombre, 'categoria': categoria, 'precio_unitario': precio,
+                          'stock': stock, 'unidad': unidad, 'version': version}
+                    for pid, nombre, categoria, precio, stock, unidad, version
+                    in zip(ids, datos['nombre'], datos['categoria'], precios, stocks, datos['unidad'], versiones)}
+        except Exception as e:
+            print(f"[negocio] ADVERTENCIA: snapshot de productos ilegible: {e}")
+            return None
+
+    def columnas(self):
+        """Catálogo en columnas para el snapshot, o None si hay cambios sin guardar en productos.csv."""
+        if self._sucio or self._firma is None:
+            return None
+        prods = list(self._por_id.values())
+        return {
+            'firma': self._firma,
+            'id': array('q', (p['id'] for p in prods)).tobytes(),
+            'nombre': tuple(p['nombre'] for p in prods),
+            'categoria': tuple(p['categoria'] for p in prods),
+            'precio': array('d', (p['precio_unitario'] for p in prods)).tobytes(),
+            'stock': array('q', (p['stock'] for p in prods)).tobytes(),
+            'unidad': tuple(p['unidad'] for p in prods),
+            'version': array('q', (p['version'] for p in prods)).tobytes(),
+        }
+
+    @property
+    def sucio(self):
+        return self._sucio
+
+    def guardar(self):
+        rows = [{k: str(p[k]) for k in PRODUCTOS_FIELDS} for p in self._por_id.values()]
+        ok = _escribir_csv_atomico(self.filepath, PRODUCTOS_FIELDS, rows)
+        if ok:
+            # lo escrito por nosotros no debe forzar una recarga
+            self._firma = self._firma_archivo()
+            self._sucio = False
+        return ok
+
+    def descartar(self):
+        """Olvida lo que hay en memoria: otro proceso ya dejó productos.csv al día."""
+        self._sucio = False
+        self._firma = None
+
+    def listar(self):
+        self._sincronizar()
+        return [dict(p) for p in self._por_id.values()]
+
+    def obtener(self, id_producto):
+        self._sincronizar()
+        prod = self._por_id.get(int(id_producto))
+        return dict(prod) if prod is not None else None
+
+    def buscar(self, consulta, limite=20):
+        self._sincronizar()
+        if self._indice is None:
+            self._indice = _IndiceBusqueda()
+            self._indice.reconstruir(self._por_id.values())
+        return [dict(self._por_id[pid]) for pid in self._indice.buscar(consulta, limite)]
+
+    def siguiente_id(self):
+        """Mayor id cargado + 1, mantenido incrementalmente (O(1))."""
+        self._sincronizar()
+        return self._siguiente
+
+    def aplicar(self, productos=(), eliminados=()):
+        """Aplica en memoria filas completas (altas/cambios) y bajas por id; quedan pendientes de guardar()."""
+        self._sincronizar()
+        for p in productos:
+            prod = _producto_desde_fila(p)
+            anterior = self._por_id.get(prod['id'])
+            self._por_id[prod['id']] = prod
+            if self._indice is not None and (anterior is None or anterior['nombre'] != prod['nombre']
+                                             or anterior['categoria'] != prod['categoria']):
+                self._indice.agregar(prod)  # un cambio de stock no toca el índice
+            self._siguiente = max(self._siguiente, prod['id'] + 1)
+        for id_producto in eliminados:
+            self._por_id.pop(int(id_producto), None)
+            if self._indice is not None:
+                self._indice.quitar(int(id_producto))
+        if productos or eliminados:
+            self._sucio = True
+
+_productos = ProductoStore(lambda: _rutas.productos)
+
+# -------------------------
+# Journal y checkpoints (ver negocio_journal.py)
+# -------------------------
+_journal = negocio_journal.Journal(lambda: _rutas.journal)
+
+def _confirmar(ventas=(), productos=(), eliminados=()):
+    """
+    Anota el cambio en el journal, lo aplica en memoria y hace checkpoint si toca el grupo.
+    Se llama bajo _bloqueo, después de _journal.al_dia() y de validar contra ese estado.
+    """
+    entrada = {'ventas': list(ventas), 'productos': list(productos), 'eliminados': list(eliminados)}
+    if not _journal.registrar(entrada):
+        return False
+    _productos.aplicar(entrada['productos'], entrada['eliminados'])
+    _journal.ventas_pendientes.extend(dict(v) for v in entrada['ventas'])
+    _agregados.sumar(entrada['ventas'])
+    if _journal.debe_confirmar():
+        # si falla, el cambio sigue en el journal y se reintenta en el próximo checkpoint
+        _journal.checkpoint()
+    return True
+
+def _sincronizar_csv(forzar=True):
+    """
+    Checkpoint del journal: deja ventas.csv y productos.csv al día en disco.
+    forzar=False sólo lo hace si se cumplió el lote o la ventana de tiempo.
+    Retorna True si no quedan cambios pendientes.
+    """
+    if forzar or _journal.debe_confirmar():
+        return _journal.checkpoint()
+    return not _journal.ventas_pendientes and not _productos.sucio
+
+# -------------------------
+# Ventas en CSV: agregados (ver negocio_agregados.py) e índices de fechas
+# -------------------------
+def _venta_desde_fila(r):
+    return {
+        'id_venta': int(r.get('id_venta', 0)),
+        'fecha': r.get('fecha', ''),
+        'id_producto': int(r.get('id_producto', 0)),
+        'cantidad': int(r.get('cantidad', 0)),
+        'precio_unitario_venta': float(r.get('precio_unitario_venta', 0) or 0),
+        'forma_pago': r.get('forma_pago', '')
+    }
+
+def _iter_segmento(segmento: Path, id_producto=None):
+    """
+    Ventas de un archivo en el orden del archivo, fila por fila (memoria constante).
+    Con id_producto descarta las demás filas antes de convertirlas.
+    """
+    if not _asegurar_archivo(segmento, VENTAS_FIELDS):
+        return
+    with segmento.open('r', newline='', encoding='utf-8', errors='replace') as f:
+        reader = csv.reader(f)
+        next(reader, None)  # cabecera
+        try:
+            for campos in reader:
+                try:
+                    if id_producto is not None and int(campos[2]) != id_producto:
+                        continue
+                    yield _venta_desde_fila(dict(zip(VENTAS_FIELDS, campos)))
+                except Exception:
+                    # Ignorar fila corrupta pero no crashear
+                    continue
+        finally:
+            if _metricas.activas:
+                _metricas.lectura(max(reader.line_num - 1, 0))
+
+def _segmento_hacia_atras(segmento: Path):
+    """Ventas de un archivo desde el final hacia el inicio, leyendo por bloques."""
+    try:
+        f = segmento.open('rb')
+    except FileNotFoundError:
+        return
+    filas = 0
+    with f:
+        try:
+            for offset, linea in _lineas_hacia_atras(f):
+                if offset == 0:
+                    break  # cabecera
+                filas += 1
+                try:
+                    campos = next(csv.reader([linea.decode('utf-8', errors='replace')]))
+                    if len(campos) != len(VENTAS_FIELDS):
+                        continue  # línea cortada
+                    yield _venta_desde_fila(dict(zip(VENTAS_FIELDS, campos)))
+                except Exception:
+                    continue
+        finally:
+            if _metricas.activas:
+                _metricas.lectura(filas)
+
+def _pendientes_sin_anexar():
+    """
+    Copias de las ventas que esperan checkpoint, sin las que el checkpoint de otra terminal
+    ya anexó a los archivos (ventana entre su anexo y el vaciado del journal).
+    """
+    if not _journal.ventas_pendientes:
+        return []
+    ultimo = _ultimo_id_venta_archivo()
+    return [dict(v) for v in _journal.ventas_pendientes if v['id_venta'] > ultimo]
+
+def _iter_ventas_csv(lo=None, hi=None, id_producto=None):
+    """Ventas de todos los archivos (ventas.csv y particiones) más las que esperan el próximo checkpoint."""
+    if lo is not None or hi is not None:
+        for v in _ventas_en_rango(lo, hi):
+            if id_producto is None or v['id_producto'] == id_producto:
+                yield v
+        return
+    pendientes = [v for v in _pendientes_sin_anexar()
+                  if id_producto is None or v['id_producto'] == id_producto]
+    for segmento in _segmentos_ventas():
+        yield from _iter_segmento(segmento, id_producto)
+    yield from pendientes
+
+def _ultimas_ventas_csv(n):
+    """Las n ventas de id más alto, de la más nueva a la más vieja, leyendo sólo el final de cada archivo."""
+    pendientes = sorted(_pendientes_sin_anexar(), key=lambda v: -v['id_venta'])
+    archivos = [_segmento_hacia_atras(s) for s in _segmentos_ventas()]
+    try:
+        return list(islice(heapq.merge(pendientes, *archivos, key=lambda v: -v['id_venta']), n))
+    finally:
+        for g in archivos:
+            g.close()
+
+def _segmentos_con_altas():
+    """Archivos donde se anexan las ventas nuevas: ventas.csv y la partición más reciente."""
+    segmentos = _segmentos_ventas()
+    return list(dict.fromkeys((segmentos[0], segmentos[-1])))
+
+def _marca_final(segmento: Path):
+    """[inode, offset tras la última línea completa, id de esa línea] del archivo, o None si no existe."""
+    try:
+        with segmento.open('rb') as f:
+            st = os.fstat(f.fileno())
+            fin, ultimo = st.st_size, 0
+            if fin:
+                f.seek(fin - 1)
+                completa = f.read(1) == b'\n'
+                for inicio, linea in _lineas_hacia_atras(f, fin=st.st_size):
+                    if not completa:
+                        fin, completa = inicio, True  # escritura en curso: se lee la próxima vez
+                        continue
+                    try:
+                        ultimo = int(next(csv.reader([linea.decode('utf-8', errors='replace')]))[0])
+                    except (ValueError, IndexError, StopIteration):
+                        ultimo = 0  # cabecera
+                    break
+            return [st.st_ino, fin, ultimo]
+    except FileNotFoundError:
+        return None
+
+def _top_unidades(pares, n):
+    """
+    Top-n de (id_producto, unidades) por unidades; a igual cantidad, el id menor primero. Orden
+    fijo: no depende de cómo se armó el conteo (agregados, archivo compactado, otro motor).
+    """
+    return heapq.nlargest(n, pares, key=lambda x: (x[1], -x[0]))
+
+_agregados = negocio_agregados.Agregados(lambda: _rutas.agregados)
+
+# -------------------------
+# Archivo de ventas viejas (ver negocio_archivo.py)
+# -------------------------
+# compactar_ventas() sin fecha deja vivo este último tramo del historial
+DIAS_VIVOS = 365
+
+_archivo = negocio_archivo.Archivo(lambda: _rutas.archivo)
+
+# -------------------------
+# Snapshot binario (arranque en frío)
+# -------------------------
+# negocio.snap: cabecera struct (magia, versión) + diccionario marshal con el catálogo y los
+# agregados en columnas (array empaquetado / tuplas). Cada parte se valida contra su CSV
+# (mtime/tamaño de productos.csv, offsets de los archivos de ventas) y si no coincide se
+# ignora y se lee como siempre. Se reescribe al salir.
+_SNAPSHOT_CABECERA = struct.Struct('<4sI')
+_SNAPSHOT_MAGIA = b'NSNP'
+_SNAPSHOT_VERSION = 2
+_snapshot_leido = None
+
+def _snapshot():
+    """Contenido del snapshot (se lee una vez por proceso); {} si no hay uno utilizable."""
+    global _snapshot_leido
+    if _snapshot_leido is None:
+        _snapshot_leido = {}
+        try:
+            datos = _rutas.snapshot.read_bytes()
+            if _metricas.activas:
+                _metricas.lectura(0, len(datos))
+            magia, version = _SNAPSHOT_CABECERA.unpack_from(datos)
+            if magia == _SNAPSHOT_MAGIA and version == _SNAPSHOT_VERSION:
+                contenido = marshal.loads(datos[_SNAPSHOT_CABECERA.size:])
+                if contenido.get('orden') == sys.byteorder:
+                    _snapshot_leido = contenido
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"[negocio] ADVERTENCIA: snapshot ilegible, se ignora: {e}")
+    return _snapshot_leido
+
+def _guardar_snapshot():
+    """Escribe el snapshot con lo que ya está al día en disco. Retorna True/False."""
+    contenido = {'orden': sys.byteorder}
+    for nombre, columnas in (('productos', _productos.columnas()), ('agregados', _agregados.columnas())):
+        if columnas is not None:
+            contenido[nombre] = columnas
+    if len(contenido) == 1:
+        return True  # nada cargado en este proceso: se deja el snapshot anterior
+    tmp = _rutas.snapshot.with_name(_rutas.snapshot.name + '.tmp')
+    try:
+        with tmp.open('wb') as f:
+            f.write(_SNAPSHOT_CABECERA.pack(_SNAPSHOT_MAGIA, _SNAPSHOT_VERSION))
+            f.write(marshal.dumps(contenido))
+            if _metricas.activas:
+                _metricas.escritura(f.tell())
+        os.replace(tmp, _rutas.snapshot)
+        return True
+    except Exception as e:
+        print(f"[negocio] ERROR al guardar snapshot: {e}")
+        return False
+
+# índice de fechas de cada archivo de ventas (ver negocio_indice.py)
+_indices_fechas = {}
+
+def _indice_de(segmento: Path):
+    indice = _indices_fechas.get(segmento)
+    if indice is None:
+        indice = _indices_fechas[segmento] = negocio_indice.IndiceFechas(segmento)
+    return indice
+
+def _ventas_en_rango(lo=None, hi=None):
+    """
+    Genera las ventas con lo <= timestamp(fecha) <= hi: sólo abre los archivos cuyo mes se
+    cruza con el rango y de ellos lee sólo las filas que indica su índice.
+    """
+    for segmento in _segmentos_ventas():
+        if not _segmento_en_rango(segmento, lo, hi):
+            continue
+        offsets = _indice_de(segmento).offsets_en_rango(lo, hi)
+        if not offsets:
+            continue
+        if _metricas.activas:
+            _metricas.lectura(len(offsets))
+        with segmento.open('rb') as f:
+            for off in offsets:
+                f.seek(off)
+                texto = f.readline().decode('utf-8', errors='replace').rstrip('\r\n')
+                try:
+                    yield _venta_desde_fila(dict(zip(VENTAS_FIELDS, next(csv.reader([texto])))))
+                except Exception:
+                    continue
+    for v in _pendientes_sin_anexar():
+        t = _timestamp(v.get('fecha'))
+        if t is not None and (lo is None or t >= lo) and (hi is None or t <= hi):
+            yield v
+
+def _siguiente_id_venta(ventas):
+    return max((v['id_venta'] for v in ventas), default=0) + 1
+
+def _ultimo_id_venta_archivo():
+    """
+    Mayor id_venta al final de ventas.csv y de la partición más reciente (lee sólo el final
+    de cada archivo) o entre las archivadas. Las ventas con fecha pasada en particiones viejas
+    las cubre la secuencia.
+    """
+    segmentos = _segmentos_ventas()
+    ultimo = _archivo.ultimo_id()  # si lo vivo quedó vacío tras compactar, no reusar ids archivados
+    for segmento in {segmentos[0], segmentos[-1]}:
+        for linea in reversed(_lineas_finales(segmento, 8)):
+            try:
+                ultimo = max(ultimo, int(next(csv.reader([linea]))[0]))
+                break
+            except (ValueError, IndexError, StopIteration):
+                continue
+    return ultimo
+
+def _tomar_ids_venta(cantidad=1):
+    """Reserva `cantidad` id_venta consecutivos y retorna el primero."""
+    return _secuencias.tomar('id_venta', _ultimo_id_venta_archivo() + 1,
+                             lambda: _siguiente_id_venta(_iter_ventas_csv()), cantidad)
+
+# -------------------------
+# Motores de almacenamiento
+# -------------------------
+def _preparar_lineas(lineas, obtener):
+    """
+    Validación común a todos los motores para registrar un ticket: producto existente,
+    cantidad > 0 y stock suficiente sumando líneas repetidas del mismo producto.
+    obtener(id_producto) -> dict | None lee el catálogo del motor (dentro de su transacción).
+    Retorna (items, prods, None) con prods ya descontados, o (None, None, mensaje de error).
+    """
+    if not lineas:
+        return None, None, 'La venta no tiene productos.'
+    prods = {}
+    pedidas = defaultdict(int)
+    items = []
+    for it in lineas:
+        pid = int(it.get('id_producto'))
+        if pid not in prods:
+            prods[pid] = obtener(pid)
+        prod = prods[pid]
+        if prod is None:
+            return None, None, f'Producto no encontrado (id {pid}).'
+        cantidad = int(it.get('cantidad', 0) or 0)
+        if cantidad <= 0:
+            return None, None, f'Cantidad inválida para {prod["nombre"]}.'
+        pedidas[pid] += cantidad
+        precio = it.get('precio_unitario')
+        items.append({
+            'id_producto': pid,
+            'cantidad': cantidad,
+            'precio_unitario': prod['precio_unitario'] if precio is None else float(precio)
+        })
+    for pid, cantidad in pedidas.items():
+        if prods[pid]['stock'] < cantidad:
+            return None, None, f'Stock insuficiente para {prods[pid]["nombre"]}. Disponible: {prods[pid]["stock"]}'
+    for pid, cantidad in pedidas.items():
+        prods[pid]['stock'] -= cantidad
+    return items, prods, None
+
+def _resolver_operaciones(operaciones, obtener):
+    """
+    Validación común a todos los motores para una transacción: aplica las operaciones en orden
+    sobre copias de los productos que tocan (cada una ve lo que dejaron las anteriores).
+    operaciones: ya normalizadas, ver aplicar_operaciones(). obtener(id) como en _preparar_lineas.
+    Retorna (plan, None, False) con plan = {'altas': [...], 'cambiados': {id: producto},
+    'eliminados': [ids], 'tickets': [(items, forma_pago, fecha), ...]}, o (None, mensaje,
+    conflicto) si algo no valida; conflicto=True si fue por una versión vieja.
+    """
+    trabajo = {}  # id -> producto (copia, con los cambios de la transacción) o None si se borró
+    guardadas = {}  # id -> versión guardada, antes de aplicar ninguna operación
+    def actual(pid):
+        if pid not in trabajo:
+            trabajo[pid] = obtener(pid)
+            if trabajo[pid] is not None:
+                guardadas[pid] = trabajo[pid].get('version', 0)
+        return trabajo[pid]
+    altas, tickets, tocados = [], [], []
+    for op in operaciones:
+        tipo = op[0]
+        if tipo == 'alta':
+            pid = op[1].get('id')
+            if pid is not None:
+                if pid <= 0 or pid in trabajo or actual(pid) is not None:
+                    return None, f'Ya existe un producto con id {pid}.', False
+                trabajo[pid] = None  # reservado: otra alta con el mismo id se rechaza
+            altas.append(op[1])
+        elif tipo == 'cambio':
+            _, pid, cambios, version = op
+            prod = actual(pid)
+            if prod is None:
+                return None, f'Producto no encontrado (id {pid}).', False
+            # siempre contra lo guardado: que otra operación de la transacción ya lo haya tocado
+            # (una venta, otro cambio) no vuelve válida una versión vieja
+            if version is not None and guardadas[pid] != int(version):
+                _conflicto(pid, guardadas[pid], version)
+                return None, f'El producto {pid} cambió en otra terminal.', True
+            prod.update(cambios)
+            tocados.append(pid)
+        elif tipo == 'baja':
+            if actual(op[1]) is None:
+                return None, f'Producto no encontrado (id {op[1]}).', False
+            trabajo[op[1]] = None
+        elif tipo == 'venta':
+            _, lineas, forma_pago, fecha = op
+            # _preparar_lineas descuenta el stock sobre las copias de trabajo
+            items, prods, error = _preparar_lineas(lineas, actual)
+            if error:
+                return None, error, False
+            tickets.append((items, forma_pago, fecha))
+            tocados.extend(prods)
+        else:
+            return None, f'Operación desconocida: {tipo!r}.', False
+    cambiados = {pid: trabajo[pid] for pid in dict.fromkeys(tocados) if trabajo[pid] is not None}
+    eliminados = [pid for pid, prod in trabajo.items() if prod is None and pid in guardadas]
+    return {'altas': altas, 'cambiados': cambiados, 'eliminados': eliminados, 'tickets': tickets}, None, False
+
+class Backend:
+    """
+    Motor de almacenamiento detrás de la API pública. Recibe datos ya normalizados (tipos
+    correctos, fecha ISO, rangos como timestamps) y deja pasar las excepciones: las funciones
+    públicas las atrapan y responden sin crashear.
+    Motores: 'csv' (negocio_csv.BackendCSV, por defecto) y 'sqlite' (negocio_sqlite.BackendSQLite).
+    """
+    nombre = ''
+
+    def listar_productos(self):
+        raise NotImplementedError
+
+    def obtener_producto(self, id_producto):
+        raise NotImplementedError
+
+    def agregar_producto(self, producto):
+        """producto: dict normalizado sin 'id' (lo asigna el motor). Retorna True/False."""
+        raise NotImplementedError
+
+    def actualizar_producto(self, id_producto, cambios, version=None):
+        """version: si se indica, sólo actualiza si el producto sigue en esa versión. Retorna True/False."""
+        raise NotImplementedError
+
+    def eliminar_producto(self, id_producto):
+        raise NotImplementedError
+
+    def iter_ventas(self, lo=None, hi=None, id_producto=None):
+        """Generador de ventas (lo <= timestamp <= hi, del producto indicado); None = sin filtro."""
+        raise NotImplementedError
+
+    def ultimas_ventas(self, n):
+        """Las n ventas más recientes (mayor id_venta primero)."""
+        raise NotImplementedError
+
+    def listar_ventas(self):
+        return list(self.iter_ventas())
+
+    def ventas_nuevas(self, cursor, n):
+        """
+        (ventas, cursor, recarga): las registradas después de `cursor` (la más nueva primero) o,
+        sin cursor o con más de n nuevas, las n más recientes con recarga=True.
+        """
+        ventas = self.ultimas_ventas(n)
+        desde = cursor.get('id') if isinstance(cursor, dict) else None
+        ultimo = ventas[0]['id_venta'] if ventas else (desde or 0)
+        if desde is None or (len(ventas) >= n and ventas[-1]['id_venta'] > desde):
+            return ventas, {'id': ultimo}, True
+        return [v for v in ventas if v['id_venta'] > desde], {'id': max(ultimo, desde)}, False
+
+    def buscar_productos(self, consulta, limite):
+        """Productos que coinciden con la consulta (nombre, categoría o id), mejores primero."""
+        raise NotImplementedError
+
+    def registrar_lineas(self, lineas, forma_pago, fecha):
+        """Registra un ticket todo o nada. Retorna dict {'ok', 'mensaje', 'ids', 'total'}."""
+        raise NotImplementedError
+
+    def aplicar_operaciones(self, operaciones):
+        """
+        Transacción: valida todas las operaciones juntas (_resolver_operaciones) y las guarda todas
+        o ninguna. Retorna dict {'ok', 'mensaje', 'conflicto', 'ids_productos', 'ids_ventas', 'total'}.
+        """
+        raise NotImplementedError
+
+    def reporte(self, lo=None, hi=None):
+        """(total, {id_producto: unidades}) de las ventas con lo <= timestamp <= hi (None = sin límite)."""
+        raise NotImplementedError
+
+    def mas_vendidos(self, top_n):
+        """Top-N histórico por unidades: [(id_producto, unidades), ...]."""
+        raise NotImplementedError
+
+    def reemplazar_todo(self, productos, ventas):
+        """Reemplaza catálogo y ventas completos (copiar_datos entre motores)."""
+        raise NotImplementedError
+
+    def compactar_ventas(self, corte):
+        """Archiva las ventas con timestamp < corte. Retorna dict {'ok', 'mensaje', 'archivadas'}."""
+        return {'ok': False, 'archivadas': 0,
+                'mensaje': f'El motor {self.nombre} no usa archivo de ventas (sus índices ya evitan leer todo).'}
+
+    def ventas_archivadas(self):
+        """Ventas que ya no están en el historial vivo (compactar_ventas), para copiar_datos."""
+        return iter(())
+
+    def firma_datos(self):
+        """
+        Valor que cambia cuando otro proceso (u otra mano) cambió los datos, para el caché de
+        consultas. None = el motor no puede saberlo y las consultas no se guardan.
+        """
+        return None
+
+    def sincronizar(self, forzar=True):
+        return True
+
+    def reconstruir_agregados(self):
+        return True
+
+    def cerrar(self):
+        pass
+
+# Motor en uso: variable de entorno NEGOCIO_BACKEND, si no {"backend": ...} en data/config.json, si no 'csv'
+BACKENDS = ('csv', 'sqlite')
+_backend_activo = None
+
+def _configuracion(clave, variable, defecto):
+    """Opción de configuración: variable de entorno, si no data/config.json, si no `defecto`."""
+    valor = os.environ.get(variable)
+    if not valor:
+        try:
+            with _rutas.config.open('r', encoding='utf-8') as f:
+                valor = json.load(f).get(clave)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"[negocio] ADVERTENCIA: {_rutas.config} ilegible: {e}")
+    return str(valor or defecto).strip().lower()
+
+def _nombre_backend_configurado():
+    return _configuracion('backend', 'NEGOCIO_BACKEND', 'csv')
+
+MODOS_REPORTES = ('columnar', 'indice', 'paralelo')
+
+@lru_cache(maxsize=None)
+def _modo_reportes_serie():
+    """Modo por defecto, en un solo proceso: columnar si hay NumPy, si no el índice de fechas."""
+    try:
+        import numpy  # noqa: F401
+        return 'columnar'
+    except ImportError:
+        return 'indice'
+
+@lru_cache(maxsize=None)
+def _modo_reportes():
+    """
+    Reportes por rango del motor CSV: 'columnar' (negocio_columnar, columnas en memoria),
+    'indice' (índice de fechas + lectura de las filas del rango) o 'paralelo' (negocio_paralelo,
+    los archivos del rango repartidos entre procesos). Por defecto columnar si hay NumPy.
+    """
+    defecto = _modo_reportes_serie()
+    modo = _configuracion('reportes', 'NEGOCIO_REPORTES', defecto)
+    if modo not in MODOS_REPORTES:
+        print(f"[negocio] ADVERTENCIA: modo de reportes desconocido {modo!r}, se usa {defecto!r}")
+        modo = defecto
+    return modo
+
+@lru_cache(maxsize=None)
+def _procesos_reportes():
+    """Procesos del modo paralelo: NEGOCIO_PROCESOS o {"procesos": N}, por defecto uno por núcleo."""
+    nucleos = os.cpu_count() or 1
+    valor = _configuracion('procesos', 'NEGOCIO_PROCESOS', nucleos)
+    try:
+        return max(1, int(valor))
+    except ValueError:
+        print(f"[negocio] ADVERTENCIA: cantidad de procesos inválida {valor!r}, se usan {nucleos}")
+        return nucleos
+
+def _rangos_de_bytes(segmentos, lo=None, hi=None):
+    """[(archivo, inicio, fin), ...]: bytes de cada archivo entre la primera y la última fila del rango."""
+    rangos = []
+    for segmento in segmentos:
+        limites = _indice_de(segmento).limites_en_rango(lo, hi)
+        if limites is not None:
+            rangos.append((segmento, *limites))
+    return rangos
+
+def _crear_backend(nombre):
+    _configurar_metricas()
+    if nombre == 'csv':
+        import negocio_csv
+        return negocio_csv.BackendCSV()
+    if nombre == 'sqlite':
+        import negocio_sqlite
+        return negocio_sqlite.BackendSQLite(_rutas.sqlite)
+    raise ValueError(f"motor desconocido: {nombre!r} (opciones: {', '.join(BACKENDS)})")
+
+def _backend():
+    global _backend_activo
+    if _backend_activo is None:
+        nombre = _nombre_backend_configurado()
+        try:
+            _backend_activo = _crear_backend(nombre)
+        except Exception as e:
+            print(f"[negocio] ERROR al iniciar motor {nombre!r}, se usa CSV: {e}")
+            import negocio_csv
+            _backend_activo = negocio_csv.BackendCSV()
+    return _backend_activo
+
+@_modifica
+def usar_backend(nombre):
+    """
+    Cambia el motor de almacenamiento en tiempo de ejecución ('csv' o 'sqlite').
+    Sincroniza y cierra el anterior. Retorna True/False.
+    """
+    global _backend_activo
+    try:
+        nuevo = _crear_backend(str(nombre).strip().lower())
+    except Exception as e:
+        print(f"[negocio] ERROR usar_backend: {e}")
+        return False
+    if _backend_activo is not None:
+        _backend_activo.sincronizar()
+        _backend_activo.cerrar()
+    _backend_activo = nuevo
+    return True
+
+def backend_actual():
+    """Nombre del motor en uso."""
+    return _backend().nombre
+
+@_medido
+@_modifica
+def copiar_datos(origen, destino):
+    """
+    Copia catálogo y ventas completos del motor `origen` al motor `destino` ('csv' / 'sqlite'),
+    conservando ids. Reemplaza lo que hubiera en el destino.
+    Retorna dict {'ok': bool, 'mensaje': str}.
+    """
+    abiertos = []
+    try:
+        def abrir(nombre):
+            if _backend_activo is not None and _backend_activo.nombre == nombre:
+                return _backend_activo
+            b = _crear_backend(nombre)
+            abiertos.append(b)
+            return b
+        desde, hacia = abrir(str(origen).lower()), abrir(str(destino).lower())
+        if desde is hacia:
+            return {'ok': False, 'mensaje': 'Origen y destino son el mismo motor.'}
+        desde.sincronizar()
+        productos = desde.listar_productos()
+        # lo compactado también se copia: el destino recibe el historial completo
+        ventas = list(desde.ventas_archivadas()) + desde.listar_ventas()
+        if not hacia.reemplazar_todo(productos, ventas):
+            return {'ok': False, 'mensaje': f'No se pudo escribir en {destino}.'}
+        return {'ok': True, 'mensaje': f'{len(productos)} producto(s) y {len(ventas)} venta(s) copiados de {origen} a {destino}.'}
+    except Exception as e:
+        print(f"[negocio] ERROR copiar_datos: {e}")
+        return {'ok': False, 'mensaje': f'Error al copiar datos: {e}'}
+    finally:
+        for b in abiertos:
+            b.cerrar()
+
+# -------------------------
+# Productos (CRUD)
+# -------------------------
+@_medido
+def listar_productos():
+    try:
+        return _consultas.obtener(('listar_productos',), _backend().listar_productos)
+    except Exception as e:
+        print(f"[negocio] ERROR listar_productos: {e}")
+        return []
+
+@_medido
+def obtener_producto(id_producto):
+    """
+    Retorna el producto con ese id (dict) o None si no existe. No toca disco si el catálogo está al día.
+    """
+    try:
+        return _backend().obtener_producto(int(id_producto))
+    except Exception as e:
+        print(f"[negocio] ERROR obtener_producto: {e}")
+        return None
+
+@_medido
+def buscar_productos(consulta, limite=20):
+    """
+    Búsqueda mientras se escribe: productos cuyo nombre, categoría o id contienen todas las
+    palabras de `consulta` (sin distinguir tildes ni mayúsculas; por prefijo o en medio de la
+    palabra). Los mejores primero: id exacto, nombre que empieza con lo escrito, el resto.
+    Retorna lista de dicts (a lo sumo `limite`).
+    """
+    try:
+        return _backend().buscar_productos(str(consulta or ''), max(0, int(limite)))
+    except Exception as e:
+        print(f"[negocio] ERROR buscar_productos: {e}")
+        return []
+
+def _normalizar_producto(producto):
+    """Alta: los cinco campos con su tipo (ValueError si precio o stock no son números)."""
+    return {
+        'nombre': str(producto.get('nombre', '')).strip(),
+        'categoria': str(producto.get('categoria', '')).strip(),
+        'precio_unitario': float(producto.get('precio_unitario', 0) or 0),
+        'stock': int(producto.get('stock', 0) or 0),
+        'unidad': str(producto.get('unidad', '')).strip()
+    }
+
+def _normalizar_cambios(nuevos_datos):
+    """Actualización: sólo los campos presentes, con su tipo."""
+    cambios = {}
+    for k in ('nombre', 'categoria', 'precio_unitario', 'stock', 'unidad'):
+        if k in nuevos_datos:
+            if k == 'precio_unitario':
+                cambios[k] = float(nuevos_datos[k] or 0)
+            elif k == 'stock':
+                cambios[k] = int(nuevos_datos[k] or 0)
+            else:
+                cambios[k] = str(nuevos_datos[k])
+    return cambios
+
+@_medido
+@_modifica
+def agregar_producto(producto):
+    """
+    producto: dict con keys: nombre, categoria, precio_unitario, stock, unidad
+    Retorna True/False.
+    """
+    try:
+        return _backend().agregar_producto(_normalizar_producto(producto))
+    except Exception as e:
+        print(f"[negocio] ERROR agregar_producto: {e}")
+        return False
+
+@_medido
+@_modifica
+def actualizar_producto(id_producto, nuevos_datos, version=None):
+    """
+    version: la que tenía el producto cuando se leyó para editarlo (campo 'version'); si otra
+    terminal lo cambió desde entonces no se actualiza y retorna False. None = sin comprobar.
+    """
+    try:
+        # actualizar sólo campos presentes
+        cambios = _normalizar_cambios(nuevos_datos)
+        if version is not None:
+            version = int(version)
+        return _backend().actualizar_producto(int(id_producto), cambios, version)
+    except Exception as e:
+        print(f"[negocio] ERROR actualizar_producto: {e}")
+        return False
+
+@_medido
+@_modifica
+def eliminar_producto(id_producto):
+    try:
+        return _backend().eliminar_producto(int(id_producto))
+    except Exception as e:
+        print(f"[negocio] ERROR eliminar_producto: {e}")
+        return False
+
+# -------------------------
+# Ventas
+# -------------------------
+@_medido
+def listar_ventas():
+    """Todas las ventas en una lista. Para historiales grandes conviene iter_ventas() o ultimas_ventas()."""
+    try:
+        return _backend().listar_ventas()
+    except Exception as e:
+        print(f"[negocio] ERROR listar_ventas: {e}")
+        return []
+
+def iter_ventas(desde=None, hasta=None, id_producto=None):
+    """
+    Genera las ventas una por una sin cargar el historial en memoria.
+    desde / hasta: fechas ISO o DD/MM/YYYY (hasta sin hora incluye todo el día); id_producto: int.
+    Los filtros se aplican en el motor: con fechas sólo se leen las filas del rango.
+    """
+    try:
+        lo, hi = _rango_timestamps(desde, hasta)
+        pid = None if id_producto is None else int(id_producto)
+        yield from _backend().iter_ventas(lo, hi, pid)
+    except Exception as e:
+        print(f"[negocio] ERROR iter_ventas: {e}")
+
+@_medido
+def ultimas_ventas(n=200):
+    """Las n ventas más recientes (mayor id_venta primero) sin leer el historial completo."""
+    try:
+        n = max(0, int(n))
+        return _consultas.obtener(('ultimas_ventas', n), lambda: _backend().ultimas_ventas(n))
+    except Exception as e:
+        print(f"[negocio] ERROR ultimas_ventas: {e}")
+        return []
+
+@_medido
+def ventas_nuevas(cursor=None, n=200):
+    """
+    Lectura incremental de las ventas recientes, para listas que se refrescan seguido.
+    Con el `cursor` de la llamada anterior retorna sólo las ventas registradas desde entonces
+    (motor CSV: recuerda archivo, inode y último byte leído, y parsea sólo lo anexado).
+    Sin cursor, con más de n ventas nuevas o si el archivo se truncó o se reescribió, retorna
+    las n más recientes con recarga=True.
+    Retorna dict {'ventas': [...] (la más nueva primero), 'cursor': dict, 'recarga': bool}:
+    con recarga las ventas reemplazan la lista, si no van delante de lo que ya se mostraba.
+    """
+    try:
+        ventas, cursor, recarga = _backend().ventas_nuevas(cursor, max(1, int(n)))
+        return {'ventas': ventas, 'cursor': cursor, 'recarga': recarga}
+    except Exception as e:
+        print(f"[negocio] ERROR ventas_nuevas: {e}")
+        return {'ventas': [], 'cursor': cursor, 'recarga': False}
+
+def _registrar_lineas(lineas, forma_pago, fecha=None):
+    """
+    Núcleo de registrar_venta / registrar_venta_lote: normaliza la fecha y delega en el motor,
+    que valida todas las líneas antes de escribir y guarda ventas + stock como una sola unidad.
+    Retorna dict {'ok', 'mensaje', 'ids', 'total'}.
+    """
+    try:
+        fecha = _normalizar_fecha(fecha)
+    except ValueError:
+        return {'ok': False, 'mensaje': 'Fecha inválida.'}
+    return _backend().registrar_lineas(lineas, forma_pago, fecha)
+
+@_medido
+@_modifica
+def registrar_venta(venta):
+    """
+    venta: dict con keys: id_producto(int), cantidad(int), precio_unitario_venta(float), forma_pago(str)
+    - si hay suficiente stock, guarda venta + stock nuevo como un solo cambio atómico
+      (motor CSV: journal; ambos CSV se actualizan en el siguiente checkpoint, ver sincronizar()).
+    Retorna dict {'ok': bool, 'mensaje': str}
+    """
+    try:
+        linea = {'id_producto': venta.get('id_producto'), 'cantidad': venta.get('cantidad', 0)}
+        if venta.get('precio_unitario_venta') is not None:
+            linea['precio_unitario'] = venta['precio_unitario_venta']
+        res = _registrar_lineas([linea], venta.get('forma_pago', ''), venta.get('fecha'))
+        if not res['ok']:
+            return {'ok': False, 'mensaje': res['mensaje']}
+        return {'ok': True, 'mensaje': f'Venta registrada (id {res["ids"][0]}).'}
+    except Exception as e:
+        print(f"[negocio] ERROR registrar_venta: {e}")
+        return {'ok': False, 'mensaje': 'Error interno al registrar venta.'}
+
+@_medido
+@_modifica
+def registrar_venta_lote(items, forma_pago):
+    """
+    Registra un ticket completo (carrito) en una sola pasada de E/S, todo o nada.
+    items: lista de dicts {'id_producto': int, 'cantidad': int, 'precio_unitario': float (opcional,
+           por defecto el precio del catálogo)}; un mismo producto puede repetirse.
+    Retorna dict {'ok': bool, 'mensaje': str, 'ids': list[int], 'total': float}
+    """
+    try:
+        res = _registrar_lineas(list(items or []), forma_pago)
+        if res['ok']:
+            ids = res['ids']
+            rango = f"id {ids[0]}" if len(ids) == 1 else f"ids {ids[0]}-{ids[-1]}"
+            res['mensaje'] = f"Venta registrada ({len(ids)} línea(s), {rango}). Total: {res['total']:.2f}"
+        return res
+    except Exception as e:
+        print(f"[negocio] ERROR registrar_venta_lote: {e}")
+        return {'ok': False, 'mensaje': 'Error interno al registrar venta.'}
+
+def calcular_total_venta(items):
+    """
+    items: lista de dicts {'id_producto': int, 'cantidad': int, 'precio_unitario': float}
+    Retorna float total.
+    """
+    total = 0.0
+    try:
+        for it in items:
+            c = int(it.get('cantidad', 0) or 0)
+            pu = float(it.get('precio_unitario', 0) or 0)
+            total += c * pu
+    except Exception:
+        return 0.0
+    return round(total, 2)
+
+@_medido
+def productos_mas_vendidos(top_n=10, fecha_inicio=None, fecha_fin=None):
+    """
+    Top-N por unidades vendidas. Sin fechas sale de los agregados (no relee el historial);
+    con fechas sólo se leen las particiones y filas del rango.
+    """
+    try:
+        top_n = int(top_n)
+        if not fecha_inicio and not fecha_fin:
+            return _consultas.obtener(('mas_vendidos', top_n), lambda: _backend().mas_vendidos(top_n))
+        conteo = generar_reporte_ventas(fecha_inicio, fecha_fin)['por_producto']
+        return _top_unidades(conteo.items(), top_n)
+    except Exception as e:
+        print(f"[negocio] ERROR productos_mas_vendidos: {e}")
+        return []
+
+@_medido
+def generar_reporte_ventas(fecha_inicio=None, fecha_fin=None):
+    """
+    Genera resumen simple: ventas totales y cantidad por producto entre fechas (ISO o DD/MM/YYYY, o None).
+    Sin fechas responde desde los agregados, sin leer ventas.csv.
+    Retorna dict con resumen.
+    """
+    try:
+        # fechas ISO o DD/MM/YYYY; se convierten una sola vez y el índice lee sólo el rango
+        lo, hi = _rango_timestamps(fecha_inicio, fecha_fin)
+        total, conteo = _consultas.obtener(('reporte', lo, hi), lambda: _backend().reporte(lo, hi))
+        return {'total_ventas': round(total, 2), 'por_producto': conteo}
+    except Exception as e:
+        print(f"[negocio] ERROR generar_reporte_ventas: {e}")
+        return {'total_ventas': 0.0, 'por_producto': {}}
+
+@_medido
+def sincronizar(forzar=True):
+    """
+    Deja los datos al día en disco. Motor CSV: checkpoint del journal (ventas y productos).
+    forzar=False sólo lo hace si se cumplió el lote o la ventana de tiempo (para llamadas periódicas).
+    Retorna True si no quedan cambios pendientes.
+    """
+    try:
+        return _backend().sincronizar(forzar)
+    except Exception as e:
+        print(f"[negocio] ERROR sincronizar: {e}")
+        return False
+
+@_medido
+@_modifica
+def reconstruir_agregados():
+    """Recalcula desde cero los totales de ventas (recuperación si el archivo de agregados se dañó)."""
+    try:
+        return _backend().reconstruir_agregados()
+    except Exception as e:
+        print(f"[negocio] ERROR reconstruir_agregados: {e}")
+        return False
+
+def metricas():
+    """
+    Métricas del proceso desde que se activaron (o desde reiniciar_metricas()):
+    {'activas', 'desde', 'segundos', 'funciones': {nombre: {'llamadas', 'media_ms', 'p50_ms', 'p90_ms',
+    'p99_ms', 'max_ms', 'total_ms', 'histograma_us'}}, 'filas_leidas', 'bytes_leidos', 'bytes_escritos',
+    'caches': {nombre: {'aciertos', 'fallos', 'ratio'}}}. Los percentiles salen del histograma
+    (cota superior de la cubeta).
+    """
+    try:
+        return _metricas.foto()
+    except Exception as e:
+        print(f"[negocio] ERROR metricas: {e}")
+        return {'activas': _metricas.activas, 'funciones': {}, 'caches': {}}
+
+def activar_metricas(activas=True, intervalo=None):
+    """
+    Enciende o apaga el registro de métricas. Encendidas, se guardan en data/metricas.json cada
+    `intervalo` segundos (por defecto NEGOCIO_METRICAS_INTERVALO / "metricas_intervalo" en
+    config.json, o 60; 0 = no guardar). Retorna True/False.
+    """
+    try:
+        _metricas.activas = bool(activas)
+        if not activas:
+            _volcado_metricas.detener()
+            return True
+        if intervalo is None:
+            intervalo = _configuracion('metricas_intervalo', 'NEGOCIO_METRICAS_INTERVALO', '60')
+        _volcado_metricas.iniciar(float(intervalo))
+        return True
+    except Exception as e:
+        print(f"[negocio] ERROR activar_metricas: {e}")
+        return False
+
+def reiniciar_metricas():
+    """Pone a cero lo medido hasta ahora."""
+    _metricas.reiniciar()
+
+def volcar_metricas():
+    """Guarda metricas() en data/metricas.json (escritura atómica). Retorna True/False."""
+    return _escribir_json_atomico(_rutas.metricas, metricas())
+
+@lru_cache(maxsize=None)
+def _configurar_metricas():
+    """Activa las métricas si lo pide NEGOCIO_METRICAS=1 o {"metricas": true} en config.json (una vez)."""
+    if _configuracion('metricas', 'NEGOCIO_METRICAS', 'no') in ('1', 'si', 'sí', 'true', 'on'):
+        activar_metricas(True)
+
+def _al_salir():
+    if _backend_activo is not None:
+        _backend_activo.sincronizar()
+        if _backend_activo.nombre == 'csv':
+            _guardar_snapshot()
+        _backend_activo.cerrar()
+    if _metricas.activas and _volcado_metricas.intervalo > 0:
+        _volcado_metricas.detener()
+        volcar_metricas()
+
+# -------------------------
+# Transacciones
+# -------------------------
+def _normalizar_operacion(op):
+    tipo = op[0]
+    if tipo == 'alta':
+        producto = _normalizar_producto(op[1])
+        if op[1].get('id') not in (None, ''):
+            producto['id'] = int(op[1]['id'])  # id elegido por quien llama (importaciones)
+        return ['alta', producto]
+    if tipo == 'cambio':
+        version = op[3] if len(op) > 3 else None
+        return ['cambio', int(op[1]), _normalizar_cambios(op[2]), None if version is None else int(version)]
+    if tipo == 'baja':
+        return ['baja', int(op[1])]
+    if tipo == 'venta':
+        fecha = op[3] if len(op) > 3 else None
+        return ['venta', list(op[1] or []), op[2] if len(op) > 2 else '', _normalizar_fecha(fecha)]
+    raise ValueError(f'operación desconocida: {tipo!r}')
+
+@_medido
+@_modifica
+def aplicar_operaciones(operaciones):
+    """
+    Guarda varias operaciones como una sola unidad: se validan todas juntas, en orden (una venta
+    ve el stock que dejaron las anteriores) y se guardan todas o ninguna. Motor CSV: una entrada
+    del journal y un checkpoint, es decir, una escritura atómica por archivo tocado.
+    operaciones: lista de
+        ['alta', producto]                        producto como en agregar_producto; con 'id' se
+                                                  usa ese id (debe estar libre), si no lo asigna el motor
+        ['cambio', id, nuevos_datos, version]     como actualizar_producto (version puede ser None)
+        ['baja', id]
+        ['venta', items, forma_pago, fecha]       items como en registrar_venta_lote (fecha None = ahora)
+    Retorna dict {'ok', 'mensaje', 'conflicto', 'ids_productos', 'ids_ventas', 'total'}; conflicto=True
+    si algún cambio se hizo sobre una versión vieja (conviene releer y reintentar).
+    Lo más cómodo es armarlas con transaccion().
+    """
+    try:
+        try:
+            operaciones = [_normalizar_operacion(op) for op in operaciones or []]
+        except (ValueError, TypeError, IndexError, KeyError) as e:
+            return {'ok': False, 'mensaje': f'Operación inválida: {e}', 'conflicto': False}
+        if not operaciones:
+            return {'ok': True, 'mensaje': 'Nada que guardar.', 'conflicto': False,
+                    'ids_productos': [], 'ids_ventas': [], 'total': 0.0}
+        res = _backend().aplicar_operaciones(operaciones)
+        if res['ok']:
+            res['mensaje'] = f"Transacción guardada ({len(operaciones)} operación(es))."
+        return res
+    except Exception as e:
+        print(f"[negocio] ERROR aplicar_operaciones: {e}")
+        return {'ok': False, 'mensaje': 'Error interno al guardar la transacción.', 'conflicto': False}
+
+class Transaccion:
+    """
+    Junta altas, cambios, bajas y ventas en memoria y las guarda todas juntas al salir del `with`
+    (o con confirmar()). Si dentro del bloque salta una excepción no se guarda nada y la
+    excepción sigue su curso. El resultado de aplicar_operaciones() queda en `resultado`.
+
+        with negocio.transaccion() as tx:
+            tx.agregar_producto({'nombre': 'Yerba 1kg', 'precio_unitario': 3500, 'stock': 10})
+            tx.actualizar_producto(7, {'precio_unitario': 120.0}, version=3)
+            tx.registrar_venta_lote([{'id_producto': 7, 'cantidad': 2}], 'efectivo')
+        if not tx.resultado['ok']:
+            print(tx.resultado['mensaje'])
+
+    aplicar: función que guarda la lista de operaciones (por defecto aplicar_operaciones; el
+    cliente del servidor pasa la suya).
+    """
+
+    def __init__(self, aplicar=None):
+        self._aplicar = aplicar or aplicar_operaciones
+        self.operaciones = []
+        self.resultado = None
+
+    def agregar_producto(self, producto):
+        self.operaciones.append(['alta', dict(producto)])
+
+    def actualizar_producto(self, id_producto, nuevos_datos, version=None):
+        self.operaciones.append(['cambio', id_producto, dict(nuevos_datos), version])
+
+    def eliminar_producto(self, id_producto):
+        self.operaciones.append(['baja', id_producto])
+
+    def registrar_venta(self, venta):
+        linea = {'id_producto': venta.get('id_producto'), 'cantidad': venta.get('cantidad', 0)}
+        if venta.get('precio_unitario_venta') is not None:
+            linea['precio_unitario'] = venta['precio_unitario_venta']
+        self.operaciones.append(['venta', [linea], venta.get('forma_pago', ''), venta.get('fecha')])
+
+    def registrar_venta_lote(self, items, forma_pago, fecha=None):
+        self.operaciones.append(['venta', [dict(it) for it in items or []], forma_pago, fecha])
+
+    def confirmar(self):
+        """Guarda lo acumulado (todo o nada) y retorna el resultado."""
+        self.resultado = self._aplicar(self.operaciones)
+        self.operaciones = []
+        return self.resultado
+
+    def descartar(self):
+        self.operaciones = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        if tipo is None:
+            self.confirmar()
+        else:
+            self.descartar()
+        return False
+
+def transaccion():
+    """Transacción nueva sobre el motor activo (ver Transaccion)."""
+    return Transaccion()
+
+@_medido
+def actualizar_precios_categoria(categoria, factor=None, precio=None):
+    """
+    Cambia el precio de todos los productos de una categoría en una sola transacción.
+    factor: multiplica el precio actual (1.10 = +10%); precio: valor fijo. Uno de los dos.
+    Si otra terminal edita alguno de esos productos a la vez, se relee y se reintenta.
+    Retorna dict {'ok', 'mensaje', 'actualizados'}.
+    """
+    try:
+        if (factor is None) == (precio is None):
+            return {'ok': False, 'mensaje': 'Indicar factor o precio (uno de los dos).', 'actualizados': 0}
+        factor = None if factor is None else float(factor)
+        precio = None if precio is None else float(precio)
+        if (factor is not None and factor <= 0) or (precio is not None and precio < 0):
+            return {'ok': False, 'mensaje': 'Precio inválido.', 'actualizados': 0}
+        clave = str(categoria).strip().lower()
+
+        def intento():
+            tx = Transaccion()
+            n = 0
+            for p in listar_productos():
+                if str(p.get('categoria', '')).strip().lower() != clave:
+                    continue
+                nuevo = precio if precio is not None else round(float(p['precio_unitario']) * factor, 2)
+                tx.actualizar_producto(p['id'], {'precio_unitario': nuevo}, p.get('version', 0))
+                n += 1
+            if n == 0:
+                return True, {'ok': False, 'mensaje': f'No hay productos en la categoría {categoria!r}.',
+                              'actualizados': 0}
+            res = tx.confirmar()
+            if res.get('conflicto'):
+                return False, None
+            if not res['ok']:
+                return True, {'ok': False, 'mensaje': res['mensaje'], 'actualizados': 0}
+            return True, {'ok': True, 'mensaje': f'Precio actualizado en {n} producto(s).', 'actualizados': n}
+
+        res = _con_reintentos(intento)
+        return res or {'ok': False, 'mensaje': 'Otra terminal está editando esos productos; probá de nuevo.',
+                       'actualizados': 0}
+    except Exception as e:
+        print(f"[negocio] ERROR actualizar_precios_categoria: {e}")
+        return {'ok': False, 'mensaje': 'Error interno al actualizar precios.', 'actualizados': 0}
+
+# -------------------------
+# Importación de catálogo (ver negocio_importar.py)
+# -------------------------
+MODOS_IMPORTACION = ('upsert', 'append', 'replace')
+# errores detallados en el resultado de importar_productos (el resto sólo se cuenta)
+ERRORES_IMPORTACION = 100
+
+@_medido
+def importar_productos(ruta, modo='upsert', columnas=None, clave=None, delimitador=None, decimal=None,
+                       encoding='utf-8-sig'):
+    """
+    Carga una lista de productos de proveedor (CSV) en una sola pasada y una sola escritura atómica.
+    modo: 'upsert' actualiza los que ya existen y da de alta los demás; 'append' da de alta todas
+          las filas; 'replace' deja el catálogo igual al archivo (los que no figuran se eliminan).
+    columnas: {columna del archivo: campo} (campos: id, nombre, categoria, precio_unitario, stock,
+          unidad); por defecto se reconocen nombres habituales (codigo, descripcion, precio, rubro...).
+    clave: campos para reconocer un producto existente; por defecto 'id' si el archivo lo trae,
+          si no nombre + categoría (sólo nombre si el archivo no trae categoría), sin distinguir
+          mayúsculas ni acentos. Una fila sin valor en alguna columna de la clave es un error.
+          Con clave 'id' las altas conservan el id del archivo: importar dos veces la misma
+          lista no duplica nada.
+    delimitador: ',' o ';' etc.; None = se detecta.
+    decimal: separador decimal de precios y cantidades ('.' o ','); None = se detecta. Con coma
+          decimal, 1.234,50 es 1234.5; un número que no se puede leer sin adivinar (1.5) y un
+          stock con decimales son filas con error.
+    El archivo se lee fila a fila; si una fila aparece dos veces, vale la última. Las filas con
+    errores no se importan y se informan (las primeras ERRORES_IMPORTACION con detalle).
+    Retorna dict {'ok', 'mensaje', 'filas', 'altas', 'actualizados', 'eliminados', 'errores',
+    'filas_con_error', 'segundos', 'filas_por_segundo'}.
+    """
+    import negocio_importar
+    return negocio_importar.importar(ruta, modo, columnas, clave, delimitador, decimal, encoding)
+
+# -------------------------
+# Particiones por mes
+# -------------------------
+@_medido
+@_modifica
+def migrar_ventas_a_particiones():
+    """
+    Reparte las filas de ventas.csv en data/ventas/YYYY-MM.csv según el mes de su fecha
+    (sin-fecha.csv si no se reconoce) y deja ventas.csv sólo con la cabecera; una copia
+    queda en ventas.pre-particion.csv. Desde ese momento cada venta se anexa sólo al archivo
+    de su mes y los reportes por rango abren sólo los meses que se cruzan con él.
+    Se puede repetir: las filas cuyo id ya está en la partición no se duplican.
+    Retorna dict {'ok': bool, 'mensaje': str, 'particiones': {nombre: filas_agregadas}}.
+    """
+    try:
+        with _bloqueo:
+            _journal.recuperar()
+            if not _sincronizar_csv():
+                return {'ok': False, 'mensaje': 'No se pudo vaciar el journal antes de migrar.', 'particiones': {}}
+            filas = _leer_csv(_rutas.ventas, VENTAS_FIELDS)
+            _rutas.ventas_dir.mkdir(parents=True, exist_ok=True)
+            grupos = {}
+            for r in filas:
+                grupos.setdefault(_segmento_para(r.get('fecha')), []).append(r)
+            if filas:
+                shutil.copy2(_rutas.ventas, _rutas.ventas.with_name('ventas.pre-particion.csv'))
+            resumen = {}
+            for segmento, grupo in grupos.items():
+                existentes = {r.get('id_venta') for r in _leer_csv(segmento, VENTAS_FIELDS)}
+                nuevas = [r for r in grupo if r.get('id_venta') not in existentes]
+                if nuevas and not _anexar_csv(segmento, VENTAS_FIELDS, nuevas, fsync=True):
+                    return {'ok': False, 'mensaje': f'Fallo al escribir {segmento.name}.', 'particiones': resumen}
+                resumen[segmento.name] = len(nuevas)
+            if not _escribir_csv_atomico(_rutas.ventas, VENTAS_FIELDS, []):
+                return {'ok': False, 'mensaje': 'Fallo al vaciar ventas.csv.', 'particiones': resumen}
+            # índices y agregados se rehacen con la nueva distribución
+            _indices_fechas.clear()
+            for idx in [_rutas.ventas.with_suffix('.idx')] + list(_rutas.ventas_dir.glob('*.idx')):
+                idx.unlink(missing_ok=True)
+            _agregados.descartar()
+            _agregados.reconstruir()
+            return {'ok': True, 'mensaje': f'{len(filas)} venta(s) migradas a {len(resumen)} partición(es).',
+                    'particiones': resumen}
+    except Exception as e:
+        print(f"[negocio] ERROR migrar_ventas_a_particiones: {e}")
+        return {'ok': False, 'mensaje': 'Error interno al migrar ventas.', 'particiones': {}}
+
+# -------------------------
+# Compactación del historial
+# -------------------------
+@_medido
+@_modifica
+def compactar_ventas(antes_de=None, dias=DIAS_VIVOS):
+    """
+    Saca de los archivos vivos las ventas anteriores a `antes_de` (fecha ISO o DD/MM/YYYY; por
+    defecto hoy menos `dias`, desde las 00:00 de ese día) y las guarda comprimidas en
+    data/archivo/ventas-YYYY-MM.csv.gz con un resumen por producto y día.
+    generar_reporte_ventas() y productos_mas_vendidos() dan lo mismo que antes: suman el
+    resumen a lo vivo. listar_ventas(), iter_ventas() y ultimas_ventas() ven sólo lo vivo;
+    lo archivado se lee con iter_ventas_archivadas(). Sólo motor CSV.
+    Retorna dict {'ok': bool, 'mensaje': str, 'archivadas': int}.
+    """
+    try:
+        if antes_de:
+            dt = _parsear_fecha(str(antes_de))
+            if dt is None:
+                return {'ok': False, 'mensaje': f'Fecha no reconocida: {antes_de!r}', 'archivadas': 0}
+        else:
+            dt = datetime.now() - timedelta(days=int(dias))
+        corte = int((datetime(dt.year, dt.month, dt.day) - _EPOCA).total_seconds())
+        return _backend().compactar_ventas(corte)
+    except Exception as e:
+        print(f"[negocio] ERROR compactar_ventas: {e}")
+        return {'ok': False, 'mensaje': 'Error interno al compactar ventas.', 'archivadas': 0}
+
+def iter_ventas_archivadas(desde=None, hasta=None, id_producto=None):
+    """Generador de las ventas que compactar_ventas() sacó del historial vivo (mismo formato que iter_ventas)."""
+    try:
+        lo, hi = _rango_timestamps(desde, hasta)
+        ventas = _archivo.iter_ventas(lo, hi, None if id_producto is None else int(id_producto))
+    except Exception as e:
+        print(f"[negocio] ERROR iter_ventas_archivadas: {e}")
+        return
+    yield from ventas
+
+# -------------------------
+# Arranque
+# -------------------------
+atexit.register(_al_salir)
 
 # Si el archivo se ejecuta directamente, muestra un pequeño demo en consola sin crash.
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Backend de inventario y ventas (CSV o SQLite).")
+    parser.add_argument('--reconstruir-agregados', action='store_true',
+                        help="recalcula desde cero los totales de ventas a partir de ventas.csv")
+    parser.add_argument('--migrar-particiones', action='store_true',
+                        help="reparte ventas.csv en un archivo por mes (data/ventas/YYYY-MM.csv)")
+    parser.add_argument('--compactar-ventas', nargs='?', const='', metavar='FECHA',
+                        help=f"archiva las ventas anteriores a FECHA (por defecto, las de hace más de {DIAS_VIVOS} días)")
+    parser.add_argument('--copiar-datos', nargs=2, metavar=('ORIGEN', 'DESTINO'), choices=BACKENDS,
+                        help="copia catálogo y ventas de un motor a otro, p. ej. --copiar-datos csv sqlite")
+    parser.add_argument('--importar-productos', metavar='ARCHIVO',
+                        help="carga una lista de productos de proveedor (CSV) en el catálogo")
+    parser.add_argument('--modo', choices=MODOS_IMPORTACION, default='upsert',
+                        help="con --importar-productos: upsert (por defecto), append o replace")
+    args = parser.parse_args()
+    if args.importar_productos:
+        res = importar_productos(args.importar_productos, args.modo)
+        print(res['mensaje'])
+        for error in res['errores']:
+            print(f"  fila {error['fila']}: {error['motivo']}")
+        raise SystemExit(0 if res['ok'] else 1)
+    if args.copiar_datos:
+        res = copiar_datos(*args.copiar_datos)
+        print(res['mensaje'])
+        raise SystemExit(0 if res['ok'] else 1)
+    if args.compactar_ventas is not None:
+        res = compactar_ventas(args.compactar_ventas or None)
+        print(res['mensaje'])
+        raise SystemExit(0 if res['ok'] else 1)
+    if args.migrar_particiones:
+        res = migrar_ventas_a_particiones()
+        print(res['mensaje'])
+        for nombre, n in sorted(res['particiones'].items()):
+            print(f"  {nombre}: {n} fila(s)")
+        raise SystemExit(0 if res['ok'] else 1)
+    if args.reconstruir_agregados:
+        ok = reconstruir_agregados()
+        print("Agregados reconstruidos." if ok else "No se pudieron reconstruir los agregados.")
+        raise SystemExit(0 if ok else 1)
     print("Demo rápido de negocio.py")
-    print("productos file:", PRODUCTOS_FILE)
-    print("ventas file:", VENTAS_FILE)
+    print("motor:", backend_actual())
+    print("productos file:", _rutas.productos)
+    print("ventas file:", _rutas.ventas)
     # listar
     prods = listar_productos()
     print(f"{len(prods)} productos cargados.")
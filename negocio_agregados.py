@@ -0,0 +1,220 @@
+"""
+negocio_agregados.py
+Totales de ventas del motor CSV de negocio.py (data/agregados.json): unidades e ingresos por
+producto y total general, sumados venta por venta en vez de recorrer el historial en cada reporte.
+
+Se guardan en cada checkpoint con el offset y el último id que cubren de cada archivo de ventas;
+al cargar (del snapshot o del JSON) sólo se leen las filas anexadas después, y si un archivo se
+achicó o se reescribió se reconstruyen desde cero.
+"""
+
+import json
+from array import array
+from pathlib import Path
+
+import negocio
+
+
+class Agregados:
+    """
+    Unidades e ingresos por id_producto y total general de todas las ventas, mantenidos
+    incrementalmente: cada venta registrada se suma al instante y el resultado se guarda
+    en AGREGADOS_FILE en cada checkpoint junto con el offset y último id que cubre de cada
+    archivo de ventas. Al cargar sólo se leen las filas posteriores a esos offsets; si un
+    archivo se achicó, se reescribió o desapareció se reconstruye desde cero.
+    """
+
+    def __init__(self, filepath: Path):
+        self._filepath = filepath
+        self._por_producto = None  # {id_producto: [unidades, ingresos]}
+        self._total = 0.0
+        self._cobertura = {}  # {clave de segmento: [offset, ultimo_id]}
+
+    @property
+    def filepath(self):
+        return negocio._ruta(self._filepath)
+
+    def _cargar(self):
+        if self._desde_snapshot():
+            if negocio._metricas.activas:
+                negocio._metricas.cache('snapshot', True)
+            return True
+        if negocio._metricas.activas:
+            negocio._metricas.cache('snapshot', False)
+        return self._desde_json()
+
+    def _adoptar(self, cobertura, total, por_producto):
+        """Toma los valores leídos si cada archivo de ventas sigue conteniendo lo que cubren."""
+        for clave, (offset, ultimo_id) in cobertura.items():
+            if not negocio._archivo_cubre(negocio._rutas.datos / clave, offset, ultimo_id):
+                return False
+        self._por_producto = por_producto
+        self._total = total
+        self._cobertura = cobertura
+        return True
+
+    def _desde_json(self):
+        try:
+            with self.filepath.open('r', encoding='utf-8') as f:
+                datos = json.load(f)
+            if datos.get('version') != 2:
+                return False
+            return self._adoptar(
+                {k: [int(o), int(u)] for k, (o, u) in datos['segmentos'].items()},
+                float(datos['total']),
+                {int(k): [int(u), float(i)] for k, (u, i) in datos['por_producto'].items()})
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            print(f"[negocio] ADVERTENCIA: agregados ilegibles, se reconstruyen: {e}")
+            return False
+
+    def _desde_snapshot(self):
+        datos = negocio._snapshot().get('agregados')
+        if not datos:
+            return False
+        try:
+            ids, unidades, ingresos = array('q'), array('q'), array('d')
+            ids.frombytes(datos['id'])
+            unidades.frombytes(datos['unidades'])
+            ingresos.frombytes(datos['ingresos'])
+            return self._adoptar({k: list(v) for k, v in datos['segmentos'].items()}, datos['total'],
+                                 {pid: [u, i] for pid, u, i in zip(ids, unidades, ingresos)})
+        except Exception as e:
+            print(f"[negocio] ADVERTENCIA: snapshot de agregados ilegible: {e}")
+            return False
+
+    def columnas(self):
+        """Agregados en columnas para el snapshot, o None si no están cargados o hay ventas sin checkpoint."""
+        if self._por_producto is None or negocio._journal.ventas_pendientes:
+            return None
+        ids = list(self._por_producto)
+        return {
+            'segmentos': {k: tuple(v) for k, v in self._cobertura.items()},
+            'total': self._total,
+            'id': array('q', ids).tobytes(),
+            'unidades': array('q', (self._por_producto[k][0] for k in ids)).tobytes(),
+            'ingresos': array('d', (self._por_producto[k][1] for k in ids)).tobytes(),
+        }
+
+    def _asegurar(self):
+        if self._por_producto is not None:
+            if negocio._metricas.activas:
+                negocio._metricas.cache('agregados', True)
+            self.al_dia()
+            return
+        cargados = self._cargar() and self._leer_desde_offsets(pendientes_sumadas=False)
+        if negocio._metricas.activas:
+            negocio._metricas.cache('agregados', cargados)
+        if not cargados:
+            self.reconstruir()
+        # lo registrado que aún espera checkpoint no está en el archivo
+        self._sumar_en_memoria(negocio._journal.ventas_pendientes)
+
+    def _sumar_en_memoria(self, ventas):
+        for v in ventas:
+            try:
+                pid = int(v['id_producto'])
+                cantidad = int(v['cantidad'])
+                ingreso = float(v['precio_unitario_venta']) * cantidad
+            except Exception:
+                continue
+            acc = self._por_producto.setdefault(pid, [0, 0.0])
+            acc[0] += cantidad
+            acc[1] += ingreso
+            self._total += ingreso
+
+    def _leer_desde_offsets(self, pendientes_sumadas=True):
+        """
+        Suma las filas nuevas de cada archivo. False si alguno se achicó (hay que reconstruir).
+        Una fila que ya estaba entre las ventas pendientes (la anexó el checkpoint de otro proceso)
+        sale de pendientes y sólo se suma si las pendientes aún no estaban sumadas en memoria.
+        """
+        pendientes = {v['id_venta'] for v in negocio._journal.ventas_pendientes}
+        anexadas = set()
+        filas = []
+        for segmento in negocio._segmentos_ventas():
+            clave = negocio._clave_segmento(segmento)
+            cobertura = self._cobertura.setdefault(clave, [0, 0])
+            try:
+                negocio._asegurar_archivo(segmento, negocio.VENTAS_FIELDS)
+                if segmento.stat().st_size < cobertura[0]:
+                    return False
+                for fin, campos in negocio._filas_desde(segmento, cobertura[0]):
+                    cobertura[0] = fin
+                    try:
+                        v = negocio._venta_desde_fila(dict(zip(negocio.VENTAS_FIELDS, campos)))
+                    except Exception:
+                        continue  # cabecera o fila corrupta
+                    cobertura[1] = v['id_venta']
+                    if v['id_venta'] in pendientes:
+                        anexadas.add(v['id_venta'])
+                        if pendientes_sumadas:
+                            continue
+                    filas.append(v)
+            except OSError as e:
+                print(f"[negocio] ERROR al leer {segmento}: {e}")
+        if anexadas:
+            negocio._journal.ventas_pendientes = [v for v in negocio._journal.ventas_pendientes if v['id_venta'] not in anexadas]
+        self._sumar_en_memoria(filas)
+        return True
+
+    def al_dia(self):
+        """Suma las filas anexadas a los archivos de ventas desde la última lectura (p.ej. por otro proceso)."""
+        if self._por_producto is not None and not self._leer_desde_offsets():
+            self.reconstruir()
+            self._sumar_en_memoria(negocio._journal.ventas_pendientes)
+
+    def reconstruir(self):
+        """Recalcula todo recorriendo los archivos de ventas completos y lo guarda."""
+        self._por_producto = {}
+        self._total = 0.0
+        self._cobertura = {}
+        self._leer_desde_offsets(pendientes_sumadas=False)
+        return self.guardar()
+
+    def descartar(self):
+        """Olvida el estado en memoria; se recarga/reconstruye en el próximo uso."""
+        self._por_producto = None
+        self._total = 0.0
+        self._cobertura = {}
+
+    def cubrir_anexadas(self, segmento: Path, ventas):
+        """
+        Las ventas pendientes (ya sumadas en memoria) acaban de anexarse a `segmento`:
+        mover su offset al final sin volver a sumarlas y guardar.
+        """
+        if self._por_producto is None or not ventas:
+            return True
+        try:
+            offset = segmento.stat().st_size
+        except OSError:
+            return False
+        self._cobertura[negocio._clave_segmento(segmento)] = [offset, int(ventas[-1]['id_venta'])]
+        return self.guardar()
+
+    def guardar(self):
+        if self._por_producto is None:
+            return True
+        return negocio._escribir_json_atomico(self.filepath, {
+            'version': 2,
+            'segmentos': self._cobertura,
+            'total': self._total,
+            'por_producto': {str(k): v for k, v in self._por_producto.items()},
+        })
+
+    def sumar(self, ventas):
+        if self._por_producto is not None:
+            self._sumar_en_memoria(ventas)
+
+    def total(self):
+        self._asegurar()
+        return self._total
+
+    def unidades_por_producto(self):
+        self._asegurar()
+        return {pid: acc[0] for pid, acc in self._por_producto.items()}
+
+    def top(self, n):
+        self._asegurar()
+        return negocio._top_unidades(((pid, acc[0]) for pid, acc in self._por_producto.items()), n)
@@ -0,0 +1,321 @@
+"""
+negocio_archivo.py
+Archivo de ventas viejas del motor CSV de negocio.py (data/archivo/), lo que llena compactar_ventas().
+
+ - ventas-YYYY-MM.csv.gz: las filas archivadas tal cual, un miembro gzip por compactación.
+ - resumen.csv: unidades, importe y cantidad de ventas por día y producto; los reportes lo suman
+   a lo vivo sin abrir los .gz salvo para los días que el rango corta.
+ - estado.json: último corte, mayor id archivado y si una compactación quedó a medias.
+"""
+
+import bisect
+import csv
+import gzip
+import io
+import json
+import os
+import shutil
+from array import array
+from collections import defaultdict
+from datetime import timedelta
+
+import negocio
+
+RESUMEN_FIELDS = ['dia', 'id_producto', 'cantidad', 'importe', 'ventas']
+_DIA_S = 86400
+
+
+class Archivo:
+    """
+    Ventas sacadas de los archivos vivos por compactar_ventas(): las filas, tal cual, en
+    ARCHIVO_DIR/ventas-YYYY-MM.csv.gz y su resumen por día y producto en resumen.csv.
+    Los reportes suman el resumen a lo vivo: los días que el rango cubre enteros salen del
+    resumen y, si el rango corta un día archivado, ese día se lee de su .gz.
+    estado.json guarda el último corte, el mayor id archivado y si una compactación quedó
+    a medias (al repetirla no se duplican filas y el resumen se rehace desde los .gz).
+    """
+
+    def __init__(self, directorio):
+        self._directorio = directorio
+        self._firma = None
+        self._cargado = False
+        # resumen en columnas ordenadas por día
+        self._dias, self._ids, self._unidades, self._importes = array('q'), array('q'), array('q'), array('d')
+        self._por_producto = {}  # {id_producto: [unidades, importe]}
+        self._total = 0.0
+        self._ultimo_id = 0
+
+    @property
+    def directorio(self):
+        return negocio._ruta(self._directorio)
+
+    @property
+    def _resumen(self):
+        return self.directorio / 'resumen.csv'
+
+    @property
+    def _estado_path(self):
+        return self.directorio / 'estado.json'
+
+    def _gz(self, mes):
+        return self.directorio / f'ventas-{mes}.csv.gz'
+
+    def estado(self):
+        try:
+            with self._estado_path.open('r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            print(f"[negocio] ADVERTENCIA: {self._estado_path} ilegible: {e}")
+            return {}
+
+    def ultimo_id(self):
+        self.al_dia()
+        return self._ultimo_id
+
+    def al_dia(self):
+        """Relee el resumen si cambió; si lo cambió otra terminal, lo vivo también se reescribió."""
+        firma = []
+        for archivo in (self._resumen, self._estado_path):
+            try:
+                st = archivo.stat()
+                firma.append((st.st_size, st.st_mtime_ns))
+            except FileNotFoundError:
+                firma.append(None)
+        firma = None if firma == [None, None] else tuple(firma)
+        if self._cargado and firma == self._firma:
+            return
+        if self._cargado:
+            negocio._indices_fechas.clear()
+            negocio._agregados.descartar()
+        self._cargar(firma)
+
+    def _cargar(self, firma):
+        self._dias, self._ids, self._unidades, self._importes = array('q'), array('q'), array('q'), array('d')
+        self._por_producto, self._total, self._ultimo_id = {}, 0.0, 0
+        self._firma, self._cargado = firma, True
+        if firma is None:
+            return
+        self._ultimo_id = int(self.estado().get('ultimo_id', 0))
+        filas = sorted(self._filas_resumen())
+        for dia, pid, unidades, importe, _ in filas:
+            self._dias.append(dia)
+            self._ids.append(pid)
+            self._unidades.append(unidades)
+            self._importes.append(importe)
+            acc = self._por_producto.setdefault(pid, [0, 0.0])
+            acc[0] += unidades
+            acc[1] += importe
+            self._total += importe
+
+    def _filas_resumen(self):
+        """(timestamp del día, id_producto, unidades, importe, ventas) de resumen.csv."""
+        filas = []
+        for r in negocio._leer_csv(self._resumen, RESUMEN_FIELDS):
+            try:
+                filas.append((negocio._timestamp(r['dia']), int(r['id_producto']), int(r['cantidad']),
+                              float(r['importe']), int(r['ventas'] or 0)))
+            except (TypeError, ValueError):
+                continue
+        return filas
+
+    @property
+    def vacio(self):
+        self.al_dia()
+        return not self._por_producto
+
+    def totales(self):
+        """(total, {id_producto: unidades}) de todo lo archivado."""
+        self.al_dia()
+        return self._total, {pid: acc[0] for pid, acc in self._por_producto.items()}
+
+    def reporte(self, lo=None, hi=None):
+        """(total, {id_producto: unidades}) de las ventas archivadas con lo <= timestamp <= hi."""
+        self.al_dia()
+        if lo is None and hi is None:
+            return self.totales()
+        total, conteo = 0.0, defaultdict(int)
+        # días enteros dentro del rango: desde el resumen
+        desde = 0 if lo is None else lo + (-lo) % _DIA_S
+        hasta = None if hi is None else hi - (hi + 1) % _DIA_S
+        i = bisect.bisect_left(self._dias, desde)
+        j = len(self._dias) if hasta is None else bisect.bisect_right(self._dias, hasta - _DIA_S + 1)
+        for k in range(i, j):
+            total += self._importes[k]
+            conteo[self._ids[k]] += self._unidades[k]
+        # días cortados por el rango: filas exactas del .gz
+        cortados = set()
+        if lo is not None and lo % _DIA_S:
+            cortados.add(lo - lo % _DIA_S)
+        if hi is not None and (hi + 1) % _DIA_S:
+            cortados.add(hi - hi % _DIA_S)
+        for dia in cortados:
+            a, b = bisect.bisect_left(self._dias, dia), bisect.bisect_right(self._dias, dia)
+            if a == b:
+                continue  # ese día no tiene nada archivado
+            for v in self.iter_ventas(max(dia, lo if lo is not None else dia),
+                                      min(dia + _DIA_S - 1, hi if hi is not None else dia + _DIA_S - 1)):
+                total += v['precio_unitario_venta'] * v['cantidad']
+                conteo[v['id_producto']] += v['cantidad']
+        return total, dict(conteo)
+
+    def iter_ventas(self, lo=None, hi=None, id_producto=None):
+        """Ventas archivadas (mes a mes, en el orden en que se archivaron) filtradas por fecha y producto."""
+        for gz in sorted(self.directorio.glob('ventas-*.csv.gz')):
+            mes = negocio._rutas.ventas_dir / (gz.name[len('ventas-'):-len('.gz')])
+            if not negocio._segmento_en_rango(mes, lo, hi):
+                continue
+            filas = 0
+            with gzip.open(gz, 'rt', newline='', encoding='utf-8') as f:
+                for r in csv.DictReader(f):
+                    filas += 1
+                    try:
+                        v = negocio._venta_desde_fila(r)
+                    except (TypeError, ValueError):
+                        continue
+                    if id_producto is not None and v['id_producto'] != id_producto:
+                        continue
+                    if lo is not None or hi is not None:
+                        t = negocio._timestamp(v['fecha'])
+                        if t is None or (lo is not None and t < lo) or (hi is not None and t > hi):
+                            continue
+                    yield v
+            if negocio._metricas.activas:
+                negocio._metricas.lectura(filas, gz.stat().st_size)
+
+    def _ids_archivados(self, mes):
+        gz = self._gz(mes)
+        if not gz.exists():
+            return set()
+        with gzip.open(gz, 'rt', newline='', encoding='utf-8') as f:
+            return {r.get('id_venta') for r in csv.DictReader(f)}
+
+    def compactar(self, corte):
+        """
+        Mueve al archivo las filas con fecha anterior a `corte` (timestamp de las 00:00 de un día).
+        Se llama bajo _bloqueo y sin ventas pendientes. Retorna dict {'ok', 'mensaje', 'archivadas'}.
+        """
+        estado = self.estado()
+        rehacer = bool(estado.get('en_curso'))
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        if not negocio._escribir_json_atomico(self._estado_path, dict(estado, en_curso=True)):
+            return {'ok': False, 'mensaje': 'No se pudo escribir el estado del archivo.', 'archivadas': 0}
+        salidas = {}  # mes -> (archivo crudo, gzip, writer, ids ya archivados)
+        nuevas = defaultdict(lambda: [0, 0.0, 0])  # (día, id_producto) -> [unidades, importe, ventas]
+        reemplazos = []  # (segmento, temporal o None para borrarlo)
+        archivadas, ultimo_id = 0, int(estado.get('ultimo_id', 0))
+        try:
+            for segmento in negocio._segmentos_ventas():
+                if not negocio._segmento_en_rango(segmento, None, corte - 1):
+                    continue
+                tmp = segmento.with_name(segmento.name + '.tmp')
+                vivas, viejas = 0, 0
+                with tmp.open('w', newline='', encoding='utf-8') as destino:
+                    w = csv.writer(destino)
+                    w.writerow(negocio.VENTAS_FIELDS)
+                    fin = 0
+                    for fin, campos in negocio._filas_desde(segmento, 0):
+                        t = negocio._timestamp(campos[1]) if len(campos) == len(negocio.VENTAS_FIELDS) else None
+                        if t is None or t >= corte:
+                            if campos != negocio.VENTAS_FIELDS:
+                                w.writerow(campos)
+                                vivas += 1
+                            continue
+                        viejas += 1
+                        mes = (negocio._EPOCA + timedelta(seconds=t)).strftime('%Y-%m')
+                        if mes not in salidas:
+                            ya = self._ids_archivados(mes)
+                            nuevo = not ya and not self._gz(mes).exists()
+                            crudo = self._gz(mes).open('ab')  # cada compactación agrega un miembro gzip
+                            texto = io.TextIOWrapper(gzip.GzipFile(fileobj=crudo, mode='ab'),
+                                                     encoding='utf-8', newline='')
+                            escritor = csv.writer(texto)
+                            if nuevo:
+                                escritor.writerow(negocio.VENTAS_FIELDS)
+                            salidas[mes] = (crudo, texto, escritor, ya)
+                        _, _, escritor, ya = salidas[mes]
+                        if campos[0] in ya:
+                            continue  # quedó archivada por una compactación interrumpida
+                        escritor.writerow(campos)
+                        v = negocio._venta_desde_fila(dict(zip(negocio.VENTAS_FIELDS, campos)))
+                        acc = nuevas[(t - t % _DIA_S, v['id_producto'])]
+                        acc[0] += v['cantidad']
+                        acc[1] += v['precio_unitario_venta'] * v['cantidad']
+                        acc[2] += 1
+                        archivadas += 1
+                        ultimo_id = max(ultimo_id, v['id_venta'])
+                    # una última línea sin salto (escritura cortada) se conserva tal cual
+                    with segmento.open('rb') as f:
+                        f.seek(fin)
+                        resto = f.read()
+                    destino.write(resto.decode('utf-8', errors='replace'))
+                    destino.flush()
+                    os.fsync(destino.fileno())
+                if not viejas:
+                    tmp.unlink()
+                elif vivas or resto or segmento == negocio._rutas.ventas:
+                    reemplazos.append((segmento, tmp))
+                else:
+                    tmp.unlink()
+                    reemplazos.append((segmento, None))  # partición que quedó vacía
+        finally:
+            for crudo, texto, _, _ in salidas.values():
+                texto.close()  # cierra el miembro gzip; el archivo crudo sigue abierto
+                crudo.flush()
+                os.fsync(crudo.fileno())
+                crudo.close()
+        # lo archivado ya está en disco: recién ahora se achican los archivos vivos
+        for segmento, tmp in reemplazos:
+            if tmp is None:
+                segmento.unlink()
+            else:
+                os.replace(tmp, segmento)
+            segmento.with_suffix('.idx').unlink(missing_ok=True)
+        negocio._fsync_directorio(negocio._rutas.datos)
+        if rehacer:
+            nuevas = self._resumen_desde_gz()
+        else:
+            for dia, pid, unidades, importe, ventas in self._filas_resumen():
+                acc = nuevas[(dia, pid)]
+                acc[0] += unidades
+                acc[1] += importe
+                acc[2] += ventas
+        ok = negocio._escribir_csv_atomico(self._resumen, RESUMEN_FIELDS, (
+            {'dia': (negocio._EPOCA + timedelta(seconds=dia)).date().isoformat(), 'id_producto': pid,
+             'cantidad': acc[0], 'importe': round(acc[1], 2), 'ventas': acc[2]}
+            for (dia, pid), acc in sorted(nuevas.items())))
+        corte_texto = (negocio._EPOCA + timedelta(seconds=corte)).date().isoformat()
+        ok = ok and negocio._escribir_json_atomico(self._estado_path, {
+            'version': 1, 'corte': max(corte_texto, estado.get('corte', '')),
+            'ultimo_id': ultimo_id, 'en_curso': False})
+        # lo vivo cambió: índices y agregados se rehacen; el resumen se relee
+        negocio._indices_fechas.clear()
+        negocio._agregados.descartar()
+        negocio._agregados.reconstruir()
+        self._cargar(None)
+        self._cargado = False
+        if not ok:
+            return {'ok': False, 'mensaje': 'No se pudo escribir el resumen del archivo.', 'archivadas': archivadas}
+        return {'ok': True, 'archivadas': archivadas,
+                'mensaje': f'{archivadas} venta(s) anteriores al {corte_texto} archivadas en {self.directorio}.'}
+
+    def _resumen_desde_gz(self):
+        """Resumen completo recalculado desde los .gz (tras una compactación interrumpida)."""
+        resumen = defaultdict(lambda: [0, 0.0, 0])
+        for v in self.iter_ventas():
+            t = negocio._timestamp(v['fecha'])
+            if t is None:
+                continue
+            acc = resumen[(t - t % _DIA_S, v['id_producto'])]
+            acc[0] += v['cantidad']
+            acc[1] += v['precio_unitario_venta'] * v['cantidad']
+            acc[2] += 1
+        return resumen
+
+    def borrar(self):
+        """Quita todo lo archivado (reemplazar_todo: el historial nuevo viene completo)."""
+        if self.directorio.is_dir():
+            shutil.rmtree(self.directorio)
+        self._cargar(None)
+        self._cargado = False
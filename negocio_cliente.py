@@ -0,0 +1,122 @@
+"""
+negocio_cliente.py
+Cliente delgado de negocio_servidor.py: mismas funciones que negocio.py (listar_productos,
+registrar_venta, generar_reporte_ventas, productos_mas_vendidos, ...) pero cada llamada viaja
+al servidor. negocio_main.py lo usa con --servidor host:puerto o NEGOCIO_SERVIDOR.
+
+    api = Cliente('127.0.0.1:8765')
+    api.registrar_venta({'id_producto': 11001, 'cantidad': 2, 'forma_pago': 'Efectivo'})
+"""
+
+import json
+import socket
+import threading
+
+import negocio
+from negocio_servidor import ESCRITURAS, HOST, LECTURAS, PUERTO
+
+# segundos de espera por respuesta (una escritura puede esperar su turno en la cola del servidor)
+TIMEOUT_S = 30.0
+
+
+class ErrorServidor(Exception):
+    """El servidor respondió con error o no se pudo hablar con él."""
+
+
+def direccion(texto):
+    """'host:puerto', 'host' o ':puerto' -> (host, puerto)."""
+    texto = (texto or '').strip()
+    host, separador, puerto = texto.rpartition(':')
+    if not separador:
+        return texto or HOST, PUERTO
+    return host or HOST, int(puerto) if puerto else PUERTO
+
+
+def _reporte(r):
+    # JSON sólo tiene claves de texto: los ids de por_producto vuelven a int
+    if isinstance(r, dict) and isinstance(r.get('por_producto'), dict):
+        r['por_producto'] = {int(k): v for k, v in r['por_producto'].items()}
+    return r
+
+# resultados que JSON no devuelve con el mismo tipo que negocio.py
+_RESTAURAR = {
+    'generar_reporte_ventas': _reporte,
+    'productos_mas_vendidos': lambda r: [tuple(x) for x in r],
+}
+
+
+class Cliente:
+    """
+    Una conexión TCP persistente, compartida entre hilos (un pedido a la vez).
+    Si la conexión se cae se reabre en el siguiente pedido; una lectura se reintenta una vez,
+    una escritura no (podría haberse aplicado) y se informa con ErrorServidor.
+    """
+
+    # funciones puras de negocio: se calculan localmente
+    calcular_total_venta = staticmethod(negocio.calcular_total_venta)
+
+    def __init__(self, servidor=None, timeout=TIMEOUT_S):
+        """servidor: 'host:puerto' (por defecto 127.0.0.1:8765)."""
+        self.host, self.puerto = direccion(servidor)
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._sock = None
+        self._archivo = None
+        self._siguiente = 0
+
+    def __repr__(self):
+        return f"Cliente({self.host}:{self.puerto})"
+
+    def _conectar(self):
+        self._sock = socket.create_connection((self.host, self.puerto), timeout=self.timeout)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._archivo = self._sock.makefile('rwb')
+
+    def cerrar(self):
+        with self._lock:
+            self._cerrar()
+
+    def _cerrar(self):
+        for recurso in (self._archivo, self._sock):
+            try:
+                if recurso is not None:
+                    recurso.close()
+            except OSError:
+                pass
+        self._sock = self._archivo = None
+
+    def llamar(self, op, *args, **kwargs):
+        """Ejecuta negocio.<op>(*args, **kwargs) en el servidor y retorna su resultado."""
+        intentos = 2 if op in LECTURAS else 1
+        with self._lock:
+            self._siguiente += 1
+            pedido = json.dumps({'id': self._siguiente, 'op': op, 'args': args, 'kwargs': kwargs},
+                                ensure_ascii=False).encode('utf-8') + b'\n'
+            for intento in range(intentos):
+                try:
+                    if self._sock is None:
+                        self._conectar()
+                    self._archivo.write(pedido)
+                    self._archivo.flush()
+                    linea = self._archivo.readline()
+                    if not linea:
+                        raise ConnectionError('el servidor cerró la conexión')
+                    break
+                except OSError as e:
+                    self._cerrar()
+                    if intento + 1 == intentos:
+                        raise ErrorServidor(f"sin conexión con {self.host}:{self.puerto}: {e}") from e
+        respuesta = json.loads(linea)
+        if not respuesta.get('ok'):
+            raise ErrorServidor(respuesta.get('error') or 'error desconocido')
+        resultado = respuesta.get('resultado')
+        return _RESTAURAR[op](resultado) if op in _RESTAURAR else resultado
+
+    def transaccion(self):
+        """Como negocio.transaccion(): las operaciones viajan juntas en un solo pedido."""
+        return negocio.Transaccion(self.aplicar_operaciones)
+
+    def __getattr__(self, nombre):
+        if nombre in LECTURAS or nombre in ESCRITURAS:
+            return lambda *args, **kwargs: self.llamar(nombre, *args, **kwargs)
+        raise AttributeError(f"{type(self).__name__!r} no tiene {nombre!r}")
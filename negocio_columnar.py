@@ -0,0 +1,215 @@
+"""
+negocio_columnar.py
+Motor columnar de reportes de ventas para negocio.py (motor CSV).
+
+Carga cada archivo de ventas (ventas.csv o una partición mensual) una sola vez en columnas
+tipadas ordenadas por fecha y a partir de ahí sólo lee las filas anexadas:
+ - con NumPy: id_producto int32, cantidad int32, precio_unitario_venta float64, fecha
+   datetime64[s]; un reporte es searchsorted sobre la fecha + np.bincount / np.add.at.
+ - sin NumPy: las mismas columnas en array('q'/'i'/'d') con bisect y un solo bucle.
+Se usa para reportes por rango de fechas; se elige con NEGOCIO_REPORTES=columnar|indice|paralelo
+o {"reportes": ...} en data/config.json (por defecto columnar si NumPy está instalado).
+Las filas con fecha no reconocida no entran en reportes por rango, igual que en el índice.
+"""
+
+import bisect
+import csv
+import io
+from array import array
+from pathlib import Path
+
+try:
+    import numpy as np
+except ImportError:  # fallback en Python puro
+    np = None
+
+import negocio
+
+# ids mayores usan np.unique + np.add.at en vez de un bincount del tamaño del mayor id
+_BINCOUNT_MAX_ID = 1 << 22
+
+
+def _leer_bloque(filepath: Path, offset):
+    """
+    Filas completas (listas de campos) desde `offset` en una sola lectura.
+    Retorna (offset_fin, filas); una última línea sin salto queda para la próxima vez.
+    """
+    with filepath.open('rb') as f:
+        f.seek(offset)
+        datos = f.read()
+    fin = datos.rfind(b'\n') + 1
+    if fin == 0:
+        return offset, []
+    texto = datos[:fin].decode('utf-8', errors='replace')
+    filas = [c for c in csv.reader(io.StringIO(texto)) if len(c) == len(negocio.VENTAS_FIELDS)]
+    if negocio._metricas.activas:
+        negocio._metricas.lectura(len(filas), fin)
+    return offset + fin, filas
+
+
+def _convertir_python(filas):
+    """(ts, id_producto, cantidad, precio) en arrays, fila por fila; descarta cabecera y filas corruptas."""
+    ts, ids, cant, precio = array('q'), array('i'), array('i'), array('d')
+    for campos in filas:
+        try:
+            t = negocio._timestamp(campos[1])
+            if t is None:
+                continue
+            i, c, p = int(campos[2]), int(campos[3]), float(campos[4] or 0)
+        except ValueError:
+            continue
+        ts.append(t)
+        ids.append(i)
+        cant.append(c)
+        precio.append(p)
+    return ts, ids, cant, precio
+
+
+def _convertir_numpy(filas):
+    """Igual que _convertir_python pero columna por columna, con la conversión dentro de NumPy."""
+    if filas and not filas[0][0].strip().lstrip('-').isdigit():
+        filas = filas[1:]  # cabecera
+    if not filas:
+        return (np.empty(0, 'datetime64[s]'), np.empty(0, np.int32),
+                np.empty(0, np.int32), np.empty(0, np.float64))
+    fechas = [f[1] for f in filas]
+    ids, cant, precio = [f[2] for f in filas], [f[3] for f in filas], [f[4] for f in filas]
+    try:
+        ids = np.array(ids).astype(np.int32)
+        cant = np.array(cant).astype(np.int32)
+        precio = np.array(precio).astype(np.float64)
+    except ValueError:
+        # alguna fila corrupta: este bloque se convierte fila por fila
+        ts, ids, cant, precio = _convertir_python(filas)
+        return (np.array(ts, dtype='datetime64[s]'), np.array(ids, np.int32),
+                np.array(cant, np.int32), np.array(precio, np.float64))
+    try:
+        ts = np.array(fechas, dtype='datetime64[s]')  # ISO, lo que escribe negocio.py
+    except ValueError:
+        # fechas heredadas (DD/MM/YYYY, ...): se interpretan con el mismo parser que el resto
+        ts = np.array([negocio._timestamp(f) for f in fechas], dtype='datetime64[s]')
+    validas = ~np.isnat(ts)
+    if not validas.all():
+        ts, ids, cant, precio = ts[validas], ids[validas], cant[validas], precio[validas]
+    return ts, ids, cant, precio
+
+
+class _ColumnasSegmento:
+    """Columnas de un archivo de ventas, ordenadas por fecha y al día con lo anexado."""
+
+    def __init__(self, csv_path: Path):
+        self.csv_path = csv_path
+        self._cubierto = 0
+        self._ultimo_id = 0
+        self._columnas = None
+
+    def _vacias(self):
+        if np is not None:
+            return _convertir_numpy([])
+        return array('q'), array('i'), array('i'), array('d')
+
+    def _ultimo_id_de(self, filas):
+        for campos in reversed(filas):
+            try:
+                return int(campos[0])
+            except ValueError:
+                continue
+        return self._ultimo_id
+
+    def al_dia(self):
+        vigentes = self._columnas is not None and negocio._archivo_cubre(self.csv_path, self._cubierto, self._ultimo_id)
+        if negocio._metricas.activas:
+            negocio._metricas.cache('columnar', vigentes)
+        if not vigentes:
+            self._columnas = self._vacias()
+            self._cubierto, self._ultimo_id = 0, 0
+        fin, filas = _leer_bloque(self.csv_path, self._cubierto)
+        if not filas:
+            self._cubierto = fin
+            return self._columnas
+        nuevas = _convertir_numpy(filas) if np is not None else _convertir_python(filas)
+        self._columnas = self._unir(self._columnas, nuevas)
+        self._cubierto, self._ultimo_id = fin, self._ultimo_id_de(filas)
+        return self._columnas
+
+    @staticmethod
+    def _unir(actuales, nuevas):
+        ts_nuevas = nuevas[0]
+        if len(ts_nuevas) == 0:
+            return actuales
+        if np is not None:
+            ordenadas = bool(np.all(ts_nuevas[1:] >= ts_nuevas[:-1]))
+            if ordenadas and (len(actuales[0]) == 0 or ts_nuevas[0] >= actuales[0][-1]):
+                # caso normal: las ventas se anexan en orden cronológico
+                return tuple(np.concatenate((a, n)) for a, n in zip(actuales, nuevas))
+            unidas = tuple(np.concatenate((a, n)) for a, n in zip(actuales, nuevas))
+            orden = np.argsort(unidas[0], kind='stable')
+            return tuple(c[orden] for c in unidas)
+        ordenadas = all(a <= b for a, b in zip(ts_nuevas, ts_nuevas[1:]))
+        if ordenadas and (not actuales[0] or ts_nuevas[0] >= actuales[0][-1]):
+            for a, n in zip(actuales, nuevas):
+                a.extend(n)
+            return actuales
+        filas = sorted(zip(*(list(a) + list(n) for a, n in zip(actuales, nuevas))), key=lambda f: f[0])
+        return tuple(array(a.typecode, (f[k] for f in filas)) for k, a in enumerate(actuales))
+
+
+_segmentos = {}
+
+
+def _columnas_de(segmento: Path):
+    cols = _segmentos.get(segmento)
+    if cols is None:
+        cols = _segmentos[segmento] = _ColumnasSegmento(segmento)
+    return cols.al_dia()
+
+
+def _sumar_numpy(columnas, lo, hi):
+    ts, ids, cant, precio = columnas
+    i = 0 if lo is None else int(np.searchsorted(ts, np.datetime64(lo, 's'), 'left'))
+    j = len(ts) if hi is None else int(np.searchsorted(ts, np.datetime64(hi, 's'), 'right'))
+    ids, cant, precio = ids[i:j], cant[i:j], precio[i:j]
+    if len(ids) == 0:
+        return 0.0, {}
+    ingresos = cant * precio
+    if ids.min() >= 0 and ids.max() < _BINCOUNT_MAX_ID:
+        unidades = np.bincount(ids, weights=cant).astype(np.int64)
+        claves = np.flatnonzero(unidades)
+        return float(ingresos.sum()), dict(zip(claves.tolist(), unidades[claves].tolist()))
+    claves, pos = np.unique(ids, return_inverse=True)
+    unidades = np.zeros(len(claves), np.int64)
+    np.add.at(unidades, pos, cant)
+    return float(ingresos.sum()), dict(zip(claves.tolist(), unidades.tolist()))
+
+
+def _sumar_python(columnas, lo, hi):
+    ts, ids, cant, precio = columnas
+    i = 0 if lo is None else bisect.bisect_left(ts, lo)
+    j = len(ts) if hi is None else bisect.bisect_right(ts, hi)
+    total = 0.0
+    conteo = {}
+    for pid, c, p in zip(ids[i:j], cant[i:j], precio[i:j]):
+        total += c * p
+        conteo[pid] = conteo.get(pid, 0) + c
+    return total, conteo
+
+
+def reporte(segmentos, lo=None, hi=None):
+    """
+    (total, {id_producto: unidades}) de las ventas de `segmentos` con lo <= timestamp <= hi.
+    Sólo incluye lo ya escrito en los archivos (las ventas pendientes del journal las suma negocio.py).
+    """
+    sumar = _sumar_numpy if np is not None else _sumar_python
+    total = 0.0
+    conteo = {}
+    for segmento in segmentos:
+        t, c = sumar(_columnas_de(segmento), lo, hi)
+        total += t
+        for pid, u in c.items():
+            conteo[pid] = conteo.get(pid, 0) + u
+    return total, conteo
+
+
+def descartar():
+    """Libera las columnas en memoria (se recargan en el próximo reporte)."""
+    _segmentos.clear()
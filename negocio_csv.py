@@ -0,0 +1,296 @@
+"""
+negocio_csv.py
+Motor CSV de negocio.py (el de siempre, por defecto): productos.csv y ventas.csv, o una partición
+de ventas por mes en data/ventas/, en la carpeta data/.
+
+BackendCSV sólo arma las operaciones; las piezas están en negocio.py (catálogo en memoria,
+segmentos de ventas, secuencias y bloqueo entre terminales) y en sus propios módulos:
+negocio_journal (journal y checkpoints), negocio_agregados (totales de ventas), negocio_indice
+(índice de fechas), negocio_archivo (ventas compactadas) y, para reportes por rango,
+negocio_columnar y negocio_paralelo.
+"""
+
+from collections import defaultdict
+
+import negocio
+
+
+class BackendCSV(negocio.Backend):
+    """
+    productos.csv + ventas.csv (o particiones por mes) con journal, agregados e índices de fechas.
+    Varias terminales pueden compartir la carpeta: las escrituras validan y anotan bajo negocio._bloqueo
+    con el estado al día (journal de las demás incluido); las lecturas no bloquean.
+    """
+    nombre = 'csv'
+
+    def __init__(self):
+        negocio._journal.recuperar()
+
+    def listar_productos(self):
+        negocio._journal.al_dia()
+        return negocio._productos.listar()
+
+    def obtener_producto(self, id_producto):
+        negocio._journal.al_dia()
+        return negocio._productos.obtener(id_producto)
+
+    def buscar_productos(self, consulta, limite):
+        negocio._journal.al_dia()
+        return negocio._productos.buscar(consulta, limite)
+
+    def agregar_producto(self, producto):
+        with negocio._bloqueo:
+            negocio._journal.al_dia()
+            minimo = negocio._productos.siguiente_id()
+            nuevo_id = negocio._secuencias.tomar('id_producto', minimo, lambda: minimo)
+            return negocio._confirmar(productos=[dict(producto, id=int(nuevo_id), version=0)])
+
+    def actualizar_producto(self, id_producto, cambios, version=None):
+        def intento():
+            # fuera del bloqueo: leer y preparar la fila nueva
+            negocio._journal.al_dia()
+            prod = negocio._productos.obtener(id_producto)
+            if prod is None:
+                return True, False
+            if version is not None and prod['version'] != version:
+                return True, negocio._conflicto(id_producto, prod['version'], version)
+            leida = prod['version']
+            nuevo = dict(prod, **cambios, version=leida + 1)
+            # bajo el bloqueo: confirmar sólo si nadie la cambió mientras tanto
+            with negocio._bloqueo:
+                negocio._journal.al_dia()
+                actual = negocio._productos.obtener(id_producto)
+                if actual is None:
+                    return True, False
+                if actual['version'] != leida:
+                    return False, False
+                return True, negocio._confirmar(productos=[nuevo])
+        return negocio._con_reintentos(intento)
+
+    def eliminar_producto(self, id_producto):
+        with negocio._bloqueo:
+            negocio._journal.al_dia()
+            if negocio._productos.obtener(id_producto) is None:
+                return False  # no existía
+            return negocio._confirmar(eliminados=[id_producto])
+
+    def iter_ventas(self, lo=None, hi=None, id_producto=None):
+        negocio._journal.al_dia()
+        negocio._archivo.al_dia()
+        return negocio._iter_ventas_csv(lo, hi, id_producto)
+
+    def ultimas_ventas(self, n):
+        negocio._journal.al_dia()
+        return negocio._ultimas_ventas_csv(n)
+
+    def ventas_nuevas(self, cursor, n):
+        negocio._journal.al_dia()
+        try:
+            desde = int(cursor['id'])
+            marcas = dict(cursor['archivos'])
+        except (TypeError, KeyError, ValueError):
+            return self._ventas_recientes(n)
+        nuevas = {}
+        archivos = {}
+        for segmento in negocio._segmentos_con_altas():
+            clave = negocio._clave_segmento(segmento)
+            try:
+                inodo = segmento.stat().st_ino
+            except FileNotFoundError:
+                continue
+            # un archivo que no se seguía (mes nuevo) se lee desde el principio
+            inodo_leido, offset, ultimo = marcas.get(clave, (inodo, 0, 0))
+            if inodo_leido != inodo or not negocio._archivo_cubre(segmento, offset, ultimo):
+                return self._ventas_recientes(n)  # truncado o reescrito (checkpoint ajeno, compactación)
+            for offset, campos in negocio._filas_desde(segmento, offset):
+                try:
+                    ultimo = int(campos[0])
+                except (ValueError, IndexError):
+                    continue  # cabecera o fila corrupta
+                if ultimo > desde:
+                    try:
+                        nuevas[ultimo] = negocio._venta_desde_fila(dict(zip(negocio.VENTAS_FIELDS, campos)))
+                    except (ValueError, TypeError):
+                        continue
+            archivos[clave] = [inodo, offset, ultimo]
+        for v in negocio._pendientes_sin_anexar():
+            if v['id_venta'] > desde:
+                nuevas[v['id_venta']] = v
+        if len(nuevas) > n:
+            return self._ventas_recientes(n)
+        ventas = [nuevas[i] for i in sorted(nuevas, reverse=True)]
+        return ventas, {'id': max(nuevas, default=desde), 'archivos': archivos}, False
+
+    def _ventas_recientes(self, n):
+        # la marca se toma antes de leer: lo que se anexe mientras tanto sale en la próxima lectura
+        archivos = {}
+        for segmento in negocio._segmentos_con_altas():
+            marca = negocio._marca_final(segmento)
+            if marca is not None:
+                archivos[negocio._clave_segmento(segmento)] = marca
+        ventas = negocio._ultimas_ventas_csv(n)
+        ultimo = ventas[0]['id_venta'] if ventas else max((m[2] for m in archivos.values()), default=0)
+        return ventas, {'id': ultimo, 'archivos': archivos}, True
+
+    def registrar_lineas(self, lineas, forma_pago, fecha):
+        # el stock se valida y se descuenta bajo el bloqueo: dos terminales no venden la misma unidad
+        with negocio._bloqueo:
+            negocio._journal.al_dia()
+            items, prods, error = negocio._preparar_lineas(lineas, negocio._productos.obtener)
+            if error:
+                return {'ok': False, 'mensaje': error}
+            for p in prods.values():
+                p['version'] += 1
+            primero = negocio._tomar_ids_venta(len(items))
+            nuevas = [{
+                'id_venta': primero + i,
+                'fecha': fecha,
+                'id_producto': it['id_producto'],
+                'cantidad': it['cantidad'],
+                'precio_unitario_venta': it['precio_unitario'],
+                'forma_pago': str(forma_pago or '')
+            } for i, it in enumerate(items)]
+            # ventas y stock decrementado viajan juntos en la misma entrada del journal
+            if not negocio._confirmar(ventas=nuevas, productos=list(prods.values())):
+                return {'ok': False, 'mensaje': 'Fallo al guardar la venta.'}
+        return {'ok': True, 'mensaje': '', 'ids': [v['id_venta'] for v in nuevas],
+                'total': negocio.calcular_total_venta(items)}
+
+    def aplicar_operaciones(self, operaciones):
+        with negocio._bloqueo:
+            negocio._journal.al_dia()
+            plan, error, conflicto = negocio._resolver_operaciones(operaciones, negocio._productos.obtener)
+            if error:
+                return {'ok': False, 'mensaje': error, 'conflicto': conflicto}
+            productos = [dict(p, version=p['version'] + 1) for p in plan['cambiados'].values()]
+            ids_productos = []
+            if plan['altas']:
+                # las altas con id propio lo conservan; la secuencia sigue después del mayor
+                automaticas = sum(1 for p in plan['altas'] if p.get('id') is None)
+                minimo = max([negocio._productos.siguiente_id()] + [p['id'] + 1 for p in plan['altas'] if p.get('id') is not None])
+                siguiente = negocio._secuencias.tomar('id_producto', minimo, lambda: minimo, automaticas)
+                for p in plan['altas']:
+                    if p.get('id') is None:
+                        p = dict(p, id=siguiente)
+                        siguiente += 1
+                    ids_productos.append(p['id'])
+                    productos.append(dict(p, version=0))
+            ventas, total = [], 0.0
+            lineas = sum(len(items) for items, _, _ in plan['tickets'])
+            siguiente = negocio._tomar_ids_venta(lineas) if lineas else 0
+            for items, forma_pago, fecha in plan['tickets']:
+                for it in items:
+                    ventas.append({'id_venta': siguiente, 'fecha': fecha, 'id_producto': it['id_producto'],
+                                   'cantidad': it['cantidad'], 'precio_unitario_venta': it['precio_unitario'],
+                                   'forma_pago': str(forma_pago or '')})
+                    siguiente += 1
+                total += negocio.calcular_total_venta(items)
+            # todo viaja en una sola entrada del journal y el checkpoint reescribe cada archivo una vez
+            if not negocio._confirmar(ventas=ventas, productos=productos, eliminados=plan['eliminados']):
+                return {'ok': False, 'mensaje': 'Fallo al guardar la transacción.', 'conflicto': False}
+            # si el checkpoint falla, el journal ya tiene todo y se reintenta en el próximo
+            negocio._sincronizar_csv()
+        return {'ok': True, 'mensaje': '', 'conflicto': False, 'ids_productos': ids_productos,
+                'ids_ventas': [v['id_venta'] for v in ventas], 'total': round(total, 2)}
+
+    def reporte(self, lo=None, hi=None):
+        negocio._journal.al_dia()
+        if not negocio._archivo.vacio:
+            # lo compactado viene del resumen del archivo; se suma a lo vivo
+            total, conteo = self._reporte_vivo(lo, hi)
+            total_archivo, conteo_archivo = negocio._archivo.reporte(lo, hi)
+            for pid, unidades in conteo_archivo.items():
+                conteo[pid] = conteo.get(pid, 0) + unidades
+            return total + total_archivo, conteo
+        return self._reporte_vivo(lo, hi)
+
+    def _reporte_vivo(self, lo=None, hi=None):
+        if lo is None and hi is None:
+            return negocio._agregados.total(), negocio._agregados.unidades_por_producto()
+        modo = negocio._modo_reportes()
+        segmentos = [s for s in negocio._segmentos_ventas() if negocio._segmento_en_rango(s, lo, hi)]
+        resultado = None
+        if modo == 'paralelo':
+            import negocio_paralelo
+            resultado = negocio_paralelo.reporte(negocio._rangos_de_bytes(segmentos, lo, hi), lo, hi,
+                                                 negocio._procesos_reportes())
+            if resultado is None:
+                modo = negocio._modo_reportes_serie()  # rango chico: repartir no compensa
+        if modo == 'columnar':
+            import negocio_columnar
+            resultado = negocio_columnar.reporte(segmentos, lo, hi)
+        if resultado is not None:
+            total, conteo = resultado
+            conteo = defaultdict(int, conteo)
+            for v in negocio._pendientes_sin_anexar():
+                t = negocio._timestamp(v.get('fecha'))
+                if t is not None and (lo is None or t >= lo) and (hi is None or t <= hi):
+                    total += v['precio_unitario_venta'] * v['cantidad']
+                    conteo[v['id_producto']] += v['cantidad']
+            return total, dict(conteo)
+        total = 0.0
+        conteo = defaultdict(int)
+        for v in negocio._iter_ventas_csv(lo, hi):
+            total += v['precio_unitario_venta'] * v['cantidad']
+            conteo[v['id_producto']] += v['cantidad']
+        return total, dict(conteo)
+
+    def mas_vendidos(self, top_n):
+        negocio._journal.al_dia()
+        if negocio._archivo.vacio:
+            return negocio._agregados.top(top_n)
+        conteo = negocio._agregados.unidades_por_producto()
+        for pid, unidades in negocio._archivo.totales()[1].items():
+            conteo[pid] = conteo.get(pid, 0) + unidades
+        return negocio._top_unidades(conteo.items(), top_n)
+
+    def compactar_ventas(self, corte):
+        with negocio._bloqueo:
+            if not negocio._sincronizar_csv():
+                return {'ok': False, 'mensaje': 'No se pudo vaciar el journal antes de compactar.', 'archivadas': 0}
+            return negocio._archivo.compactar(corte)
+
+    def ventas_archivadas(self):
+        return negocio._archivo.iter_ventas()
+
+    def reemplazar_todo(self, productos, ventas):
+        with negocio._bloqueo:
+            return self._reemplazar_todo(productos, ventas)
+
+    def _reemplazar_todo(self, productos, ventas):
+        if not negocio._sincronizar_csv():
+            return False
+        negocio._archivo.borrar()
+        if not negocio._escribir_csv_atomico(negocio._rutas.productos, negocio.PRODUCTOS_FIELDS, productos):
+            return False
+        # las ventas van a ventas.csv o a la partición de su mes, según el modo actual
+        ventas = sorted(ventas, key=lambda v: int(v['id_venta']))
+        grupos = dict(negocio._agrupar_por_segmento(ventas))
+        for segmento in negocio._segmentos_ventas():
+            if segmento not in grupos and segmento != negocio._rutas.ventas:
+                segmento.unlink(missing_ok=True)
+        grupos.setdefault(negocio._rutas.ventas, [])
+        for segmento, filas in grupos.items():
+            if not negocio._escribir_csv_atomico(segmento, negocio.VENTAS_FIELDS, filas):
+                return False
+        negocio._indices_fechas.clear()
+        for idx in negocio._rutas.datos.glob('**/*.idx'):
+            idx.unlink(missing_ok=True)
+        negocio._agregados.descartar()
+        return negocio._agregados.reconstruir()
+
+    def firma_datos(self):
+        # otra terminal escribe siempre en el journal (y al volcarlo lo reescribe); productos.csv
+        # puede editarse a mano; la carpeta de particiones y el archivo cambian al migrar o compactar
+        return negocio._firma_de(negocio._rutas.journal, negocio._rutas.productos, negocio._rutas.ventas, negocio._rutas.ventas_dir,
+                         negocio._rutas.archivo / 'estado.json')
+
+    def sincronizar(self, forzar=True):
+        return negocio._sincronizar_csv(forzar)
+
+    def reconstruir_agregados(self):
+        with negocio._bloqueo:
+            return negocio._sincronizar_csv() and negocio._agregados.reconstruir()
+
+    def cerrar(self):
+        negocio._bloqueo.cerrar()
@@ -0,0 +1,201 @@
+"""
+negocio_importar.py
+Importación de listas de productos de proveedor (CSV) para negocio.importar_productos().
+
+El archivo se lee fila a fila con csv.DictReader; las columnas se reconocen por nombres habituales
+(codigo, descripcion, rubro, precio, existencia...) o por un mapeo propio, y el delimitador y el
+separador decimal se detectan con una muestra del principio. Todo lo importado se guarda con una
+sola llamada a negocio.aplicar_operaciones(): una entrada del journal y una escritura del catálogo.
+"""
+
+import csv
+import io
+import re
+import time
+from itertools import islice
+
+import negocio
+
+# nombres de columna habituales en listas de proveedores (sin acentos, en minúsculas)
+_ALIAS_IMPORTACION = {
+    'id': 'id', 'codigo': 'id', 'id_producto': 'id',
+    'nombre': 'nombre', 'producto': 'nombre', 'descripcion': 'nombre', 'articulo': 'nombre',
+    'categoria': 'categoria', 'rubro': 'categoria', 'familia': 'categoria',
+    'precio_unitario': 'precio_unitario', 'precio': 'precio_unitario', 'precio_lista': 'precio_unitario',
+    'stock': 'stock', 'existencia': 'stock', 'cantidad': 'stock',
+    'unidad': 'unidad', 'um': 'unidad', 'unidad_medida': 'unidad',
+}
+
+def _campo_importacion(columna, columnas):
+    """Campo de producto para una columna del archivo: el mapeo indicado o un alias conocido."""
+    if columnas is not None:
+        return columnas.get(columna)
+    return _ALIAS_IMPORTACION.get(negocio._normalizar_texto(columna).strip().replace(' ', '_'))
+
+_NUMERO_DECIMAL = {
+    ',': re.compile(r'-?\d+(?:\.\d{3})*,\d+'),   # 1.234,50 / 12,3
+    '.': re.compile(r'-?\d+(?:,\d{3})*\.\d+'),   # 1,234.50 / 12.3
+}
+
+def _decimal_de_muestra(valores, delimitador):
+    """
+    Separador decimal de la lista ('.' o ','): el que aparece en los números de la muestra con
+    decimales. Un '1.234' solo no decide (puede ser miles); sin pistas, ',' si las columnas van
+    separadas por ';' (planillas en castellano) y si no '.'.
+    """
+    votos = {',': 0, '.': 0}
+    for valor in valores:
+        valor = valor.strip().replace('$', '').replace(' ', '')
+        for decimal, patron in _NUMERO_DECIMAL.items():
+            # 1.234 / 1,234 (un grupo de tres, sin decimales) encajan en los dos sentidos: no votan
+            if patron.fullmatch(valor) and not re.fullmatch(r'-?\d{1,3}[.,]\d{3}', valor):
+                votos[decimal] += 1
+    if votos[','] != votos['.']:
+        return max(votos, key=votos.get)
+    return ',' if delimitador == ';' else '.'
+
+def _numero_importado(texto, decimal='.'):
+    """
+    float de un número con el separador decimal del archivo; el otro separador sólo vale para
+    los miles en grupos de tres (1.234,50 con coma decimal, 1,234.50 con punto). Lo que no
+    encaja, como '1.5' en una lista con coma decimal, es ValueError: la fila sale con error en
+    vez de importarse con un precio mil veces menor.
+    """
+    texto = str(texto).strip().replace('$', '').replace(' ', '')
+    miles = '.' if decimal == ',' else ','
+    entero, _, fraccion = texto.partition(decimal)
+    if miles in entero:
+        if not re.fullmatch(r'-?\d{1,3}(?:' + re.escape(miles) + r'\d{3})+', entero):
+            raise ValueError('separador ambiguo')
+        entero = entero.replace(miles, '')
+    if fraccion and not fraccion.isdigit():
+        raise ValueError('no es un número')
+    return float(f'{entero}.{fraccion}' if fraccion else entero)
+
+def _fila_importada(fila, campos, decimal='.'):
+    """{campo: valor} de una fila del archivo, ya con su tipo. ValueError con el motivo si no sirve."""
+    datos = {}
+    for columna, campo in campos.items():
+        valor = (fila.get(columna) or '').strip()
+        if not valor:
+            continue
+        try:
+            if campo == 'precio_unitario':
+                datos[campo] = _numero_importado(valor, decimal)
+                if datos[campo] < 0:
+                    raise ValueError
+            elif campo in ('id', 'stock'):
+                numero = _numero_importado(valor, decimal)
+                if numero != int(numero) or (campo == 'id' and numero <= 0):
+                    raise ValueError
+                datos[campo] = int(numero)
+            else:
+                datos[campo] = valor
+        except ValueError:
+            tipo = 'un entero' if campo in ('id', 'stock') else 'un número'
+            raise ValueError(f'{campo} inválido (se esperaba {tipo}): {valor!r}') from None
+    if not datos:
+        raise ValueError('fila vacía')
+    return datos
+
+def _clave_natural(datos, clave):
+    return tuple(negocio._normalizar_texto(datos[k]).strip() for k in clave)
+
+def importar(ruta, modo, columnas, clave, delimitador, decimal, encoding):
+    """negocio.importar_productos(): ver ahí los parámetros y el resultado."""
+    t0 = time.perf_counter()
+    res = {'ok': False, 'filas': 0, 'altas': 0, 'actualizados': 0, 'eliminados': 0,
+           'errores': [], 'filas_con_error': 0, 'segundos': 0.0, 'filas_por_segundo': 0.0}
+    try:
+        if modo not in negocio.MODOS_IMPORTACION:
+            return dict(res, mensaje=f'Modo desconocido: {modo!r} (opciones: {", ".join(negocio.MODOS_IMPORTACION)}).')
+        with open(ruta, 'r', encoding=encoding, newline='') as f:
+            muestra = f.read(64 * 1024)
+            f.seek(0)
+            if delimitador is None:
+                try:
+                    delimitador = csv.Sniffer().sniff(muestra, delimiters=',;\t|').delimiter
+                except csv.Error:
+                    delimitador = ','
+            lector = csv.DictReader(f, delimiter=delimitador)
+            campos = {c: _campo_importacion(c, columnas) for c in lector.fieldnames or []}
+            campos = {c: campo for c, campo in campos.items() if campo in negocio.PRODUCTOS_FIELDS[:-1]}
+            mapeados = set(campos.values())
+            if 'nombre' not in mapeados and 'id' not in mapeados:
+                return dict(res, mensaje='El archivo no tiene columna de nombre ni de id '
+                                         f'(columnas: {", ".join(lector.fieldnames or [])}).')
+            if decimal is None:
+                numericas = [c for c, campo in campos.items() if campo in ('precio_unitario', 'stock')]
+                filas_muestra = islice(csv.DictReader(io.StringIO(muestra), delimiter=delimitador), 1000)
+                decimal = _decimal_de_muestra((fila.get(c) or '' for fila in filas_muestra for c in numericas),
+                                              delimitador)
+            if clave is None:
+                if 'id' in mapeados and modo != 'append':
+                    clave = ('id',)
+                else:
+                    # sólo columnas que el archivo trae: una categoría vacía no coincidiría con nada
+                    clave = tuple(k for k in ('nombre', 'categoria') if k in mapeados)
+            clave = tuple([clave] if isinstance(clave, str) else clave)
+            faltan = [k for k in clave if k not in mapeados]
+            if faltan and modo != 'append':
+                return dict(res, mensaje=f'La clave usa columnas que el archivo no tiene: {", ".join(faltan)}.')
+            catalogo = negocio.listar_productos()
+            existentes = {}
+            if modo != 'append':
+                for p in catalogo:
+                    existentes.setdefault(p['id'] if clave == ('id',) else _clave_natural(p, clave), p)
+            filas = {}  # clave -> datos (append: número de fila)
+            for n, fila in enumerate(lector, start=2):  # la fila 1 es la cabecera
+                res['filas'] += 1
+                try:
+                    datos = _fila_importada(fila, campos, decimal)
+                    if modo == 'append':
+                        k = n
+                    else:
+                        vacias = [c for c in clave if c not in datos]
+                        if vacias:
+                            raise ValueError(f'falta {", ".join(vacias)} (es parte de la clave)')
+                        k = datos['id'] if clave == ('id',) else _clave_natural(datos, clave)
+                    nuevo = k not in existentes and k not in filas
+                    if (nuevo or modo == 'append') and not datos.get('nombre'):
+                        raise ValueError('falta nombre para un producto nuevo')
+                except ValueError as e:
+                    res['filas_con_error'] += 1
+                    if len(res['errores']) < negocio.ERRORES_IMPORTACION:
+                        res['errores'].append({'fila': n, 'motivo': str(e)})
+                    continue
+                filas.setdefault(k, {}).update(datos)
+        operaciones = []
+        for k, datos in filas.items():
+            if clave != ('id',) or modo == 'append':
+                datos.pop('id', None)  # el id sólo se conserva si es la clave: lo asigna el motor
+            actual = None if modo == 'append' else existentes.get(k)
+            if actual is None:
+                operaciones.append(['alta', datos])
+                res['altas'] += 1
+            elif any(actual.get(c) != v for c, v in datos.items()):
+                operaciones.append(['cambio', actual['id'], datos, None])
+                res['actualizados'] += 1
+        if modo == 'replace':
+            quedan = {existentes[k]['id'] for k in filas if k in existentes}
+            for p in catalogo:
+                if p['id'] not in quedan:
+                    operaciones.append(['baja', p['id']])
+                    res['eliminados'] += 1
+        # todo junto: una sola entrada del journal y una sola reescritura de productos.csv
+        guardado = negocio.aplicar_operaciones(operaciones)
+        res['segundos'] = round(time.perf_counter() - t0, 3)
+        res['filas_por_segundo'] = round(res['filas'] / res['segundos'], 1) if res['segundos'] else 0.0
+        if not guardado['ok']:
+            return dict(res, altas=0, actualizados=0, eliminados=0, mensaje=guardado['mensaje'])
+        res['ok'] = True
+        res['mensaje'] = (f"{res['filas']} fila(s) leídas: {res['altas']} alta(s), {res['actualizados']} "
+                          f"actualizado(s), {res['eliminados']} eliminado(s), {res['filas_con_error']} con "
+                          f"error ({res['filas_por_segundo']:.0f} filas/s).")
+        return res
+    except (OSError, UnicodeDecodeError, csv.Error) as e:
+        print(f"[negocio] ERROR importar_productos: {e}")
+        return dict(res, mensaje=f'No se pudo leer {ruta}: {e}')
+    except Exception as e:
+        print(f"[negocio] ERROR importar_productos: {e}")
+        return dict(res, mensaje='Error interno al importar productos.')
@@ -0,0 +1,147 @@
+"""
+negocio_indice.py
+Índice de fechas de los archivos de ventas del motor CSV de negocio.py (ventas.idx y
+data/ventas/YYYY-MM.idx, uno junto a cada CSV).
+
+Para un reporte por rango, negocio.py hace bisect sobre el índice del archivo y lee sólo las
+filas del rango (ver negocio._ventas_en_rango); los reportes en paralelo usan los mismos límites
+para no cortar en trozos el archivo entero (negocio._rangos_de_bytes).
+"""
+
+import bisect
+import struct
+import sys
+from array import array
+from pathlib import Path
+
+import negocio
+
+
+class IndiceFechas:
+    """
+    Índice ordenado timestamp -> offset de fila de un archivo de ventas: un reporte por
+    rango hace bisect a la primera fila del rango y lee sólo esas filas.
+    En disco (mismo nombre con extensión .idx) se guardan los pares en el orden del CSV, sólo
+    anexando los de las filas nuevas; en memoria se mantienen ordenados por fecha. Si el CSV
+    se achicó o se reescribió, se reconstruye.
+    """
+    _CABECERA = struct.Struct('<4sIqqq')  # magia, versión, offset cubierto, último id, pares
+    _MAGIA = b'VIDX'
+    _VERSION = 1
+
+    def __init__(self, csv_path: Path):
+        self.csv_path = csv_path
+        self.filepath = csv_path.with_suffix('.idx')
+        self._ts = None  # array('q') ordenado
+        self._offsets = None  # array('q') alineado con _ts
+        self._cubierto = 0
+        self._ultimo_id = 0
+        self._n = 0
+
+    def _cargar(self):
+        self._ts, self._offsets = array('q'), array('q')
+        self._cubierto, self._ultimo_id, self._n = 0, 0, 0
+        try:
+            with self.filepath.open('rb') as f:
+                magia, version, cubierto, ultimo_id, n = self._CABECERA.unpack(f.read(self._CABECERA.size))
+                if magia != self._MAGIA or version != self._VERSION:
+                    raise ValueError("formato desconocido")
+                if not negocio._archivo_cubre(self.csv_path, cubierto, ultimo_id):
+                    raise ValueError("el CSV cambió")
+                pares = array('q')
+                pares.frombytes(f.read(16 * n))
+                if len(pares) != 2 * n:
+                    raise ValueError("índice incompleto")
+        except FileNotFoundError:
+            if negocio._metricas.activas:
+                negocio._metricas.cache('indice_fechas', False)
+            return
+        except Exception:
+            # se reconstruye desde cero con las filas actuales
+            if negocio._metricas.activas:
+                negocio._metricas.cache('indice_fechas', False)
+            return
+        if negocio._metricas.activas:
+            negocio._metricas.cache('indice_fechas', True)
+            negocio._metricas.lectura(0, self._CABECERA.size + 16 * n)
+        if sys.byteorder == 'big':
+            pares.byteswap()
+        self._cubierto, self._ultimo_id, self._n = cubierto, ultimo_id, n
+        self._agregar_pares(pares[0::2], pares[1::2])
+
+    def _agregar_pares(self, ts, offsets):
+        if not ts:
+            return
+        if (not self._ts or ts[0] >= self._ts[-1]) and all(a <= b for a, b in zip(ts, ts[1:])):
+            # caso normal: las ventas se anexan en orden cronológico
+            self._ts.extend(ts)
+            self._offsets.extend(offsets)
+            return
+        pares = sorted(zip(list(self._ts) + list(ts), list(self._offsets) + list(offsets)))
+        self._ts = array('q', (p[0] for p in pares))
+        self._offsets = array('q', (p[1] for p in pares))
+
+    def _guardar_nuevos(self, ts, offsets):
+        try:
+            if not self.filepath.exists() or self._n == 0:
+                with self.filepath.open('wb') as f:
+                    f.write(self._CABECERA.pack(self._MAGIA, self._VERSION, 0, 0, 0))
+            pares = array('q')
+            for t, o in zip(ts, offsets):
+                pares.append(t)
+                pares.append(o)
+            if sys.byteorder == 'big':
+                pares.byteswap()
+            with self.filepath.open('rb+') as f:
+                f.seek(self._CABECERA.size + 16 * self._n)
+                f.write(pares.tobytes())
+                f.truncate()
+                # la cabecera va al final: si se corta antes, los pares extra se ignoran
+                f.seek(0)
+                f.write(self._CABECERA.pack(self._MAGIA, self._VERSION, self._cubierto,
+                                            self._ultimo_id, self._n + len(ts)))
+            self._n += len(ts)
+        except OSError as e:
+            print(f"[negocio] ERROR al guardar índice de fechas: {e}")
+
+    def _al_dia(self):
+        if self._ts is None:
+            self._cargar()
+        ts, offsets = array('q'), array('q')
+        antes = inicio = self._cubierto
+        try:
+            negocio._asegurar_archivo(self.csv_path, negocio.VENTAS_FIELDS)
+            for fin, campos in negocio._filas_desde(self.csv_path, self._cubierto):
+                try:
+                    idv = int(campos[0])
+                except (ValueError, IndexError):
+                    idv = None  # cabecera o fila corrupta
+                t = negocio._timestamp(campos[1]) if idv is not None and len(campos) > 1 else None
+                if t is not None:
+                    ts.append(t)
+                    offsets.append(inicio)
+                if idv is not None:
+                    self._ultimo_id = idv
+                inicio = self._cubierto = fin
+        except OSError as e:
+            print(f"[negocio] ERROR al leer {self.csv_path}: {e}")
+        if self._cubierto != antes:
+            self._guardar_nuevos(ts, offsets)
+        self._agregar_pares(ts, offsets)
+
+    def offsets_en_rango(self, lo=None, hi=None):
+        """Offsets (ascendentes, para leer en orden) de las filas con lo <= fecha <= hi."""
+        self._al_dia()
+        i = 0 if lo is None else bisect.bisect_left(self._ts, lo)
+        j = len(self._ts) if hi is None else bisect.bisect_right(self._ts, hi)
+        return sorted(self._offsets[i:j])
+
+    def limites_en_rango(self, lo=None, hi=None):
+        """(primer offset, último offset + 1) de las filas con lo <= fecha <= hi, o None si no hay."""
+        self._al_dia()
+        i = 0 if lo is None else bisect.bisect_left(self._ts, lo)
+        j = len(self._ts) if hi is None else bisect.bisect_right(self._ts, hi)
+        if i >= j:
+            return None
+        offsets = self._offsets[i:j]
+        return min(offsets), max(offsets) + 1
@@ -0,0 +1,256 @@
+"""
+negocio_journal.py
+Journal write-ahead del motor CSV de negocio.py (data/negocio.journal).
+
+Cada cambio (ventas de un ticket, altas, ediciones y bajas de productos) se anota aquí, una
+línea JSON por cambio, antes de aplicarse en memoria; los CSV se ponen al día por grupos en el
+checkpoint. Al iniciar, recuperar() reaplica lo que un crash dejó anotado, y varias terminales
+que comparten data/ se leen el journal unas a otras (ver Journal.al_dia).
+El lote y la ventana de tiempo del group commit son negocio.JOURNAL_LOTE y negocio.JOURNAL_VENTANA_S.
+"""
+
+import csv
+import json
+import os
+import time
+from pathlib import Path
+
+import negocio
+
+
+class Journal:
+    """
+    Registro write-ahead (JOURNAL_FILE, una línea JSON por cambio) de ventas y cambios de productos.
+    Cada cambio se anota aquí antes de aplicarse en memoria. Los CSV se ponen al día en el
+    checkpoint: fsync del journal, anexo de las ventas pendientes, reescritura atómica de
+    productos.csv, fsync y vaciado del journal. Así una ráfaga de ventas paga un fsync por
+    grupo y no por venta, y un crash nunca deja ventas y stock desalineados: recuperar()
+    reaplica al iniciar lo que quedó anotado.
+    Varias terminales comparten el journal: cada una anota bajo el bloqueo y al_dia() aplica en
+    memoria lo que anotaron las demás. La primera línea lleva la generación, que sube con cada
+    checkpoint; si cambió, otro proceso ya volcó todo a los CSV y lo de memoria se relee de ahí.
+    """
+
+    def __init__(self, filepath: Path):
+        self._filepath = filepath
+        self.ventas_pendientes = []
+        self._f = None
+        self._pendientes = 0
+        self._desde = None
+        self._recuperado = False
+        self._generacion = None  # generación del journal ya aplicada en memoria
+        self._leido = 0  # bytes del journal ya aplicados (propios o de otros procesos)
+        self._visto = None  # (tamaño, mtime) en la última revisión
+
+    @property
+    def filepath(self):
+        return negocio._ruta(self._filepath)
+
+    @staticmethod
+    def _cabecera(linea):
+        """Generación si la línea es la cabecera del journal, o None (journal sin cabecera)."""
+        try:
+            datos = json.loads(linea)
+            return int(datos['generacion']) if isinstance(datos, dict) and 'generacion' in datos else None
+        except (ValueError, TypeError):
+            return None
+
+    def registrar(self, entrada):
+        """Anota un cambio. Se llama bajo el bloqueo y después de al_dia()."""
+        try:
+            if self._f is None:
+                self._f = self.filepath.open('a', encoding='utf-8')
+            linea = json.dumps(entrada, ensure_ascii=False) + '\n'
+            self._f.write(linea)
+            self._f.flush()
+            self._leido = os.fstat(self._f.fileno()).st_size  # lo propio ya está aplicado
+            if negocio._metricas.activas:
+                negocio._metricas.escritura(len(linea.encode('utf-8')))
+        except Exception as e:
+            print(f"[negocio] ERROR al escribir journal: {e}")
+            return False
+        self._contar()
+        return True
+
+    def _contar(self):
+        self._pendientes += 1
+        if self._desde is None:
+            self._desde = time.monotonic()
+
+    def al_dia(self):
+        """
+        Aplica en memoria los cambios que otros procesos anotaron desde la última revisión.
+        No toma el bloqueo: una línea a medio escribir se deja para la próxima.
+        """
+        try:
+            st = self.filepath.stat()
+            firma = (st.st_size, st.st_mtime_ns)
+        except FileNotFoundError:
+            firma = None
+        if firma == self._visto:
+            return
+        if firma is None:
+            if self._generacion not in (None, 0):
+                self._checkpoint_ajeno()
+            self._generacion, self._leido, self._visto = 0, 0, None
+            return
+        with self.filepath.open('rb') as f:
+            primera = f.readline()
+            generacion = self._cabecera(primera) if primera.endswith(b'\n') else None
+            if generacion is None:
+                generacion, inicio = 0, 0
+            else:
+                inicio = len(primera)
+            if generacion != self._generacion:
+                if self._generacion is not None:
+                    self._checkpoint_ajeno()
+                self._generacion, self._leido = generacion, inicio
+            f.seek(self._leido)
+            for linea in f:
+                if not linea.endswith(b'\n'):
+                    break
+                self._leido += len(linea)
+                try:
+                    entrada = json.loads(linea)
+                except ValueError:
+                    continue  # línea cortada por un crash de otro proceso
+                self._aplicar_ajena(entrada)
+        self._visto = firma if self._leido >= firma[0] else None
+
+    def _aplicar_ajena(self, entrada):
+        negocio._productos.aplicar(entrada.get('productos', []), entrada.get('eliminados', []))
+        ventas = [dict(v) for v in entrada.get('ventas', [])]
+        self.ventas_pendientes.extend(ventas)
+        negocio._agregados.sumar(ventas)
+        self._contar()
+
+    def _checkpoint_ajeno(self):
+        # otro proceso volcó a los CSV todo lo anotado hasta ahora (también lo nuestro)
+        if self.ventas_pendientes:
+            negocio._agregados.al_dia()  # las filas anexadas que ya estaban sumadas se quitan de pendientes
+            if self.ventas_pendientes:
+                negocio._agregados.descartar()
+        self.ventas_pendientes = []
+        negocio._productos.descartar()
+        self._pendientes = 0
+        self._desde = None
+
+    def debe_confirmar(self):
+        if not self._pendientes:
+            return False
+        return (self._pendientes >= negocio.JOURNAL_LOTE
+                or time.monotonic() - self._desde >= negocio.JOURNAL_VENTANA_S)
+
+    def checkpoint(self):
+        with negocio._bloqueo:
+            self.al_dia()
+            if not self._pendientes:
+                return True
+            try:
+                if self._f is None:
+                    self._f = self.filepath.open('a', encoding='utf-8')
+                os.fsync(self._f.fileno())
+                if self.ventas_pendientes:
+                    # contar antes lo que otro proceso haya anexado, para no cubrirlo sin sumarlo
+                    negocio._agregados.al_dia()
+                    for segmento, filas in negocio._agrupar_por_segmento(self.ventas_pendientes):
+                        if not negocio._anexar_csv(segmento, negocio.VENTAS_FIELDS, filas, fsync=True):
+                            return False
+                        negocio._agregados.cubrir_anexadas(segmento, filas)
+                        ids = {v['id_venta'] for v in filas}
+                        self.ventas_pendientes = [v for v in self.ventas_pendientes if v['id_venta'] not in ids]
+                if negocio._productos.sucio and not negocio._productos.guardar():
+                    return False
+            except Exception as e:
+                # el journal se conserva: se reintenta en el siguiente checkpoint
+                print(f"[negocio] ERROR en checkpoint: {e}")
+                return False
+            self._vaciar()
+            return True
+
+    def _vaciar(self):
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+        generacion = (self._generacion or 0) + 1
+        cabecera = json.dumps({'generacion': generacion}) + '\n'
+        with self.filepath.open('w', encoding='utf-8') as f:
+            f.write(cabecera)
+        self._generacion, self._leido, self._visto = generacion, len(cabecera), None
+        self._pendientes = 0
+        self._desde = None
+
+    def recuperar(self):
+        """
+        Reaplica a los CSV los cambios que quedaron en el journal (crash antes del checkpoint,
+        u otra terminal que todavía no hizo checkpoint). Se hace una vez por proceso, bajo el
+        bloqueo, antes del primer uso de los CSV.
+        """
+        if self._recuperado:
+            return
+        self._recuperado = True
+        with negocio._bloqueo:
+            self._recuperar()
+
+    def _recuperar(self):
+        entradas = []
+        generacion = 0
+        try:
+            with self.filepath.open('r', encoding='utf-8') as f:
+                for n, linea in enumerate(f):
+                    if n == 0 and self._cabecera(linea) is not None:
+                        generacion = self._cabecera(linea)
+                        continue
+                    try:
+                        entradas.append(json.loads(linea))
+                    except ValueError:
+                        continue  # línea cortada por el crash
+        except FileNotFoundError:
+            self._generacion = 0
+            return
+        except Exception as e:
+            print(f"[negocio] ERROR al leer journal: {e}")
+            return
+        self._generacion = generacion
+        if not entradas:
+            self._leido = self.filepath.stat().st_size
+            return
+        ventas = [v for e in entradas for v in e.get('ventas', [])]
+        for segmento, filas in negocio._agrupar_por_segmento(ventas):
+            # quitar lo que un checkpoint a medias alcanzó a anexar y volver a anexar completo
+            recortar_ventas_desde(segmento, min(int(v['id_venta']) for v in filas))
+            if not negocio._anexar_csv(segmento, negocio.VENTAS_FIELDS, filas, fsync=True):
+                return
+        for e in entradas:
+            negocio._productos.aplicar(e.get('productos', []), e.get('eliminados', []))
+        if negocio._productos.sucio and not negocio._productos.guardar():
+            return
+        # las ventas ya anexadas no deben volver a sumarse si los agregados estaban cargados
+        negocio._agregados.descartar()
+        self._vaciar()
+        print(f"[negocio] journal: {len(entradas)} cambio(s) recuperado(s).")
+
+
+def recortar_ventas_desde(segmento: Path, id_venta):
+    """Trunca del final del archivo de ventas las filas con id >= id_venta y cualquier línea incompleta."""
+    if not segmento.exists():
+        return
+    try:
+        with segmento.open('rb+') as f:
+            corte = None
+            for offset, linea in negocio._lineas_hacia_atras(f):
+                try:
+                    campos = next(csv.reader([linea.decode('utf-8', errors='replace')]))
+                    idv = int(campos[0])
+                    completa = len(campos) == len(negocio.VENTAS_FIELDS)
+                except (ValueError, IndexError, StopIteration):
+                    if offset == 0:
+                        break  # cabecera
+                    idv, completa = None, False
+                if idv is not None and idv < id_venta and completa:
+                    break
+                corte = offset
+            if corte is not None:
+                f.truncate(corte)
+    except OSError as e:
+        print(f"[negocio] ERROR al reparar {segmento}: {e}")
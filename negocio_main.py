@@ -3,26 +3,265 @@ negocio_main.py
 Interfaz gráfica mínima y funcional (Tkinter) que usa negocio.py como backend.
 
 Características:
- - Muestra productos en un Treeview.
+ - Muestra productos en un Treeview, con búsqueda mientras se escribe (Inventario y combo de venta).
  - Permite agregar / actualizar / eliminar productos (validando entradas).
- - Permite registrar una venta simple (selección de producto + cantidad) y guarda en ventas.csv,
-   actualizando stock.
+ - Permite armar un ticket con varias líneas (carrito) y registrarlo de una vez en ventas.csv,
+   actualizando stock (todo o nada).
  - Genera un reporte simple de ventas (total).
  - Maneja errores con mensajes (no crashea).
+ - Las llamadas a negocio (disco) corren en un hilo aparte (TrabajadorIO): la ventana no se
+   congela mientras cargan CSV grandes.
+ - Al abrir imprime cuánto tardó cada fase del arranque ([arranque] en la consola).
+ - Pestaña Rendimiento: llamadas y latencias por función, filas/bytes leídos y cachés (negocio.metricas()).
+ - Con --servidor host:puerto trabaja como cliente de negocio_servidor.py (varias cajas, un solo estado).
+ - Las listas se actualizan solas cuando cambian los datos, también si los cambió otra terminal
+   (negocio_observador.py); contra un servidor se consultan cada INTERVALO_REMOTO_MS.
 """
 
+import time
+_T0 = time.perf_counter()  # inicio del arranque, antes de las importaciones pesadas
+
+import argparse
+import queue
 import tkinter as tk
 from tkinter import ttk, messagebox
 import negocio  # el backend (asegúrate que negocio.py esté en el mismo directorio)
+import os
+import sys
 import threading
 
+# A quién se le piden los datos: negocio.py en este proceso o, con --servidor host:puerto
+# (o NEGOCIO_SERVIDOR), un negocio_servidor.py compartido por varias cajas (ver main()).
+api = negocio
+
+# Listas largas: con más de UMBRAL_PAGINADO filas la tabla muestra TAMANO_PAGINA filas y
+# agrega otra página al llegar al final con el scroll.
+UMBRAL_PAGINADO = 2000
+TAMANO_PAGINA = 200
+# Búsqueda mientras se escribe: espera tras la última tecla y resultados del combo de venta
+PAUSA_BUSQUEDA_MS = 200
+LIMITE_BUSQUEDA_COMBO = 50
+# refresco de la pestaña Rendimiento mientras está a la vista
+INTERVALO_METRICAS_MS = 1000
+# avisos del observador de archivos: cada cuánto se revisan desde Tk
+INTERVALO_CAMBIOS_MS = 100
+# con --servidor no hay archivos locales que observar: se consulta cada tanto
+INTERVALO_REMOTO_MS = 3000
+
+class RelojArranque:
+    """
+    Tiempos del arranque medidos desde que se empezó a importar este módulo (Python no da la
+    hora de inicio del proceso de forma portable). Cada fase se marca una sola vez; cuando
+    están todas se imprime el resumen.
+    """
+
+    def __init__(self, inicio, fases):
+        self.inicio = inicio
+        self.fases = fases
+        self.marcas = {}
+
+    def marcar(self, fase):
+        if fase in self.marcas:
+            return
+        self.marcas[fase] = (time.perf_counter() - self.inicio) * 1000
+        if len(self.marcas) == len(self.fases):
+            detalle = ', '.join(f"{f} {self.marcas[f]:.0f}ms" for f in self.fases)
+            print(f"[arranque] {detalle}")
+
+reloj_arranque = RelojArranque(_T0, ('imports', 'ui', 'primer_dibujo', 'productos'))
+reloj_arranque.marcar('imports')
+
+class VistaTabla:
+    """
+    Treeview con ids estables (id de producto, id_venta): al refrescar aplica sólo las altas,
+    cambios y bajas respecto de lo que ya muestra, en vez de borrar y reinsertar todo.
+    Con más de `umbral` filas (None = nunca) pasa a paginado por ventana: inserta una página y
+    agrega la siguiente cuando el scroll llega al final. Si ya se mostraron todas las filas
+    cargadas, el scroll al final llama a `cargar_mas` (para pedir más datos a negocio).
+    """
+
+    def __init__(self, tree, scrollbar, umbral=UMBRAL_PAGINADO, pagina=TAMANO_PAGINA, cargar_mas=None):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.umbral = umbral
+        self.pagina = pagina
+        self.cargar_mas = cargar_mas
+        self.filas = []
+        self._mostradas = {}  # iid -> valores en pantalla
+        self._limite = None  # filas insertadas cuando hay paginado
+        tree.configure(yscrollcommand=self._al_desplazar)
+        scrollbar.configure(command=tree.yview)
+
+    def mostrar(self, filas):
+        """filas: lista ordenada de (iid, valores)."""
+        self.filas = filas
+        if self.umbral is not None and len(filas) > self.umbral:
+            if self._limite is None:
+                self._limite = self.pagina
+        else:
+            self._limite = None
+        self._aplicar()
+
+    def _aplicar(self):
+        deseadas = self.filas if self._limite is None else self.filas[:self._limite]
+        ids = {iid for iid, _ in deseadas}
+        bajas = [iid for iid in self._mostradas if iid not in ids]
+        if bajas:
+            self.tree.delete(*bajas)
+            for iid in bajas:
+                del self._mostradas[iid]
+        # si las que quedan ya están en orden, basta insertar las nuevas en su posición
+        en_orden = list(self.tree.get_children()) == [iid for iid, _ in deseadas if iid in self._mostradas]
+        for i, (iid, vals) in enumerate(deseadas):
+            previos = self._mostradas.get(iid)
+            if previos is None:
+                self.tree.insert('', i, iid=iid, values=vals)
+            else:
+                if previos != vals:
+                    self.tree.item(iid, values=vals)
+                if not en_orden:
+                    self.tree.move(iid, '', i)
+            self._mostradas[iid] = vals
+
+    def _al_desplazar(self, primero, ultimo):
+        self.scrollbar.set(primero, ultimo)
+        # sólo cuando el usuario bajó hasta el final (si todo entra en pantalla, primero es 0)
+        if float(primero) > 0 and float(ultimo) >= 0.98:
+            if self._limite is not None and self._limite < len(self.filas):
+                self._limite += self.pagina
+                self._aplicar()
+            elif self.cargar_mas is not None:
+                self.cargar_mas()
+
+class TrabajadorIO:
+    """
+    Hilo único que ejecuta las llamadas a negocio fuera del mainloop de Tk.
+    - enviar(fn, al_terminar, clave): encola fn; su resultado vuelve por una cola que se vacía con
+      root.after, así al_terminar(resultado) corre en el hilo de Tk y puede tocar widgets.
+    - Con `clave`, un pedido nuevo deja obsoletos los anteriores de la misma clave: si no
+      empezaron no se ejecutan y si ya terminaron su resultado se descarta (refrescos repetidos).
+    - Un solo hilo: las llamadas a negocio siguen serializadas como cuando corrían en Tk.
+    """
+    INTERVALO_MS = 30
+
+    def __init__(self, root, al_cambiar_ocupado=None):
+        self.root = root
+        self._pedidos = queue.Queue()
+        self._resultados = queue.Queue()
+        self._lock = threading.Lock()
+        self._generacion = {}
+        self._pendientes = 0  # pedidos que muestran el indicador (sólo se toca desde Tk)
+        self._ocupado = False
+        self._al_cambiar_ocupado = al_cambiar_ocupado
+        self._hilo = threading.Thread(target=self._bucle, name='negocio-io', daemon=True)
+        self._hilo.start()
+        self.root.after(self.INTERVALO_MS, self._drenar)
+
+    def enviar(self, fn, al_terminar=None, clave=None, al_fallar=None, ocupa=True):
+        gen = 0
+        if clave is not None:
+            with self._lock:
+                gen = self._generacion[clave] = self._generacion.get(clave, 0) + 1
+        if ocupa:
+            self._pendientes += 1
+            self._notificar()
+        self._pedidos.put((fn, al_terminar, al_fallar, clave, gen, ocupa))
+
+    def _vigente(self, clave, gen):
+        if clave is None:
+            return True
+        with self._lock:
+            return self._generacion.get(clave) == gen
+
+    def _bucle(self):
+        while True:
+            pedido = self._pedidos.get()
+            if pedido is None:
+                return
+            fn, _, _, clave, gen, _ = pedido
+            if not self._vigente(clave, gen):
+                self._resultados.put((pedido, None, None, False))  # cancelado antes de empezar
+                continue
+            try:
+                self._resultados.put((pedido, fn(), None, True))
+            except Exception as e:
+                self._resultados.put((pedido, None, e, True))
+
+    def _drenar(self):
+        while True:
+            try:
+                pedido, resultado, error, ejecutado = self._resultados.get_nowait()
+            except queue.Empty:
+                break
+            _, al_terminar, al_fallar, clave, gen, ocupa = pedido
+            if ocupa:
+                self._pendientes -= 1
+            if not ejecutado or not self._vigente(clave, gen):
+                continue
+            try:
+                if error is not None:
+                    if al_fallar is not None:
+                        al_fallar(error)
+                    else:
+                        print("TrabajadorIO:", error)
+                elif al_terminar is not None:
+                    al_terminar(resultado)
+            except Exception as e:
+                print("TrabajadorIO (callback):", e)
+        self._notificar()
+        self.root.after(self.INTERVALO_MS, self._drenar)
+
+    def _notificar(self):
+        ocupado = self._pendientes > 0
+        if ocupado != self._ocupado:
+            self._ocupado = ocupado
+            if self._al_cambiar_ocupado is not None:
+                self._al_cambiar_ocupado(ocupado)
+
+    def cerrar(self, espera=5.0):
+        """Termina lo ya encolado (ventas incluidas) y detiene el hilo."""
+        self._pedidos.put(None)
+        self._hilo.join(espera)
+
 class App:
     def __init__(self, root):
         self.root = root
-        self.root.title("Sistema - Inventario y Ventas")
+        self.root.title("Sistema - Inventario y Ventas" if api is negocio
+                        else f"Sistema - Inventario y Ventas ({api.host}:{api.puerto})")
         self.root.geometry("900x620")
+        self.carrito = []  # líneas del ticket en curso
+        self.limite_ventas = TAMANO_PAGINA  # ventas recientes pedidas a negocio
+        self.ventas = []  # las que muestra la lista, la más nueva primero
+        self.cursor_ventas = None  # hasta dónde se leyó (negocio.ventas_nuevas)
+        self.nombres = {}  # id de producto -> nombre, para la lista de ventas
+        self.combo_todos = []  # valores del combo sin filtro
+        self._pausas = {}  # búsquedas esperando a que se deje de escribir
+        self.versiones = {}  # id -> versión mostrada; al actualizar se pide que no haya cambiado
+        self.version_editada = None
         self.build_ui()
+        reloj_arranque.marcar('ui')
+        self.root.bind('<Map>', self.al_mostrarse, add='+')
+        self.io = TrabajadorIO(self.root, self.mostrar_ocupado)
+        self.root.protocol("WM_DELETE_WINDOW", self.cerrar)
         self.refresh_productos()
+        self.root.after(500, self.checkpoint_periodico)
+        self.root.after(INTERVALO_METRICAS_MS, self.refresh_rendimiento)
+        self.cambios = queue.Queue()  # temas avisados por el observador (desde su hilo)
+        self.observador = None
+        if api is negocio:
+            import negocio_observador
+            self.observador = negocio_observador.Observador()
+            for tema in negocio_observador.TEMAS:
+                self.observador.suscribir(tema, self.cambios.put)
+            self.observador.iniciar()
+            self.root.after(INTERVALO_CAMBIOS_MS, self.atender_cambios)
+        else:
+            self.root.after(INTERVALO_REMOTO_MS, self.refresco_remoto)
+
+    def al_mostrarse(self, event):
+        if event.widget is self.root:
+            # la ventana ya está en pantalla; el primer dibujo termina al vaciarse la cola de eventos
+            self.root.after_idle(reloj_arranque.marcar, 'primer_dibujo')
 
     def build_ui(self):
         # Tab control
@@ -52,16 +291,28 @@ class App:
         ttk.Button(btn_frame, text="Actualizar", command=self.ui_actualizar_producto).pack(fill='x', pady=6)
         ttk.Button(btn_frame, text="Eliminar", command=self.ui_eliminar_producto).pack(fill='x', pady=6)
         ttk.Button(btn_frame, text="Limpiar", command=self.limpiar_campos).pack(fill='x', pady=6)
-        ttk.Button(btn_frame, text="Refrescar lista", command=self.refresh_productos).pack(fill='x', pady=6)
+
+        # búsqueda (nombre, categoría o id; sin distinguir tildes)
+        fbus = ttk.Frame(f_inv)
+        fbus.pack(fill='x', padx=8)
+        ttk.Label(fbus, text="Buscar:").pack(side='left')
+        self.entry_buscar = ttk.Entry(fbus, width=40)
+        self.entry_buscar.pack(side='left', padx=6)
+        self.entry_buscar.bind('<KeyRelease>', lambda e: self.con_pausa('inventario', self.refresh_productos))
 
         # productos list
         cols = ("id", "nombre", "categoria", "precio_unitario", "stock", "unidad")
-        self.tree = ttk.Treeview(f_inv, columns=cols, show='headings', height=10)
+        ftree = ttk.Frame(f_inv)
+        ftree.pack(fill='both', expand=True, padx=8, pady=6)
+        self.tree = ttk.Treeview(ftree, columns=cols, show='headings', height=10)
         for c in cols:
             self.tree.heading(c, text=c.capitalize())
             self.tree.column(c, anchor='center')
-        self.tree.pack(fill='both', expand=True, padx=8, pady=6)
+        scroll = ttk.Scrollbar(ftree, orient='vertical')
+        scroll.pack(side='right', fill='y')
+        self.tree.pack(fill='both', expand=True)
         self.tree.bind('<<TreeviewSelect>>', self.on_select_producto)
+        self.vista_productos = VistaTabla(self.tree, scroll)
 
         # -- Ventas tab
         f_v = ttk.Frame(nb)
@@ -70,12 +321,34 @@ class App:
         fv.pack(fill='x', padx=8, pady=6)
 
         ttk.Label(fv, text="Producto:").grid(row=0, column=0, padx=6, pady=4, sticky='e')
-        self.combo_producto = ttk.Combobox(fv, values=[], state='readonly', width=40)
+        # editable: al escribir se filtra la lista (flecha abajo la despliega)
+        self.combo_producto = ttk.Combobox(fv, values=[], width=40)
         self.combo_producto.grid(row=0, column=1, padx=6, pady=4, sticky='w')
+        self.combo_producto.bind('<KeyRelease>', self.on_tecla_combo)
         ttk.Label(fv, text="Cantidad:").grid(row=1, column=0, padx=6, pady=4, sticky='e')
         self.entry_cantidad = ttk.Entry(fv, width=10)
         self.entry_cantidad.grid(row=1, column=1, padx=6, pady=4, sticky='w')
-        ttk.Button(fv, text="Registrar Venta", command=self.ui_registrar_venta).grid(row=2, column=0, columnspan=2, pady=8)
+        ttk.Label(fv, text="Forma de pago:").grid(row=2, column=0, padx=6, pady=4, sticky='e')
+        self.combo_pago = ttk.Combobox(fv, values=["Efectivo", "Tarjeta"], state='readonly', width=12)
+        self.combo_pago.current(0)
+        self.combo_pago.grid(row=2, column=1, padx=6, pady=4, sticky='w')
+        fbtn = ttk.Frame(fv)
+        fbtn.grid(row=3, column=0, columnspan=2, pady=6)
+        ttk.Button(fbtn, text="Agregar a venta", command=self.ui_agregar_al_carrito).pack(side='left', padx=4)
+        ttk.Button(fbtn, text="Quitar línea", command=self.ui_quitar_del_carrito).pack(side='left', padx=4)
+        ttk.Button(fbtn, text="Limpiar venta", command=self.limpiar_carrito).pack(side='left', padx=4)
+        ttk.Button(fbtn, text="Registrar Venta", command=self.ui_registrar_venta).pack(side='left', padx=4)
+
+        # ticket en curso
+        fc = ttk.LabelFrame(f_v, text="Listado de la Venta")
+        fc.pack(fill='both', expand=True, padx=8, pady=6)
+        self.tree_carrito = ttk.Treeview(fc, columns=("producto", "cantidad", "precio", "subtotal"), show='headings', height=5)
+        for h in ("producto", "cantidad", "precio", "subtotal"):
+            self.tree_carrito.heading(h, text=h.capitalize())
+            self.tree_carrito.column(h, anchor='center')
+        self.tree_carrito.pack(fill='both', expand=True)
+        self.lbl_total = ttk.Label(fc, text="Total de la Venta: 0.00")
+        self.lbl_total.pack(anchor='e', padx=6, pady=4)
 
         # ventas list
         fv2 = ttk.LabelFrame(f_v, text="Ventas registradas (recientes)")
@@ -84,17 +357,160 @@ class App:
         for h in ("id_venta", "fecha", "producto", "cantidad", "precio", "forma_pago"):
             self.tree_ventas.heading(h, text=h.capitalize())
             self.tree_ventas.column(h, anchor='center')
+        scroll = ttk.Scrollbar(fv2, orient='vertical')
+        scroll.pack(side='right', fill='y')
         self.tree_ventas.pack(fill='both', expand=True)
-
-        ttk.Button(f_v, text="Refrescar ventas", command=self.refresh_ventas).pack(pady=6)
+        # las ventas se piden a negocio de a una página: al final del scroll se carga la siguiente
+        self.vista_ventas = VistaTabla(self.tree_ventas, scroll, umbral=None, cargar_mas=self.cargar_mas_ventas)
 
         # -- Reportes tab
         f_r = ttk.Frame(nb)
+        self.f_reportes = f_r
         nb.add(f_r, text="Reportes")
         ttk.Button(f_r, text="Total ventas y productos más vendidos", command=self.ui_reporte).pack(pady=10)
         self.txt_reporte = tk.Text(f_r, height=20)
         self.txt_reporte.pack(fill='both', expand=True, padx=8, pady=6)
 
+        # -- Rendimiento tab (métricas de negocio en vivo)
+        self.notebook = nb
+        self.f_rendimiento = ttk.Frame(nb)
+        nb.add(self.f_rendimiento, text="Rendimiento")
+        fm = ttk.Frame(self.f_rendimiento)
+        fm.pack(fill='x', padx=8, pady=6)
+        self.var_metricas = tk.BooleanVar(value=False)
+        ttk.Checkbutton(fm, text="Registrar métricas", variable=self.var_metricas,
+                        command=self.ui_activar_metricas).pack(side='left')
+        ttk.Button(fm, text="Reiniciar", command=self.ui_reiniciar_metricas).pack(side='left', padx=8)
+        self.lbl_metricas = ttk.Label(fm, text="")
+        self.lbl_metricas.pack(side='left', padx=8)
+        ff = ttk.LabelFrame(self.f_rendimiento, text="Funciones")
+        ff.pack(fill='both', expand=True, padx=8, pady=6)
+        cols_f = ("funcion", "llamadas", "media_ms", "p50_ms", "p99_ms", "max_ms")
+        self.tree_funciones = ttk.Treeview(ff, columns=cols_f, show='headings', height=12)
+        for c in cols_f:
+            self.tree_funciones.heading(c, text=c.capitalize())
+            self.tree_funciones.column(c, anchor='center')
+        scroll = ttk.Scrollbar(ff, orient='vertical')
+        scroll.pack(side='right', fill='y')
+        self.tree_funciones.pack(fill='both', expand=True)
+        self.vista_funciones = VistaTabla(self.tree_funciones, scroll, umbral=None)
+        fc2 = ttk.LabelFrame(self.f_rendimiento, text="Cachés")
+        fc2.pack(fill='x', padx=8, pady=6)
+        cols_c = ("cache", "aciertos", "fallos", "ratio")
+        self.tree_caches = ttk.Treeview(fc2, columns=cols_c, show='headings', height=5)
+        for c in cols_c:
+            self.tree_caches.heading(c, text=c.capitalize())
+            self.tree_caches.column(c, anchor='center')
+        scroll = ttk.Scrollbar(fc2, orient='vertical')
+        scroll.pack(side='right', fill='y')
+        self.tree_caches.pack(fill='x', expand=True)
+        self.vista_caches = VistaTabla(self.tree_caches, scroll, umbral=None)
+
+        # -- barra de estado (indicador de trabajo en segundo plano)
+        fe = ttk.Frame(self.root)
+        fe.pack(fill='x', side='bottom', padx=8, pady=(0, 6))
+        self.lbl_estado = ttk.Label(fe, text="")
+        self.lbl_estado.pack(side='left')
+        self.barra_estado = ttk.Progressbar(fe, mode='indeterminate', length=120)
+
+    def mostrar_ocupado(self, ocupado):
+        if ocupado:
+            self.lbl_estado.config(text="Cargando...")
+            self.barra_estado.pack(side='left', padx=6)
+            self.barra_estado.start(15)
+            self.root.config(cursor='watch')
+        else:
+            self.lbl_estado.config(text="")
+            self.barra_estado.stop()
+            self.barra_estado.pack_forget()
+            self.root.config(cursor='')
+
+    def checkpoint_periodico(self):
+        # vuelca el journal a los CSV cuando se cumple la ventana de tiempo aunque no haya más ventas
+        if api is not negocio:
+            return  # contra un servidor, los checkpoints los hace él
+        self.io.enviar(lambda: api.sincronizar(forzar=False), clave='checkpoint', ocupa=False,
+                       al_fallar=lambda e: print("checkpoint_periodico:", e))
+        self.root.after(500, self.checkpoint_periodico)
+
+    def atender_cambios(self):
+        # los avisos llegan desde el hilo del observador; acá se refresca sólo lo afectado
+        temas = set()
+        while True:
+            try:
+                temas.add(self.cambios.get_nowait())
+            except queue.Empty:
+                break
+        self.refrescar_temas(temas)
+        self.root.after(INTERVALO_CAMBIOS_MS, self.atender_cambios)
+
+    def refresco_remoto(self):
+        self.refrescar_temas({'productos', 'ventas'})
+        self.root.after(INTERVALO_REMOTO_MS, self.refresco_remoto)
+
+    def refrescar_temas(self, temas):
+        if 'productos' in temas:
+            self.refresh_productos()
+        if 'ventas' in temas:
+            self.refresh_ventas()
+            if self.notebook.select() == str(self.f_reportes) and self.txt_reporte.get('1.0', 'end-1c'):
+                self.ui_reporte()  # el reporte a la vista se pone al día
+
+    def refresh_rendimiento(self):
+        # metricas() sólo copia contadores en memoria: se lee acá mismo, sin esperar a la cola
+        # del TrabajadorIO (que puede estar ocupada justo con la operación lenta que se quiere ver)
+        try:
+            if self.notebook.select() != str(self.f_rendimiento):
+                pass
+            elif api is negocio:
+                self.mostrar_metricas(api.metricas())
+            else:
+                # las del servidor: viaja por la red, no se espera en el hilo de Tk
+                self.io.enviar(api.metricas, self.mostrar_metricas, clave='metricas', ocupa=False,
+                               al_fallar=lambda e: print("refresh_rendimiento:", e))
+        except Exception as e:
+            print("refresh_rendimiento:", e)
+        self.root.after(INTERVALO_METRICAS_MS, self.refresh_rendimiento)
+
+    def mostrar_metricas(self, m):
+        self.var_metricas.set(bool(m.get('activas')))
+        if not m.get('activas'):
+            self.lbl_metricas.config(text="Métricas desactivadas")
+        else:
+            self.lbl_metricas.config(text=(
+                f"Desde {m['desde']} | filas leídas {m['filas_leidas']:,} | "
+                f"leído {m['bytes_leidos'] / 1e6:.1f} MB | escrito {m['bytes_escritos'] / 1e6:.1f} MB | "
+                f"bloqueos en espera {m.get('bloqueos_contendidos', 0)} | conflictos {m.get('conflictos_version', 0)}"))
+        self.vista_funciones.mostrar([
+            (nombre, (nombre, f['llamadas'], f"{f['media_ms']:.3f}", f"{f['p50_ms']:.3f}",
+                      f"{f['p99_ms']:.3f}", f"{f['max_ms']:.3f}"))
+            for nombre, f in m.get('funciones', {}).items()])
+        self.vista_caches.mostrar([
+            (nombre, (nombre, c['aciertos'], c['fallos'], '-' if c['ratio'] is None else f"{c['ratio']:.1%}"))
+            for nombre, c in sorted(m.get('caches', {}).items())])
+
+    def ui_activar_metricas(self):
+        activas = self.var_metricas.get()
+        self.io.enviar(lambda: api.activar_metricas(activas), clave='metricas', ocupa=False,
+                       al_fallar=lambda e: messagebox.showerror("Error", f"No se pudieron activar las métricas: {e}"))
+
+    def ui_reiniciar_metricas(self):
+        # con --servidor es un pedido por la red: va por el TrabajadorIO como las demás acciones
+        def reiniciar():
+            api.reiniciar_metricas()
+            return api.metricas()
+        self.io.enviar(reiniciar, self.mostrar_metricas, clave='metricas', ocupa=False,
+                       al_fallar=lambda e: messagebox.showerror("Error", f"No se pudieron reiniciar las métricas: {e}"))
+
+    def cerrar(self):
+        # esperar lo encolado (una venta a medio guardar) antes de cerrar
+        if self.observador is not None:
+            self.observador.detener()
+        self.io.cerrar()
+        if api is not negocio:
+            api.cerrar()
+        self.root.destroy()
+
     # ---------- UI handlers ----------
     def limpiar_campos(self):
         for k, ent in self.ent_vars.items():
@@ -104,27 +520,69 @@ class App:
             if state == 'readonly':
                 ent.config(state='readonly')
 
+    def con_pausa(self, clave, fn):
+        # debounce: fn corre PAUSA_BUSQUEDA_MS después de la última tecla
+        pendiente = self._pausas.pop(clave, None)
+        if pendiente is not None:
+            self.root.after_cancel(pendiente)
+        def correr():
+            self._pausas.pop(clave, None)
+            fn()
+        self._pausas[clave] = self.root.after(PAUSA_BUSQUEDA_MS, correr)
+
     def refresh_productos(self):
+        al_fallar = lambda e: messagebox.showerror("Error", f"No se pudieron cargar productos: {e}")
+        consulta = self.entry_buscar.get().strip()
+        if consulta:
+            # con filtro: los mejores resultados primero
+            self.io.enviar(lambda: api.buscar_productos(consulta, UMBRAL_PAGINADO),
+                           lambda productos: self.mostrar_productos(productos, filtrados=True),
+                           clave='productos', al_fallar=al_fallar)
+        else:
+            self.io.enviar(api.listar_productos, self.mostrar_productos, clave='productos', al_fallar=al_fallar)
+
+    def mostrar_productos(self, productos, filtrados=False):
         try:
-            productos = negocio.listar_productos()
-            # actualizar tree
-            for row in self.tree.get_children():
-                self.tree.delete(row)
-            for p in productos:
-                vals = (p['id'], p['nombre'], p['categoria'], f"{p['precio_unitario']:.2f}", p['stock'], p['unidad'])
-                self.tree.insert('', tk.END, values=vals)
-            # actualizar combobox
-            combo_vals = [f"{p['id']} - {p['nombre']}" for p in productos]
-            self.combo_producto['values'] = combo_vals
+            if not filtrados:
+                productos = sorted(productos, key=lambda x: x['id'])
+                # actualizar combobox
+                self.combo_todos = [f"{p['id']} - {p['nombre']}" for p in productos]
+                self.nombres = {p['id']: p['nombre'] for p in productos}
+                if not self.combo_producto.get():
+                    self.combo_producto['values'] = self.combo_todos
+            if not filtrados:
+                self.versiones = {}
+            self.versiones.update((p['id'], p.get('version')) for p in productos)
+            # actualizar tree (sólo las filas que cambiaron)
+            self.vista_productos.mostrar([
+                (str(p['id']), (p['id'], p['nombre'], p['categoria'], f"{p['precio_unitario']:.2f}", p['stock'], p['unidad']))
+                for p in productos])
+            self.root.after_idle(reloj_arranque.marcar, 'productos')
         except Exception as e:
             messagebox.showerror("Error", f"No se pudieron cargar productos: {e}")
 
+    def on_tecla_combo(self, event):
+        if event.keysym in ('Up', 'Down', 'Return', 'Tab', 'Escape'):
+            return
+        self.con_pausa('combo', self.buscar_en_combo)
+
+    def buscar_en_combo(self):
+        consulta = self.combo_producto.get().strip()
+        if not consulta:
+            self.combo_producto['values'] = self.combo_todos
+            return
+        def mostrar(productos):
+            self.combo_producto['values'] = [f"{p['id']} - {p['nombre']}" for p in productos]
+        self.io.enviar(lambda: api.buscar_productos(consulta, LIMITE_BUSQUEDA_COMBO), mostrar,
+                       clave='combo', ocupa=False)
+
     def on_select_producto(self, event):
         sel = self.tree.selection()
         if not sel:
             return
         try:
             vals = self.tree.item(sel[0])['values']
+            self.version_editada = self.versiones.get(int(vals[0]))
             # llenar campos
             self.ent_vars['ID (solo lectura)'].config(state='normal')
             self.ent_vars['ID (solo lectura)'].delete(0, tk.END)
@@ -148,19 +606,21 @@ class App:
             stock = int(self.ent_vars['Stock'].get() or 0)
             cat = self.ent_vars['Categoría'].get().strip()
             unidad = self.ent_vars['Unidad'].get().strip()
-            ok = negocio.agregar_producto({
+            producto = {
                 'nombre': nombre,
                 'categoria': cat,
                 'precio_unitario': precio,
                 'stock': stock,
                 'unidad': unidad
-            })
-            if ok:
-                messagebox.showinfo("OK", "Producto agregado.")
-                self.limpiar_campos()
-                self.refresh_productos()
-            else:
-                messagebox.showerror("Error", "No se pudo agregar producto.")
+            }
+            def listo(ok):
+                if ok:
+                    messagebox.showinfo("OK", "Producto agregado.")
+                    self.limpiar_campos()
+                    self.refresh_productos()
+                else:
+                    messagebox.showerror("Error", "No se pudo agregar producto.")
+            self.io.enviar(lambda: api.agregar_producto(producto), listo, al_fallar=self.mostrar_error)
         except ValueError:
             messagebox.showwarning("Validación", "Precio o stock en formato inválido.")
         except Exception as e:
@@ -177,14 +637,21 @@ class App:
             stock = int(self.ent_vars['Stock'].get() or 0)
             cat = self.ent_vars['Categoría'].get().strip()
             unidad = self.ent_vars['Unidad'].get().strip()
-            ok = negocio.actualizar_producto(int(idv), {
+            cambios = {
                 'nombre': nombre, 'categoria': cat, 'precio_unitario': precio, 'stock': stock, 'unidad': unidad
-            })
-            if ok:
-                messagebox.showinfo("OK", "Producto actualizado.")
+            }
+            version = self.version_editada
+            def listo(ok):
+                if ok:
+                    if version is not None and self.version_editada == version:
+                        self.version_editada = version + 1  # el formulario sigue siendo el actual
+                    messagebox.showinfo("OK", "Producto actualizado.")
+                else:
+                    messagebox.showerror("Error", "No se pudo actualizar producto. Puede que otra terminal "
+                                                  "lo haya modificado: revisa los datos y vuelve a intentar.")
                 self.refresh_productos()
-            else:
-                messagebox.showerror("Error", "No se pudo actualizar producto.")
+            self.io.enviar(lambda: api.actualizar_producto(int(idv), cambios, version=version), listo,
+                           al_fallar=self.mostrar_error)
         except ValueError:
             messagebox.showwarning("Validación", "Precio o stock en formato inválido.")
         except Exception as e:
@@ -198,82 +665,174 @@ class App:
                 return
             if not messagebox.askyesno("Confirmar", "¿Eliminar producto?"):
                 return
-            ok = negocio.eliminar_producto(int(idv))
-            if ok:
-                messagebox.showinfo("OK", "Producto eliminado.")
-                self.limpiar_campos()
-                self.refresh_productos()
-            else:
-                messagebox.showerror("Error", "No se pudo eliminar (quizá no existe).")
+            def listo(ok):
+                if ok:
+                    messagebox.showinfo("OK", "Producto eliminado.")
+                    self.limpiar_campos()
+                    self.refresh_productos()
+                else:
+                    messagebox.showerror("Error", "No se pudo eliminar (quizá no existe).")
+            self.io.enviar(lambda: api.eliminar_producto(int(idv)), listo, al_fallar=self.mostrar_error)
         except Exception as e:
             messagebox.showerror("Error", f"Ocurrió un error: {e}")
 
-    def ui_registrar_venta(self):
+    def mostrar_error(self, e):
+        messagebox.showerror("Error", f"Ocurrió un error: {e}")
+
+    def leer_linea_venta(self):
+        """(id_producto, cantidad) del combo y la cantidad, o None (ya avisó al usuario)."""
         try:
             sel = self.combo_producto.get()
             if not sel:
                 messagebox.showwarning("Validación", "Selecciona un producto.")
-                return
-            prod_id = int(sel.split('-')[0].strip())
+                return None
+            try:
+                # "id - nombre" elegido de la lista, o el id tecleado
+                prod_id = int(sel.split('-')[0].strip())
+            except ValueError:
+                messagebox.showwarning("Validación", "Selecciona un producto de la lista.")
+                return None
             cantidad = int(self.entry_cantidad.get() or 0)
             if cantidad <= 0:
                 messagebox.showwarning("Validación", "Cantidad debe ser mayor que 0.")
-                return
+                return None
+            return prod_id, cantidad
+        except ValueError:
+            messagebox.showwarning("Validación", "Cantidad inválida.")
+            return None
+
+    def ui_agregar_al_carrito(self):
+        linea_venta = self.leer_linea_venta()
+        if linea_venta is None:
+            return
+        prod_id, cantidad = linea_venta
+        def agregar(prod):
             # buscar precio actual
-            productos = negocio.listar_productos()
-            prod = next((p for p in productos if p['id'] == prod_id), None)
             if prod is None:
                 messagebox.showerror("Error", "Producto no encontrado.")
                 return
-            venta = {
-                'id_producto': prod_id,
-                'cantidad': cantidad,
-                'precio_unitario_venta': prod['precio_unitario'],
-                'forma_pago': 'Efectivo'
-            }
-            res = negocio.registrar_venta(venta)
-            if res.get('ok'):
-                messagebox.showinfo("OK", res.get('mensaje'))
-                self.entry_cantidad.delete(0, tk.END)
-                self.refresh_productos()
-                self.refresh_ventas()
+            linea = next((l for l in self.carrito if l['id_producto'] == prod_id), None)
+            if linea is None:
+                self.carrito.append({'id_producto': prod_id, 'nombre': prod['nombre'],
+                                     'cantidad': cantidad, 'precio_unitario': prod['precio_unitario']})
             else:
-                messagebox.showerror("Error", res.get('mensaje'))
-        except ValueError:
-            messagebox.showwarning("Validación", "Cantidad inválida.")
+                linea['cantidad'] += cantidad
+            self.entry_cantidad.delete(0, tk.END)
+            self.refresh_carrito()
+        self.io.enviar(lambda: api.obtener_producto(prod_id), agregar, al_fallar=self.mostrar_error)
+
+    def ui_quitar_del_carrito(self):
+        sel = self.tree_carrito.selection()
+        if not sel:
+            return
+        idx = self.tree_carrito.index(sel[0])
+        del self.carrito[idx]
+        self.refresh_carrito()
+
+    def limpiar_carrito(self):
+        self.carrito = []
+        self.refresh_carrito()
+
+    def refresh_carrito(self):
+        for r in self.tree_carrito.get_children():
+            self.tree_carrito.delete(r)
+        for l in self.carrito:
+            subtotal = l['cantidad'] * l['precio_unitario']
+            self.tree_carrito.insert('', tk.END, values=(l['nombre'], l['cantidad'], f"{l['precio_unitario']:.2f}", f"{subtotal:.2f}"))
+        total = api.calcular_total_venta(self.carrito)
+        self.lbl_total.config(text=f"Total de la Venta: {total:.2f}")
+
+    def ui_registrar_venta(self):
+        try:
+            if self.carrito:
+                items = [dict(l) for l in self.carrito]
+            else:
+                # sin carrito: vender directamente lo seleccionado en el combo (al precio del catálogo)
+                linea_venta = self.leer_linea_venta()
+                if linea_venta is None:
+                    return
+                items = [{'id_producto': linea_venta[0], 'cantidad': linea_venta[1]}]
+            pago = self.combo_pago.get() or 'Efectivo'
+            def listo(res):
+                if res.get('ok'):
+                    messagebox.showinfo("OK", res.get('mensaje'))
+                    self.entry_cantidad.delete(0, tk.END)
+                    self.limpiar_carrito()
+                    self.refresh_productos()
+                    self.refresh_ventas()
+                else:
+                    messagebox.showerror("Error", res.get('mensaje'))
+            self.io.enviar(lambda: api.registrar_venta_lote(items, pago), listo, al_fallar=self.mostrar_error)
         except Exception as e:
             messagebox.showerror("Error", f"Ocurrió un error: {e}")
 
-    def refresh_ventas(self):
+    def refresh_ventas(self, recargar=False):
+        limite = self.limite_ventas
+        cursor = None if recargar else self.cursor_ventas
+        nombres = self.nombres
+        def cargar():
+            # sólo las ventas anexadas desde la última lectura; la primera vez (o si el archivo
+            # se reescribió) las más recientes, leídas desde el final sin cargar todo el historial
+            res = api.ventas_nuevas(cursor, limite)
+            productos = None
+            if res['recarga'] or any(v['id_producto'] not in nombres for v in res['ventas']):
+                # join nombre producto
+                productos = {p['id']: p['nombre'] for p in api.listar_productos()}
+            return res, productos
+        self.io.enviar(cargar, self.mostrar_ventas, clave='ventas',
+                       al_fallar=lambda e: messagebox.showerror("Error", f"No se pudieron cargar ventas: {e}"))
+
+    def mostrar_ventas(self, datos):
+        res, productos = datos
         try:
-            ventas = negocio.listar_ventas()
-            # join nombre producto
-            productos = {p['id']: p['nombre'] for p in negocio.listar_productos()}
-            # limpiar
-            for r in self.tree_ventas.get_children():
-                self.tree_ventas.delete(r)
-            # insertar últimas 200 ventas
-            for v in sorted(ventas, key=lambda x: x['id_venta'], reverse=True)[:200]:
-                nombre = productos.get(v['id_producto'], f"ID {v['id_producto']}")
+            if productos is not None:
+                self.nombres = productos
+            if res['recarga']:
+                self.ventas = res['ventas']
+            else:
+                # las nuevas van delante; la lista sigue mostrando a lo sumo limite_ventas
+                nuevas = {v['id_venta'] for v in res['ventas']}
+                self.ventas = (res['ventas'] + [v for v in self.ventas if v['id_venta'] not in nuevas])[:self.limite_ventas]
+            self.cursor_ventas = res['cursor']
+            filas = []
+            for v in self.ventas:
+                nombre = self.nombres.get(v['id_producto'], f"ID {v['id_producto']}")
                 vals = (v['id_venta'], v['fecha'], nombre, v['cantidad'], f"{v['precio_unitario_venta']:.2f}", v.get('forma_pago',''))
-                self.tree_ventas.insert('', tk.END, values=vals)
+                filas.append((str(v['id_venta']), vals))
+            self.vista_ventas.mostrar(filas)
         except Exception as e:
             messagebox.showerror("Error", f"No se pudieron cargar ventas: {e}")
 
+    def cargar_mas_ventas(self):
+        # sólo si la última carga llenó la ventana (puede haber más) y no hay otra en curso
+        if len(self.vista_ventas.filas) >= self.limite_ventas:
+            self.limite_ventas += TAMANO_PAGINA
+            self.refresh_ventas(recargar=True)
+
     def ui_reporte(self):
-        try:
-            rep = negocio.generar_reporte_ventas()
-            pm = negocio.productos_mas_vendidos(10)
+        def generar():
+            rep = api.generar_reporte_ventas()
+            pm = api.productos_mas_vendidos(10)
             texto = f"Total ventas: {rep.get('total_ventas', 0):.2f}\n\nProductos vendidos (top):\n"
-            productos = {p['id']: p['nombre'] for p in negocio.listar_productos()}
+            productos = {p['id']: p['nombre'] for p in api.listar_productos()}
             for pid, cant in pm:
                 texto += f" - {productos.get(pid, f'ID {pid}')}: {cant}\n"
+            return texto
+        def mostrar(texto):
             self.txt_reporte.delete('1.0', tk.END)
             self.txt_reporte.insert('1.0', texto)
-        except Exception as e:
-            messagebox.showerror("Error", f"No se pudo generar el reporte: {e}")
+        self.io.enviar(generar, mostrar, clave='reporte',
+                       al_fallar=lambda e: messagebox.showerror("Error", f"No se pudo generar el reporte: {e}"))
 
-def main():
+def main(argv=None):
+    global api
+    parser = argparse.ArgumentParser(description="Inventario y ventas (Tkinter).")
+    parser.add_argument('--servidor', default=os.environ.get('NEGOCIO_SERVIDOR'),
+                        help='host:puerto de negocio_servidor.py (por defecto, datos locales)')
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+    if args.servidor:
+        import negocio_cliente
+        api = negocio_cliente.Cliente(args.servidor)
     root = tk.Tk()
     app = App(root)
     # cargar ventas inicial y productos
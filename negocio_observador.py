@@ -0,0 +1,232 @@
+"""
+negocio_observador.py
+Avisa cuando cambian en disco los datos de negocio.py (esta terminal, otra que comparte la
+carpeta o una edición a mano), por tema: 'productos' y 'ventas'. Una ráfaga de escrituras
+(un ticket, un checkpoint) produce un solo aviso.
+ - Linux: inotify (por ctypes, sin dependencias) sobre las carpetas de datos.
+ - Resto, o si inotify no está disponible: compara tamaño, mtime e inode de los archivos cada
+   INTERVALO_S segundos.
+Se elige con NEGOCIO_OBSERVADOR=auto|inotify|sondeo (o "observador" en data/config.json).
+Los avisos se llaman desde el hilo del observador: una interfaz Tk tiene que pasarlos a su
+propio hilo (ver negocio_main.App).
+
+    obs = Observador()
+    obs.suscribir('ventas', lambda tema: print('hay ventas nuevas'))
+    obs.iniciar()
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+import time
+
+import negocio
+
+TEMAS = ('productos', 'ventas')
+MODOS = ('auto', 'inotify', 'sondeo')
+# cada cuánto se miran los archivos sin inotify
+INTERVALO_S = 0.5
+# debounce: el aviso sale tras PAUSA_S sin cambios, o a más tardar ESPERA_MAX_S después del primero
+PAUSA_S = 0.3
+ESPERA_MAX_S = 2.0
+
+# inotify(7)
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_IGNORED = 0x00008000
+_IN_ISDIR = 0x40000000
+_IN_MASCARA = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+_IN_NONBLOCK = os.O_NONBLOCK
+_IN_CLOEXEC = getattr(os, 'O_CLOEXEC', 0o2000000)
+_EVENTO = struct.Struct('iIII')  # wd, mask, cookie, len (le sigue el nombre)
+
+
+class _Inotify:
+    """Descriptor inotify con una vigilancia por carpeta."""
+
+    def __init__(self):
+        nombre = ctypes.util.find_library('c')
+        self._libc = ctypes.CDLL(nombre, use_errno=True)
+        self.fd = self._libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1')
+        self._carpetas = {}  # wd -> carpeta
+
+    def vigilar(self, carpeta):
+        if carpeta in self._carpetas.values() or not carpeta.is_dir():
+            return
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(carpeta), _IN_MASCARA)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f'inotify_add_watch {carpeta}')
+        self._carpetas[wd] = carpeta
+
+    def leer(self, espera):
+        """[(ruta, es_carpeta), ...] de los eventos que lleguen en `espera` segundos."""
+        listos, _, _ = select.select([self.fd], [], [], espera)
+        if not listos:
+            return []
+        try:
+            datos = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        eventos, pos = [], 0
+        while pos + _EVENTO.size <= len(datos):
+            wd, mascara, _, largo = _EVENTO.unpack_from(datos, pos)
+            nombre = datos[pos + _EVENTO.size:pos + _EVENTO.size + largo].rstrip(b'\0')
+            pos += _EVENTO.size + largo
+            if mascara & _IN_IGNORED:
+                self._carpetas.pop(wd, None)  # la carpeta se borró
+                continue
+            carpeta = self._carpetas.get(wd)
+            if carpeta is not None and nombre:
+                eventos.append((carpeta / os.fsdecode(nombre), bool(mascara & _IN_ISDIR)))
+        return eventos
+
+    def cerrar(self):
+        os.close(self.fd)
+
+
+class Observador:
+    """Hilo que vigila los archivos de datos y avisa a los suscriptos de cada tema."""
+
+    def __init__(self, modo=None):
+        self.modo = modo or negocio._configuracion('observador', 'NEGOCIO_OBSERVADOR', 'auto')
+        if self.modo not in MODOS:
+            print(f"[negocio] ADVERTENCIA: observador desconocido {self.modo!r}, se usa 'auto'")
+            self.modo = 'auto'
+        self._suscriptores = {tema: [] for tema in TEMAS}
+        self._hilo = None
+        self._parar = threading.Event()
+        self._inotify = None
+        self._firmas = {}
+
+    def suscribir(self, tema, fn):
+        """fn(tema) se llama (desde el hilo del observador) cada vez que cambian los datos del tema."""
+        self._suscriptores[tema].append(fn)
+
+    # -------------------------
+    # Qué archivo es de qué tema
+    # -------------------------
+    def _archivos(self):
+        rutas = negocio._rutas
+        ambos = TEMAS  # el journal y la base SQLite llevan productos y ventas juntos
+        return {rutas.productos: ('productos',), rutas.ventas: ('ventas',), rutas.journal: ambos,
+                rutas.sqlite: ambos, rutas.sqlite.with_name(rutas.sqlite.name + '-wal'): ambos}
+
+    def _temas_de(self, ruta, archivos):
+        if ruta.parent == negocio._rutas.ventas_dir:
+            return ('ventas',) if ruta.suffix == '.csv' else ()
+        return archivos.get(ruta, ())
+
+    # -------------------------
+    # Detección
+    # -------------------------
+    def _firmas_actuales(self, archivos):
+        rutas = list(archivos)
+        if negocio._rutas.ventas_dir.is_dir():
+            rutas.extend(negocio._rutas.ventas_dir.glob('*.csv'))
+        firmas = {}
+        for ruta in rutas:
+            try:
+                st = ruta.stat()
+                firmas[ruta] = (st.st_size, st.st_mtime_ns, st.st_ino)
+            except OSError:
+                continue
+        return firmas
+
+    def _cambios_sondeo(self, espera, archivos):
+        if self._parar.wait(espera):
+            return set()
+        firmas = self._firmas_actuales(archivos)
+        cambiadas = {r for r in firmas.keys() | self._firmas.keys() if firmas.get(r) != self._firmas.get(r)}
+        self._firmas = firmas
+        return {tema for ruta in cambiadas for tema in self._temas_de(ruta, archivos)}
+
+    def _cambios_inotify(self, espera, archivos):
+        temas = set()
+        for ruta, es_carpeta in self._inotify.leer(espera):
+            if es_carpeta and ruta == negocio._rutas.ventas_dir:
+                self._inotify.vigilar(ruta)  # apareció data/ventas/ (migración a particiones)
+                temas.add('ventas')
+            else:
+                temas.update(self._temas_de(ruta, archivos))
+        return temas
+
+    def _preparar(self, archivos):
+        if self.modo in ('auto', 'inotify'):
+            try:
+                self._inotify = _Inotify()
+                for carpeta in {r.parent for r in archivos} | {negocio._rutas.ventas_dir}:
+                    self._inotify.vigilar(carpeta)
+                return self._cambios_inotify
+            except (OSError, AttributeError, TypeError) as e:
+                # sin inotify (otro sistema, o límite de vigilancias alcanzado): se sondea
+                if self._inotify is not None:
+                    self._inotify.cerrar()
+                    self._inotify = None
+                if self.modo == 'inotify':
+                    print(f"[negocio] ADVERTENCIA: inotify no disponible, se sondean los archivos: {e}")
+        self._firmas = self._firmas_actuales(archivos)
+        return self._cambios_sondeo
+
+    # -------------------------
+    # Hilo
+    # -------------------------
+    def iniciar(self):
+        if self._hilo is not None:
+            return
+        self._parar = threading.Event()
+        archivos = self._archivos()
+        cambios = self._preparar(archivos)
+        self._hilo = threading.Thread(target=self._bucle, args=(cambios, archivos, self._parar),
+                                      name='negocio-observador', daemon=True)
+        self._hilo.start()
+
+    @property
+    def mecanismo(self):
+        """'inotify' o 'sondeo': lo que se está usando de verdad."""
+        return 'inotify' if self._inotify is not None else 'sondeo'
+
+    def _bucle(self, cambios, archivos, parar):
+        pendientes = {}  # tema -> [primer cambio, último cambio]
+        while not parar.is_set():
+            espera = INTERVALO_S
+            if pendientes:
+                ahora = time.monotonic()
+                espera = max(0.0, min(min(u + PAUSA_S, p + ESPERA_MAX_S) for p, u in pendientes.values()) - ahora)
+            try:
+                temas = cambios(espera, archivos)
+            except Exception as e:
+                print(f"[negocio] ERROR observador: {e}")
+                parar.wait(INTERVALO_S)
+                continue
+            ahora = time.monotonic()
+            for tema in temas:
+                pendientes.setdefault(tema, [ahora, ahora])[1] = ahora
+            for tema, (primero, ultimo) in list(pendientes.items()):
+                if ahora - ultimo >= PAUSA_S or ahora - primero >= ESPERA_MAX_S:
+                    del pendientes[tema]
+                    self._publicar(tema)
+
+    def _publicar(self, tema):
+        for fn in list(self._suscriptores[tema]):
+            try:
+                fn(tema)
+            except Exception as e:
+                print(f"[negocio] ERROR observador ({tema}): {e}")
+
+    def detener(self):
+        self._parar.set()
+        if self._hilo is not None:
+            self._hilo.join(INTERVALO_S + 1)
+            self._hilo = None
+        if self._inotify is not None:
+            self._inotify.cerrar()
+            self._inotify = None
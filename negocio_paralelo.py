@@ -0,0 +1,163 @@
+"""
+negocio_paralelo.py
+Reportes por rango de fechas repartidos entre varios núcleos (motor CSV de negocio.py).
+
+Los archivos de ventas del rango (ventas.csv y/o las particiones mensuales) se cortan en trozos
+de bytes; cada trozo lo suma un proceso de un ProcessPoolExecutor y el proceso principal junta
+los resultados parciales (total e unidades por producto).
+ - Un trozo [inicio, fin) procesa las filas que *empiezan* dentro de él: si `inicio` cae a mitad
+   de una línea, esa línea es del trozo anterior. Así ninguna fila se cuenta dos veces ni se pierde.
+ - Con el índice de fechas de cada archivo se lee sólo desde la primera hasta la última fila del
+   rango, no el archivo entero.
+ - Con poco que leer (menos de UMBRAL_BYTES) o un solo proceso no conviene repartir: reporte()
+   retorna None y negocio.py calcula en serie.
+Se elige con NEGOCIO_REPORTES=paralelo (o {"reportes": "paralelo"} en data/config.json); la
+cantidad de procesos con NEGOCIO_PROCESOS o {"procesos": N} (por defecto, uno por núcleo).
+"""
+
+import atexit
+import csv
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import negocio
+
+# por debajo de esto el arranque de los trabajos cuesta más que leer en serie
+UMBRAL_BYTES = 8 << 20
+# trozo mínimo: cada tarea tiene que leer lo suficiente para amortizar su envío
+TROZO_MIN_BYTES = 1 << 20
+# trozos por proceso: reparte mejor cuando unos trozos tienen más filas del rango que otros
+TROZOS_POR_PROCESO = 2
+
+_pool = None
+_pool_procesos = 0
+
+
+# -------------------------
+# Trabajo de cada proceso
+# -------------------------
+def _base_dia(dia, cache):
+    """Timestamp de las 00:00 de 'YYYY-MM-DD' (memorizado: en un trozo se repiten pocos días)."""
+    base = cache.get(dia)
+    if base is None:
+        base = cache[dia] = int((datetime.strptime(dia, '%Y-%m-%d') - negocio._EPOCA).total_seconds())
+    return base
+
+
+def _timestamp(fecha, cache):
+    """negocio._timestamp con atajo para el formato que guarda negocio.py (YYYY-MM-DDTHH:MM:SS)."""
+    if len(fecha) == 19 and fecha[10] in 'T ' and fecha[13] == ':' and fecha[16] == ':':
+        try:
+            return (_base_dia(fecha[:10], cache) + int(fecha[11:13]) * 3600
+                    + int(fecha[14:16]) * 60 + int(fecha[17:19]))
+        except ValueError:
+            pass
+    return negocio._timestamp(fecha)
+
+
+def _trozo(ruta, inicio, fin, lo, hi):
+    """
+    Suma las ventas con lo <= fecha <= hi de las filas que empiezan en [inicio, fin) de `ruta`.
+    Retorna (total, {id_producto: unidades}, filas_leidas, bytes_leidos).
+    """
+    total, conteo, dias = 0.0, {}, {}
+    filas = 0
+    with open(ruta, 'rb') as f:
+        if inicio > 0:
+            f.seek(inicio - 1)
+            if f.read(1) != b'\n':
+                f.readline()  # resto de una línea que empezó en el trozo anterior
+        posicion = f.tell()
+        while posicion < fin:
+            linea = f.readline()
+            if not linea.endswith(b'\n'):
+                break  # fin del archivo o escritura en curso
+            posicion += len(linea)
+            texto = linea.decode('utf-8', errors='replace').rstrip('\r\n')
+            campos = next(csv.reader([texto])) if '"' in texto else texto.split(',')
+            if len(campos) != len(negocio.VENTAS_FIELDS):
+                continue
+            filas += 1
+            t = _timestamp(campos[1], dias)
+            if t is None or (lo is not None and t < lo) or (hi is not None and t > hi):
+                continue
+            try:
+                pid, cantidad, precio = int(campos[2]), int(campos[3]), float(campos[4] or 0)
+            except ValueError:
+                continue  # cabecera o fila corrupta
+            total += precio * cantidad
+            conteo[pid] = conteo.get(pid, 0) + cantidad
+    return total, conteo, filas, posicion - inicio
+
+
+# -------------------------
+# Reparto y unión
+# -------------------------
+def trozos(rangos, procesos):
+    """
+    rangos: [(ruta, inicio, fin), ...] con los bytes a leer de cada archivo.
+    Retorna la lista de trozos (ruta, inicio, fin) de tamaño parejo, unos TROZOS_POR_PROCESO por proceso.
+    """
+    total = sum(fin - inicio for _, inicio, fin in rangos)
+    tamano = max(TROZO_MIN_BYTES, -(-total // max(1, procesos * TROZOS_POR_PROCESO)))
+    resultado = []
+    for ruta, inicio, fin in rangos:
+        while inicio < fin:
+            resultado.append((ruta, inicio, min(fin, inicio + tamano)))
+            inicio += tamano
+    return resultado
+
+
+def _ejecutor(procesos):
+    """Pool de procesos reutilizado entre reportes (arrancarlo cuesta más que un reporte chico)."""
+    global _pool, _pool_procesos
+    if _pool is None or _pool_procesos != procesos:
+        cerrar()
+        # los hijos sólo leen archivos: sirve el método de arranque por defecto de la plataforma
+        # (en Windows y macOS vuelven a importar el script principal, que necesita su
+        # `if __name__ == '__main__':`, como negocio_main.py)
+        _pool = ProcessPoolExecutor(max_workers=procesos)
+        _pool_procesos = procesos
+    return _pool
+
+
+def reporte(rangos, lo, hi, procesos):
+    """
+    (total, {id_producto: unidades}) de las ventas en [lo, hi] dentro de `rangos`, sumadas en
+    `procesos` procesos. None si no conviene repartir (rango chico o un solo proceso) o si el
+    pool falló: el llamador calcula en serie.
+    """
+    if procesos <= 1 or sum(fin - inicio for _, inicio, fin in rangos) < UMBRAL_BYTES:
+        return None
+    partes = trozos([(os.fspath(ruta), inicio, fin) for ruta, inicio, fin in rangos], procesos)
+    try:
+        pool = _ejecutor(procesos)
+        futuros = [pool.submit(_trozo, ruta, inicio, fin, lo, hi) for ruta, inicio, fin in partes]
+        resultados = [futuro.result() for futuro in futuros]
+    except Exception as e:
+        print(f"[negocio] ERROR en reporte paralelo, se calcula en serie: {e}")
+        cerrar()
+        return None
+    total, conteo = 0.0, {}
+    filas = leidos = 0
+    for parcial, conteo_parcial, n, b in resultados:
+        total += parcial
+        for pid, unidades in conteo_parcial.items():
+            conteo[pid] = conteo.get(pid, 0) + unidades
+        filas += n
+        leidos += b
+    if negocio._metricas.activas:
+        negocio._metricas.lectura(filas, leidos)
+    return total, conteo
+
+
+def cerrar():
+    """Termina los procesos del pool (se vuelve a crear en el próximo reporte paralelo)."""
+    global _pool, _pool_procesos
+    if _pool is not None:
+        _pool.shutdown(wait=True, cancel_futures=True)
+    _pool, _pool_procesos = None, 0
+
+
+atexit.register(cerrar)
@@ -0,0 +1,198 @@
+"""
+negocio_servidor.py
+Servidor local de inventario: un solo proceso tiene el estado de negocio.py en memoria y varias
+cajas (negocio_main.py --servidor, o negocio_cliente.Cliente) le hablan por TCP en vez de leer
+cada una los CSV. Sólo biblioteca estándar (asyncio).
+
+Protocolo: una línea JSON por pedido y otra por respuesta, en el mismo orden.
+    -> {"id": 1, "op": "registrar_venta", "args": [{"id_producto": 11001, "cantidad": 2}], "kwargs": {}}
+    <- {"id": 1, "ok": true, "resultado": {"ok": true, "mensaje": "Venta registrada (id 12)."}}
+    <- {"id": 2, "ok": false, "error": "operación desconocida: borrar_todo"}
+ - Las lecturas (LECTURAS) se responden desde memoria.
+ - Las escrituras (ESCRITURAS) pasan por una única cola y las ejecuta una sola tarea, en orden
+   de llegada; al vaciarse la cola se hace un checkpoint si tocaba (lote o ventana de tiempo),
+   así una ráfaga de ventas de varias cajas paga un solo volcado a disco.
+ - negocio.py corre en un único hilo aparte (ejecutor de un hilo): nunca desde dos hilos a la
+   vez, y un checkpoint o un reporte largo no frena el bucle de eventos, que sólo atiende el
+   protocolo. Una lectura espera como mucho a la operación que esté en curso.
+
+Uso: python negocio_servidor.py [--host 127.0.0.1] [--puerto 8765] [--lote 256]
+"""
+
+import argparse
+import asyncio
+import json
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import negocio
+
+HOST = '127.0.0.1'
+PUERTO = 8765
+# con el servidor como único escritor el checkpoint puede esperar más cambios
+LOTE_SERVIDOR = 256
+# tamaño máximo de una línea de pedido (un ticket grande entra de sobra)
+LIMITE_LINEA = 1 << 20
+
+LECTURAS = frozenset({
+    'listar_productos', 'obtener_producto', 'buscar_productos', 'listar_ventas', 'ultimas_ventas', 'ventas_nuevas',
+    'generar_reporte_ventas', 'productos_mas_vendidos', 'metricas', 'backend_actual',
+})
+ESCRITURAS = frozenset({
+    'agregar_producto', 'actualizar_producto', 'eliminar_producto', 'registrar_venta',
+    'registrar_venta_lote', 'aplicar_operaciones', 'actualizar_precios_categoria',
+    'sincronizar', 'activar_metricas', 'reiniciar_metricas',
+})
+
+
+def _respuesta(id_pedido, resultado=None, error=None):
+    if error is not None:
+        return {'id': id_pedido, 'ok': False, 'error': error}
+    return {'id': id_pedido, 'ok': True, 'resultado': resultado}
+
+
+def _ejecutar(op, args, kwargs):
+    """Llama negocio.<op>; los errores vuelven como texto para el cliente."""
+    try:
+        return getattr(negocio, op)(*args, **kwargs), None
+    except Exception as e:
+        print(f"[servidor] ERROR {op}: {e}")
+        return None, f"{type(e).__name__}: {e}"
+
+
+class Servidor:
+    """Escucha en host:puerto, atiende una tarea por conexión y una sola tarea escritora."""
+
+    def __init__(self, host=HOST, puerto=PUERTO):
+        self.host = host
+        self.puerto = puerto
+        self._escrituras = None
+        self._servidor = None
+        self._tareas = []
+        self._fin = None
+        self._negocio = None
+        self.atendidos = 0
+
+    async def _en_hilo(self, fn, *args):
+        """Corre fn(*args) en el hilo de negocio.py, sin bloquear el bucle de eventos."""
+        return await asyncio.get_running_loop().run_in_executor(self._negocio, fn, *args)
+
+    async def iniciar(self):
+        self._escrituras = asyncio.Queue()
+        self._fin = asyncio.Event()
+        self._negocio = ThreadPoolExecutor(max_workers=1, thread_name_prefix='negocio')
+        # cargar catálogo y agregados antes de aceptar conexiones: el primer cliente no paga la carga
+        await self._en_hilo(negocio.listar_productos)
+        await self._en_hilo(negocio.generar_reporte_ventas)
+        self._servidor = await asyncio.start_server(self._atender, self.host, self.puerto, limit=LIMITE_LINEA)
+        self.puerto = self._servidor.sockets[0].getsockname()[1]
+        self._tareas = [asyncio.create_task(self._escritor()), asyncio.create_task(self._checkpoints())]
+        print(f"[servidor] escuchando en {self.host}:{self.puerto} (motor {negocio.backend_actual()})", flush=True)
+
+    async def servir(self):
+        """Atiende hasta Ctrl+C, SIGTERM o parar(); al terminar vuelca todo a disco."""
+        await self.iniciar()
+        bucle = asyncio.get_running_loop()
+        for senal in (signal.SIGINT, signal.SIGTERM):
+            try:
+                bucle.add_signal_handler(senal, self.parar)
+            except (NotImplementedError, RuntimeError):  # Windows: Ctrl+C llega como KeyboardInterrupt
+                pass
+        try:
+            await self._fin.wait()
+        finally:
+            await self.detener()
+
+    def parar(self):
+        if self._fin is not None:
+            self._fin.set()
+
+    async def detener(self):
+        if self._servidor is not None:
+            self._servidor.close()
+            self._servidor = None
+        if self._escrituras is not None:
+            await self._escrituras.join()  # lo ya aceptado se guarda antes de cerrar
+        for tarea in self._tareas:
+            tarea.cancel()
+        self._tareas = []
+        if self._negocio is not None:
+            await self._en_hilo(negocio.sincronizar)
+            self._negocio.shutdown(wait=True)
+            self._negocio = None
+
+    async def _atender(self, lector, escritor):
+        try:
+            while True:
+                linea = await lector.readline()
+                if not linea:
+                    break
+                respuesta = await self._resolver(linea)
+                escritor.write(json.dumps(respuesta, ensure_ascii=False).encode('utf-8') + b'\n')
+                await escritor.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except ValueError as e:  # línea más larga que LIMITE_LINEA
+            print(f"[servidor] ERROR conexión: {e}")
+        finally:
+            escritor.close()
+
+    async def _resolver(self, linea):
+        try:
+            pedido = json.loads(linea)
+            id_pedido, op = pedido.get('id'), pedido.get('op')
+            args, kwargs = list(pedido.get('args') or []), dict(pedido.get('kwargs') or {})
+        except (ValueError, TypeError, AttributeError):
+            return _respuesta(None, error='pedido inválido')
+        self.atendidos += 1
+        if op in LECTURAS:
+            resultado, error = await self._en_hilo(_ejecutar, op, args, kwargs)
+        elif op in ESCRITURAS:
+            listo = asyncio.get_running_loop().create_future()
+            await self._escrituras.put((op, args, kwargs, listo))
+            resultado, error = await listo
+        else:
+            return _respuesta(id_pedido, error=f'operación desconocida: {op}')
+        return _respuesta(id_pedido, resultado, error)
+
+    async def _escritor(self):
+        """Única tarea que modifica datos: escrituras en orden y checkpoint cuando la cola se vacía."""
+        while True:
+            op, args, kwargs, listo = await self._escrituras.get()
+            try:
+                # se espera cada escritura antes de tomar la siguiente: el orden de llegada se respeta
+                resultado = await self._en_hilo(_ejecutar, op, args, kwargs)
+                if not listo.cancelled():
+                    listo.set_result(resultado)
+            finally:
+                self._escrituras.task_done()
+            if self._escrituras.empty():
+                await self._en_hilo(negocio.sincronizar, False)
+
+    async def _checkpoints(self):
+        # sin escrituras nuevas, lo pendiente igual se vuelca al cumplirse la ventana de tiempo
+        while True:
+            await asyncio.sleep(negocio.JOURNAL_VENTANA_S)
+            if self._escrituras.empty():
+                await self._en_hilo(negocio.sincronizar, False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor local de inventario y ventas (negocio.py).")
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--puerto', type=int, default=PUERTO, help='0 = uno libre (se informa al iniciar)')
+    parser.add_argument('--lote', type=int, default=LOTE_SERVIDOR, help='cambios por checkpoint del journal')
+    args = parser.parse_args(argv)
+    negocio.JOURNAL_LOTE = max(1, args.lote)
+    t0 = time.perf_counter()
+    servidor = Servidor(args.host, args.puerto)
+    try:
+        asyncio.run(servidor.servir())
+    except KeyboardInterrupt:
+        pass
+    print(f"[servidor] detenido: {servidor.atendidos} pedido(s) en {time.perf_counter() - t0:.0f} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,317 @@
+"""
+negocio_sqlite.py
+Motor SQLite para negocio.py (sqlite3 de la biblioteca estándar, sin dependencias extra).
+
+Se activa con NEGOCIO_BACKEND=sqlite o {"backend": "sqlite"} en data/config.json; la GUI y
+el resto del código siguen llamando a negocio.* igual que con CSV.
+ - Una sola base (data/negocio.db) en modo WAL: lecturas concurrentes sin bloquear escrituras.
+ - Cada venta (ticket completo) es una transacción: ventas + stock juntos, todo o nada.
+ - Índices por id_producto y por fecha (timestamp) para reportes y top-N sin recorrer todo.
+ - Varias terminales pueden abrir la misma base: SQLite serializa las escrituras (BEGIN IMMEDIATE)
+   y la columna version de productos permite rechazar ediciones hechas sobre datos viejos.
+Para pasar los datos existentes: python negocio.py --copiar-datos csv sqlite
+"""
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import negocio
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS productos (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    nombre TEXT NOT NULL DEFAULT '',
+    categoria TEXT NOT NULL DEFAULT '',
+    precio_unitario REAL NOT NULL DEFAULT 0,
+    stock INTEGER NOT NULL DEFAULT 0,
+    unidad TEXT NOT NULL DEFAULT '',
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS ventas (
+    id_venta INTEGER PRIMARY KEY AUTOINCREMENT,
+    fecha TEXT NOT NULL,
+    ts INTEGER,
+    id_producto INTEGER NOT NULL,
+    cantidad INTEGER NOT NULL,
+    precio_unitario_venta REAL NOT NULL,
+    forma_pago TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS ix_ventas_producto ON ventas(id_producto);
+CREATE INDEX IF NOT EXISTS ix_ventas_fecha ON ventas(ts);
+"""
+
+_COLUMNAS_PRODUCTO = ', '.join(negocio.PRODUCTOS_FIELDS)
+_COLUMNAS_VENTA = ', '.join(negocio.VENTAS_FIELDS)
+# filas por consulta en iter_ventas
+_TANDA = 1000
+
+
+def _filtro(lo=None, hi=None, id_producto=None, desde_id=False):
+    """WHERE y parámetros para filtrar ventas por timestamp, producto y (al final) id_venta > ?."""
+    condiciones, params = [], []
+    if lo is not None:
+        condiciones.append('ts >= ?')
+        params.append(lo)
+    if hi is not None:
+        condiciones.append('ts <= ?')
+        params.append(hi)
+    if id_producto is not None:
+        condiciones.append('id_producto = ?')
+        params.append(id_producto)
+    if desde_id:
+        condiciones.append('id_venta > ?')
+    where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ''
+    return where, params
+
+
+class BackendSQLite(negocio.Backend):
+    """Catálogo y ventas en tablas SQLite; mismas reglas de negocio que el motor CSV."""
+    nombre = 'sqlite'
+
+    def __init__(self, filepath: Path):
+        self.filepath = Path(filepath)
+        self.filepath.parent.mkdir(parents=True, exist_ok=True)
+        # autocommit (isolation_level=None): las transacciones se abren a mano con BEGIN IMMEDIATE
+        self._con = sqlite3.connect(str(self.filepath), isolation_level=None, check_same_thread=False)
+        self._con.row_factory = sqlite3.Row
+        self._lock = threading.RLock()
+        self._con.execute('PRAGMA journal_mode=WAL')
+        self._con.execute('PRAGMA synchronous=NORMAL')
+        self._con.executescript(_ESQUEMA)
+        self._migrar()
+        # búsqueda mientras se escribe: mismo índice en memoria que el motor CSV. Lo mantienen al
+        # día las escrituras propias (después del COMMIT); si otra conexión confirmó algo cambia
+        # PRAGMA data_version y se rehace en la próxima búsqueda
+        self._indice = negocio._IndiceBusqueda()
+        self._indice_version = None
+        self._tras_commit = []
+
+    def _migrar(self):
+        """Bases creadas antes de la columna version: se agrega con 0 en todas las filas."""
+        columnas = {r['name'] for r in self._con.execute('PRAGMA table_info(productos)')}
+        if 'version' not in columnas:
+            self._con.execute('ALTER TABLE productos ADD COLUMN version INTEGER NOT NULL DEFAULT 0')
+
+    def _transaccion(self, fn):
+        """Ejecuta fn(con) dentro de BEGIN IMMEDIATE ... COMMIT (ROLLBACK si algo falla)."""
+        with self._lock:
+            if negocio._metricas.activas:
+                # BEGIN IMMEDIATE espera si otra terminal tiene la base tomada para escribir
+                t0 = time.perf_counter_ns()
+                self._con.execute('BEGIN IMMEDIATE')
+                negocio._metricas.llamada('espera_bloqueo', time.perf_counter_ns() - t0)
+            else:
+                self._con.execute('BEGIN IMMEDIATE')
+            try:
+                res = fn(self._con)
+                self._con.execute('COMMIT')
+            except BaseException:
+                self._tras_commit = []
+                if self._con.in_transaction:
+                    self._con.execute('ROLLBACK')
+                raise
+            # el índice de búsqueda sólo refleja lo que quedó confirmado
+            pendientes, self._tras_commit = self._tras_commit, []
+            for cambio in pendientes:
+                cambio()
+            return res
+
+    def _indexar(self, producto):
+        """Alta o cambio en el índice de búsqueda, al confirmar la transacción en curso."""
+        self._tras_commit.append(lambda: self._indice.agregar(producto))
+
+    def _desindexar(self, id_producto):
+        self._tras_commit.append(lambda: self._indice.quitar(id_producto))
+
+    def _indice_al_dia(self):
+        """Rehace el índice si otra conexión (otra terminal) confirmó cambios desde que se armó."""
+        version = self._con.execute('PRAGMA data_version').fetchone()[0]
+        if version != self._indice_version:
+            self._indice.reconstruir(self.listar_productos())
+            self._indice_version = version
+
+    # Productos
+    def listar_productos(self):
+        with self._lock:
+            filas = self._con.execute(f'SELECT {_COLUMNAS_PRODUCTO} FROM productos ORDER BY id').fetchall()
+        return [dict(r) for r in filas]
+
+    def _obtener(self, con, id_producto):
+        r = con.execute(f'SELECT {_COLUMNAS_PRODUCTO} FROM productos WHERE id = ?', (id_producto,)).fetchone()
+        return dict(r) if r is not None else None
+
+    def obtener_producto(self, id_producto):
+        with self._lock:
+            return self._obtener(self._con, id_producto)
+
+    def buscar_productos(self, consulta, limite):
+        with self._lock:
+            self._indice_al_dia()
+            ids = self._indice.buscar(consulta, limite)
+            return [p for p in (self._obtener(self._con, pid) for pid in ids) if p is not None]
+
+    def agregar_producto(self, producto):
+        def alta(con):
+            cur = con.execute('INSERT INTO productos (nombre, categoria, precio_unitario, stock, unidad) '
+                              'VALUES (:nombre, :categoria, :precio_unitario, :stock, :unidad)', producto)
+            self._indexar(dict(producto, id=cur.lastrowid))
+            return True
+        return self._transaccion(alta)
+
+    def actualizar_producto(self, id_producto, cambios, version=None):
+        asignaciones = ''.join(f'{k} = :{k}, ' for k in cambios)
+        condicion = '' if version is None else ' AND version = :version'
+        def cambio(con):
+            cur = con.execute(f'UPDATE productos SET {asignaciones}version = version + 1 WHERE id = :id{condicion}',
+                              dict(cambios, id=id_producto, version=version))
+            if cur.rowcount == 0:
+                actual = self._obtener(con, id_producto)
+                if actual is not None and version is not None:
+                    return negocio._conflicto(id_producto, actual['version'], version)
+                return False
+            if 'nombre' in cambios or 'categoria' in cambios:
+                self._indexar(self._obtener(con, id_producto))
+            return True
+        return self._transaccion(cambio)
+
+    def eliminar_producto(self, id_producto):
+        def baja(con):
+            if con.execute('DELETE FROM productos WHERE id = ?', (id_producto,)).rowcount == 0:
+                return False
+            self._desindexar(id_producto)
+            return True
+        return self._transaccion(baja)
+
+    # Ventas
+    def iter_ventas(self, lo=None, hi=None, id_producto=None):
+        where, params = _filtro(lo, hi, id_producto, desde_id=True)
+        # por tandas de id: el lock no queda tomado mientras quien llama procesa las filas
+        ultimo = 0
+        while True:
+            with self._lock:
+                filas = self._con.execute(
+                    f'SELECT {_COLUMNAS_VENTA} FROM ventas {where} ORDER BY id_venta LIMIT {_TANDA}',
+                    params + [ultimo]).fetchall()
+            if not filas:
+                return
+            for r in filas:
+                yield dict(r)
+            ultimo = filas[-1]['id_venta']
+
+    def ultimas_ventas(self, n):
+        with self._lock:
+            filas = self._con.execute(f'SELECT {_COLUMNAS_VENTA} FROM ventas ORDER BY id_venta DESC LIMIT ?',
+                                      (n,)).fetchall()
+        return [dict(r) for r in filas]
+
+    def listar_ventas(self):
+        with self._lock:
+            filas = self._con.execute(f'SELECT {_COLUMNAS_VENTA} FROM ventas ORDER BY id_venta').fetchall()
+        return [dict(r) for r in filas]
+
+    def registrar_lineas(self, lineas, forma_pago, fecha):
+        ts = negocio._timestamp(fecha)
+        def venta(con):
+            items, prods, error = negocio._preparar_lineas(lineas, lambda pid: self._obtener(con, pid))
+            if error:
+                return {'ok': False, 'mensaje': error}
+            ids = []
+            for it in items:
+                cur = con.execute('INSERT INTO ventas (fecha, ts, id_producto, cantidad, precio_unitario_venta, forma_pago) '
+                                  'VALUES (?, ?, ?, ?, ?, ?)',
+                                  (fecha, ts, it['id_producto'], it['cantidad'], it['precio_unitario'], str(forma_pago or '')))
+                ids.append(cur.lastrowid)
+            con.executemany('UPDATE productos SET stock = ?, version = version + 1 WHERE id = ?',
+                            [(p['stock'], pid) for pid, p in prods.items()])
+            return {'ok': True, 'mensaje': '', 'ids': ids, 'total': negocio.calcular_total_venta(items)}
+        return self._transaccion(venta)
+
+    def aplicar_operaciones(self, operaciones):
+        def aplicar(con):
+            plan, error, conflicto = negocio._resolver_operaciones(operaciones, lambda pid: self._obtener(con, pid))
+            if error:
+                return {'ok': False, 'mensaje': error, 'conflicto': conflicto}
+            con.executemany('UPDATE productos SET nombre = :nombre, categoria = :categoria, '
+                            'precio_unitario = :precio_unitario, stock = :stock, unidad = :unidad, '
+                            'version = version + 1 WHERE id = :id', list(plan['cambiados'].values()))
+            if plan['eliminados']:
+                con.executemany('DELETE FROM productos WHERE id = ?', [(pid,) for pid in plan['eliminados']])
+            ids_productos = []
+            for p in plan['altas']:
+                # id NULL = lo asigna AUTOINCREMENT; uno explícito también adelanta sqlite_sequence
+                cur = con.execute('INSERT INTO productos (id, nombre, categoria, precio_unitario, stock, unidad) '
+                                  'VALUES (:id, :nombre, :categoria, :precio_unitario, :stock, :unidad)',
+                                  dict(p, id=p.get('id')))
+                ids_productos.append(cur.lastrowid)
+            ids_ventas, total = [], 0.0
+            for items, forma_pago, fecha in plan['tickets']:
+                ts = negocio._timestamp(fecha)
+                for it in items:
+                    cur = con.execute('INSERT INTO ventas (fecha, ts, id_producto, cantidad, precio_unitario_venta, forma_pago) '
+                                      'VALUES (?, ?, ?, ?, ?, ?)',
+                                      (fecha, ts, it['id_producto'], it['cantidad'], it['precio_unitario'], str(forma_pago or '')))
+                    ids_ventas.append(cur.lastrowid)
+                total += negocio.calcular_total_venta(items)
+            for pid in plan['eliminados']:
+                self._desindexar(pid)
+            for p in plan['cambiados'].values():
+                self._indexar(p)
+            for pid, p in zip(ids_productos, plan['altas']):
+                self._indexar(dict(p, id=pid))
+            return {'ok': True, 'mensaje': '', 'conflicto': False, 'ids_productos': ids_productos,
+                    'ids_ventas': ids_ventas, 'total': round(total, 2)}
+        return self._transaccion(aplicar)
+
+    def reporte(self, lo=None, hi=None):
+        where, params = _filtro(lo, hi)
+        with self._lock:
+            filas = self._con.execute(
+                f'SELECT id_producto, SUM(cantidad), SUM(cantidad * precio_unitario_venta) '
+                f'FROM ventas {where} GROUP BY id_producto', params).fetchall()
+        total = sum(r[2] for r in filas)
+        return total, {r[0]: r[1] for r in filas}
+
+    def mas_vendidos(self, top_n):
+        with self._lock:
+            filas = self._con.execute(
+                'SELECT id_producto, SUM(cantidad) AS unidades FROM ventas GROUP BY id_producto '
+                'ORDER BY unidades DESC, id_producto LIMIT ?', (int(top_n),)).fetchall()
+        return [(r[0], r[1]) for r in filas]
+
+    def reemplazar_todo(self, productos, ventas):
+        def reemplazo(con):
+            con.execute('DELETE FROM ventas')
+            con.execute('DELETE FROM productos')
+            con.executemany(f'INSERT INTO productos ({_COLUMNAS_PRODUCTO}) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                            [tuple(p[k] for k in negocio.PRODUCTOS_FIELDS) for p in productos])
+            con.executemany('INSERT INTO ventas (id_venta, fecha, ts, id_producto, cantidad, precio_unitario_venta, forma_pago) '
+                            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                            [(v['id_venta'], v['fecha'], negocio._timestamp(v['fecha']), v['id_producto'],
+                              v['cantidad'], v['precio_unitario_venta'], v['forma_pago']) for v in ventas])
+            # los ids nuevos siguen después de los copiados, sin reutilizar los de productos borrados
+            con.execute('DELETE FROM sqlite_sequence WHERE name IN (?, ?)', ('productos', 'ventas'))
+            con.executemany('INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)', [
+                ('productos', max([p['id'] for p in productos], default=0)),
+                ('ventas', max([v['id_venta'] for v in ventas], default=0))])
+            self._tras_commit.append(lambda: self._indice.reconstruir(productos))
+            return True
+        return self._transaccion(reemplazo)
+
+    def firma_datos(self):
+        # data_version cambia cuando otra conexión confirma una transacción (las propias las
+        # cuenta la generación del caché de consultas)
+        with self._lock:
+            return self._con.execute('PRAGMA data_version').fetchone()[0]
+
+    def sincronizar(self, forzar=True):
+        # cada operación ya quedó confirmada en su transacción
+        return True
+
+    def cerrar(self):
+        with self._lock:
+            try:
+                self._con.close()
+            except sqlite3.Error as e:
+                print(f"[negocio] ERROR al cerrar {self.filepath}: {e}")
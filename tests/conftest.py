@@ -0,0 +1,151 @@
+"""
+Utilidades de las pruebas: cada prueba trabaja sobre una carpeta data/ temporal y corre
+negocio.py en procesos aparte (negocio resuelve data/ desde el directorio actual y guarda
+catálogo, journal y agregados en el módulo: un proceso por escenario los deja limpios, y
+permite simular cortes de luz y varias terminales a la vez).
+"""
+
+import csv
+import json
+import os
+import random
+import subprocess
+import sys
+import textwrap
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+MOTORES = ('csv', 'sqlite')
+# datos chicos pero con más de un año de historial (para compactar) y varios meses (particiones)
+PRODUCTOS = 40
+VENTAS = 800
+DIAS = 500
+
+_PREAMBULO = f"""\
+import json, sys
+sys.path.insert(0, {str(RAIZ)!r})
+import negocio
+resultado = None
+"""
+_MARCA = '@@resultado '
+
+
+class Carpeta:
+    """Una carpeta de datos generada y el motor con el que se abre."""
+
+    def __init__(self, directorio, motor):
+        self.directorio = Path(directorio)
+        self.motor = motor
+        self.datos = self.directorio / 'data'
+
+    def _entorno(self, extra=None):
+        entorno = {k: v for k, v in os.environ.items() if not k.startswith('NEGOCIO_')}
+        entorno['NEGOCIO_BACKEND'] = self.motor
+        entorno.update(extra or {})
+        return entorno
+
+    def _script(self, codigo):
+        return (_PREAMBULO + textwrap.dedent(codigo)
+                + f"\nprint({_MARCA!r} + json.dumps(resultado, default=str), flush=True)\n")
+
+    def lanzar(self, codigo, entorno=None):
+        """Arranca `codigo` en un proceso aparte sin esperarlo (ver resultado())."""
+        return subprocess.Popen([sys.executable, '-c', self._script(codigo)], cwd=self.directorio,
+                                env=self._entorno(entorno), stdout=subprocess.PIPE,
+                                stderr=subprocess.STDOUT, text=True)
+
+    @staticmethod
+    def resultado(proceso, timeout=120):
+        salida, _ = proceso.communicate(timeout=timeout)
+        for linea in reversed(salida.splitlines()):
+            if linea.startswith(_MARCA):
+                return json.loads(linea[len(_MARCA):])
+        raise AssertionError(f"el proceso terminó sin resultado (código {proceso.returncode}):\n{salida}")
+
+    def correr(self, codigo, entorno=None, timeout=120):
+        """
+        Ejecuta `codigo` con negocio importado y retorna lo que deje en la variable `resultado`
+        (pasado por JSON: las tuplas vuelven como listas y las claves int como str).
+        """
+        return self.resultado(self.lanzar(codigo, entorno), timeout)
+
+    def salir_sin_cerrar(self, codigo, entorno=None, timeout=120):
+        """Ejecuta `codigo` y corta el proceso con os._exit: sin checkpoint ni atexit (un apagón)."""
+        proceso = subprocess.run([sys.executable, '-c', _PREAMBULO + textwrap.dedent(codigo)
+                                  + "\nimport os\nos._exit(0)\n"],
+                                 cwd=self.directorio, env=self._entorno(entorno),
+                                 capture_output=True, text=True, timeout=timeout)
+        assert proceso.returncode == 0, proceso.stdout + proceso.stderr
+
+
+_ARTICULOS = [('TUBO PVC', 'Plomeria', 'Pieza'), ('CEMENTO GRIS', 'Materiales de construccion', 'Bulto'),
+              ('MANGUERA JARDIN', 'Jardineria', 'Metro'), ('CABLE COAXIAL', 'Electricidad', 'Metro'),
+              ('TORNILLO PIJA', 'Tornilleria y anclajes', 'Caja'), ('MARTILLO', 'Herramientas manuales', 'Pieza')]
+_MARCAS = ['TRUPER', 'PRETUL', 'URREA', 'FOSET']
+
+
+@pytest.fixture(scope='session')
+def columnas(tmp_path_factory):
+    """Encabezados de productos.csv y ventas.csv según la versión de negocio.py que se prueba."""
+    return Carpeta(tmp_path_factory.mktemp('columnas'), 'csv').correr(
+        "resultado = [negocio.PRODUCTOS_FIELDS, negocio.VENTAS_FIELDS]")
+
+
+def generar(directorio, columnas, semilla=7):
+    """data/productos.csv y data/ventas.csv sintéticos (siempre los mismos para la misma semilla)."""
+    rng = random.Random(semilla)
+    campos_productos, campos_ventas = columnas
+    datos = Path(directorio) / 'data'
+    datos.mkdir(parents=True, exist_ok=True)
+    productos = []
+    for k in range(PRODUCTOS):
+        base, categoria, unidad = rng.choice(_ARTICULOS)
+        productos.append({'id': 11001 + k, 'nombre': f'{base} {rng.choice(_MARCAS)} {k + 1}',
+                          'categoria': categoria, 'precio_unitario': f'{rng.uniform(10, 900):.2f}',
+                          'stock': rng.randint(50, 5000), 'unidad': unidad, 'version': 0})
+    fin = datetime.now().replace(microsecond=0)
+    paso = DIAS * 86400 / VENTAS
+    # pocos productos concentran la mayoría de las ventas, como en el negocio real
+    pesos = [1 / (k + 1) for k in range(PRODUCTOS)]
+    ventas = []
+    for i in range(VENTAS):
+        p = rng.choices(productos, weights=pesos)[0]
+        ventas.append({'id_venta': i + 1, 'fecha': (fin - timedelta(seconds=int((VENTAS - i) * paso))).isoformat(),
+                       'id_producto': p['id'], 'cantidad': rng.choice([1, 1, 1, 2, 3, 6, 12]),
+                       'precio_unitario_venta': p['precio_unitario'],
+                       'forma_pago': rng.choice(['Efectivo', 'Tarjeta', 'Transferencia'])})
+    for nombre, campos, filas in (('productos.csv', campos_productos, productos),
+                                  ('ventas.csv', campos_ventas, ventas)):
+        with open(datos / nombre, 'w', newline='', encoding='utf-8') as f:
+            w = csv.DictWriter(f, fieldnames=campos, extrasaction='ignore')
+            w.writeheader()
+            w.writerows(filas)
+
+
+def preparar(directorio, motor, columnas):
+    """Genera productos.csv y ventas.csv y, para SQLite, los copia a data/negocio.db."""
+    generar(directorio, columnas)
+    carpeta = Carpeta(directorio, motor)
+    if motor != 'csv':
+        res = Carpeta(directorio, 'csv').correr(f"resultado = negocio.copiar_datos('csv', {motor!r})")
+        assert res['ok'], res
+    return carpeta
+
+
+@pytest.fixture(params=MOTORES)
+def carpeta(request, tmp_path, columnas):
+    return preparar(tmp_path, request.param, columnas)
+
+
+@pytest.fixture
+def carpeta_csv(tmp_path, columnas):
+    return preparar(tmp_path, 'csv', columnas)
+
+
+@pytest.fixture
+def carpeta_sqlite(tmp_path, columnas):
+    return preparar(tmp_path, 'sqlite', columnas)
@@ -0,0 +1,40 @@
+"""La búsqueda ve lo que escriben otras terminales y nunca lo que no llegó a guardarse."""
+
+_OTRA_TERMINAL = """
+import subprocess, sys
+from pathlib import Path
+def otra_terminal(codigo):
+    raiz = str(Path(negocio.__file__).resolve().parent)
+    subprocess.run([sys.executable, '-c', f'import sys; sys.path.insert(0, {raiz!r}); import negocio; ' + codigo],
+                   check=True)
+"""
+
+
+def test_busqueda_ve_altas_de_otra_terminal(carpeta):
+    res = carpeta.correr(_OTRA_TERMINAL + """
+antes = [p['nombre'] for p in negocio.buscar_productos('acople otro', 5)]
+otra_terminal("assert negocio.agregar_producto({'nombre': 'ACOPLE OTRO', 'categoria': 'Prueba'})")
+despues = [p['nombre'] for p in negocio.buscar_productos('acople otro', 5)]
+resultado = {'antes': antes, 'despues': despues}
+""")
+    assert 'ACOPLE OTRO' not in res['antes']
+    assert 'ACOPLE OTRO' in res['despues']
+
+
+def test_transaccion_fallida_no_toca_el_indice(carpeta_sqlite):
+    res = carpeta_sqlite.correr("""
+        b = negocio._backend()
+        p = negocio.listar_productos()[0]
+        def falla(con):
+            con.execute('UPDATE productos SET nombre = ? WHERE id = ?', ('FANTASMA', p['id']))
+            b._indexar(dict(p, nombre='FANTASMA'))
+            raise RuntimeError('corte')
+        try:
+            b._transaccion(falla)
+        except RuntimeError:
+            pass
+        resultado = {'buscado': negocio.buscar_productos('fantasma', 5),
+                     'nombre': negocio.obtener_producto(p['id'])['nombre']}
+    """)
+    assert res['buscado'] == []
+    assert res['nombre'] != 'FANTASMA'
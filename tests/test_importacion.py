@@ -0,0 +1,85 @@
+"""importar_productos(): una sola escritura, filas con error informadas y sin duplicar al repetir."""
+
+LISTA = """codigo;descripcion;rubro;precio;existencia
+{id0};{nombre0};{categoria0};1.234,50;7
+99999;TORNILLO NUEVO;Fijaciones;12,30;100
+99998;ARANDELA NUEVA;Fijaciones;3,10;500
+abc;FILA MALA;Fijaciones;1;1
+99997;PRECIO MALO;Fijaciones;-5;1
+"""
+
+
+def _escribir_lista(carpeta):
+    p = carpeta.correr("resultado = negocio.listar_productos()[0]")
+    ruta = carpeta.directorio / 'proveedor.csv'
+    ruta.write_text(LISTA.format(id0=p['id'], nombre0=p['nombre'], categoria0=p['categoria']), encoding='utf-8')
+    return ruta, p
+
+
+def test_upsert_por_id_es_idempotente(carpeta):
+    ruta, p = _escribir_lista(carpeta)
+    res = carpeta.correr(f"""
+        resultado = [negocio.importar_productos({str(ruta)!r}), negocio.importar_productos({str(ruta)!r}),
+                     negocio.listar_productos()]
+    """)
+    primera, segunda, productos = res
+    assert primera['ok'] and primera['altas'] == 2 and primera['actualizados'] == 1
+    assert primera['filas_con_error'] == 2 and [e['fila'] for e in primera['errores']] == [5, 6]
+    assert segunda['ok'] and segunda['altas'] == 0 and segunda['actualizados'] == 0
+    por_id = {q['id']: q for q in productos}
+    assert por_id[99999]['nombre'] == 'TORNILLO NUEVO' and por_id[99998]['precio_unitario'] == 3.1
+    assert [q['nombre'] for q in productos].count('TORNILLO NUEVO') == 1
+    assert por_id[p['id']]['precio_unitario'] == 1234.5 and por_id[p['id']]['stock'] == 7
+    # los ids automáticos siguen después de los importados
+    nuevo = carpeta.correr("""
+        assert negocio.agregar_producto({'nombre': 'DESPUES'})
+        resultado = [q['id'] for q in negocio.listar_productos() if q['nombre'] == 'DESPUES']
+    """)
+    assert nuevo[0] > 99999
+
+
+def test_replace_repetido_no_duplica(carpeta):
+    ruta, _ = _escribir_lista(carpeta)
+    res = carpeta.correr(f"""
+        resultado = [negocio.importar_productos({str(ruta)!r}, 'replace'),
+                     negocio.importar_productos({str(ruta)!r}, 'replace'),
+                     sorted(q['id'] for q in negocio.listar_productos())]
+    """)
+    primera, segunda, ids = res
+    assert primera['ok'] and primera['eliminados'] > 0
+    assert segunda['ok'] and (segunda['altas'], segunda['actualizados'], segunda['eliminados']) == (0, 0, 0)
+    assert len(ids) == 3 and ids[1:] == [99998, 99999]
+
+
+def test_sin_categoria_la_clave_es_el_nombre(carpeta):
+    ruta = carpeta.directorio / 'sin_categoria.csv'
+    ruta.write_text("nombre;precio\nTUERCA SIN RUBRO;1.234\nGRAPA SIN RUBRO;2,50\n;9\n", encoding='utf-8')
+    res = carpeta.correr(f"""
+        resultado = [negocio.importar_productos({str(ruta)!r}), negocio.importar_productos({str(ruta)!r}),
+                     negocio.listar_productos()]
+    """)
+    primera, segunda, productos = res
+    assert primera['ok'] and primera['altas'] == 2
+    assert [e['fila'] for e in primera['errores']] == [4]
+    assert segunda['ok'] and (segunda['altas'], segunda['actualizados']) == (0, 0)
+    por_nombre = {q['nombre']: q for q in productos}
+    assert [q['nombre'] for q in productos].count('TUERCA SIN RUBRO') == 1
+    # con coma decimal, un punto seguido de tres cifras es separador de miles
+    assert por_nombre['TUERCA SIN RUBRO']['precio_unitario'] == 1234
+    assert por_nombre['GRAPA SIN RUBRO']['precio_unitario'] == 2.5
+
+
+def test_numeros_ambiguos_y_stock_con_decimales_son_errores(carpeta_csv):
+    ruta = carpeta_csv.directorio / 'ambiguos.csv'
+    ruta.write_text("nombre;precio;existencia\nBIEN;10,50;3\nPRECIO RARO;1.5;3\nSTOCK PARTIDO;4,00;2,5\n",
+                    encoding='utf-8')
+    res = carpeta_csv.correr(f"""
+        resultado = [negocio.importar_productos({str(ruta)!r}),
+                     sorted(q['nombre'] for q in negocio.listar_productos() if q['stock'] == 3)]
+    """)
+    importacion, nombres = res
+    assert importacion['ok'] and importacion['altas'] == 1
+    assert [e['fila'] for e in importacion['errores']] == [3, 4]
+    assert 'precio_unitario' in importacion['errores'][0]['motivo']
+    assert 'stock' in importacion['errores'][1]['motivo']
+    assert 'BIEN' in nombres
@@ -0,0 +1,53 @@
+"""Recuperación tras un corte: lo confirmado sobrevive aunque el proceso muera sin cerrar."""
+
+
+def test_venta_sobrevive_a_un_corte(carpeta):
+    antes = carpeta.correr("""
+        p = negocio.listar_productos()[0]
+        resultado = {'id': p['id'], 'stock': p['stock'], 'ventas': len(negocio.listar_ventas())}
+    """)
+    # el proceso muere justo después de confirmar: sin checkpoint ni cierre ordenado
+    carpeta.salir_sin_cerrar(f"""
+        res = negocio.registrar_venta({{'id_producto': {antes['id']}, 'cantidad': 3}})
+        assert res['ok'], res
+    """)
+    if carpeta.motor == 'csv':
+        # la venta quedó sólo en el journal: ventas.csv todavía no la tiene
+        assert (carpeta.datos / 'negocio.journal').stat().st_size > 0
+        filas = (carpeta.datos / 'ventas.csv').read_text(encoding='utf-8').splitlines()
+        assert len(filas) == antes['ventas'] + 1
+    despues = carpeta.correr(f"""
+        resultado = {{'stock': negocio.obtener_producto({antes['id']})['stock'],
+                     'ultima': max(negocio.listar_ventas(), key=lambda v: v['id_venta']),
+                     'ventas': len(negocio.listar_ventas()), 'sincronizado': negocio.sincronizar()}}
+    """)
+    assert despues['stock'] == antes['stock'] - 3
+    assert despues['ultima']['id_producto'] == antes['id'] and despues['ultima']['cantidad'] == 3
+    assert despues['ventas'] == antes['ventas'] + 1
+    assert despues['sincronizado']
+    if carpeta.motor == 'csv':
+        filas = (carpeta.datos / 'ventas.csv').read_text(encoding='utf-8').splitlines()
+        assert len(filas) == antes['ventas'] + 2  # cabecera + la venta recuperada
+
+
+def test_entrada_cortada_del_journal_se_ignora(carpeta_csv):
+    antes = carpeta_csv.correr("""
+        p = negocio.listar_productos()[0]
+        resultado = {'id': p['id'], 'stock': p['stock'], 'ventas': len(negocio.listar_ventas())}
+    """)
+    carpeta_csv.salir_sin_cerrar(f"""
+        assert negocio.registrar_venta({{'id_producto': {antes['id']}, 'cantidad': 1}})['ok']
+    """)
+    # un corte a mitad de la escritura deja la última línea del journal incompleta
+    with open(carpeta_csv.datos / 'negocio.journal', 'ab') as f:
+        f.write(b'{"ventas": [{"id_venta": 999999, "fecha": "2026-01-01T00:00:00", "id_pro')
+    despues = carpeta_csv.correr(f"""
+        assert negocio.registrar_venta({{'id_producto': {antes['id']}, 'cantidad': 1}})['ok']
+        negocio.sincronizar()
+        resultado = {{'stock': negocio.obtener_producto({antes['id']})['stock'],
+                     'ids': [v['id_venta'] for v in negocio.listar_ventas()]}}
+    """)
+    assert despues['stock'] == antes['stock'] - 2
+    assert len(despues['ids']) == antes['ventas'] + 2
+    assert 999999 not in despues['ids']
+    assert len(set(despues['ids'])) == len(despues['ids'])
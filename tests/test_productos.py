@@ -0,0 +1,18 @@
+"""Catálogo en memoria con escritura inmediata a productos.csv."""
+
+
+def test_catalogo_en_cp1252_se_guarda_en_cp1252(carpeta_csv):
+    ruta = carpeta_csv.datos / 'productos.csv'
+    # como lo deja Excel en Windows: cp1252, con acentos y eñes
+    encabezado, primera, resto = ruta.read_text(encoding='utf-8').split('\n', 2)
+    id_, nombre, resto_fila = primera.split(',', 2)
+    texto = '\n'.join([encabezado, f'{id_},CAÑERÍA DE COBRE,{resto_fila}', resto])
+    ruta.write_bytes(texto.encode('cp1252'))
+    res = carpeta_csv.correr("""
+        assert negocio.agregar_producto({'nombre': 'PIÑÓN ÚNICO', 'categoria': 'Prueba',
+                                         'precio_unitario': 1, 'stock': 1})
+        resultado = sorted(p['nombre'] for p in negocio.listar_productos() if 'Ñ' in p['nombre'])
+    """)
+    assert len(res) == 2 and 'PIÑÓN ÚNICO' in res
+    guardado = ruta.read_bytes().decode('cp1252')
+    assert 'PIÑÓN ÚNICO' in guardado and guardado.count('CAÑERÍA') == 1
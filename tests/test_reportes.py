@@ -0,0 +1,98 @@
+"""
+Los reportes y el top de productos coinciden con el historial de ventas y dan lo mismo después
+de migrar a particiones, compactar o cambiar de motor.
+"""
+
+import pytest
+
+_REPORTES = """
+    from datetime import date, timedelta
+    hoy = max(v['fecha'] for v in negocio.listar_ventas())[:10]
+    desde = (date.fromisoformat(hoy) - timedelta(days=90)).isoformat()
+    todos = len(negocio.listar_productos())
+    resultado = {
+        'total': negocio.generar_reporte_ventas(),
+        'rango': negocio.generar_reporte_ventas(desde, hoy),
+        'top': dict(negocio.productos_mas_vendidos(todos)),
+        'top_rango': dict(negocio.productos_mas_vendidos(todos, desde, hoy)),
+    }
+"""
+
+
+def _iguales(a, b):
+    for clave in ('total', 'rango'):
+        assert a[clave]['total_ventas'] == pytest.approx(b[clave]['total_ventas'], abs=0.01)
+        assert a[clave]['por_producto'] == b[clave]['por_producto']
+    assert a['top'] == b['top']
+    assert a['top_rango'] == b['top_rango']
+
+
+def test_agregados_coinciden_con_el_historial(carpeta):
+    res = carpeta.correr("""
+        conteo = {}
+        for v in negocio.listar_ventas():
+            conteo[v['id_producto']] = conteo.get(v['id_producto'], 0) + v['cantidad']
+        resultado = {'conteo': conteo, 'reporte': negocio.generar_reporte_ventas()['por_producto'],
+                     'top': negocio.productos_mas_vendidos('5')}
+    """)
+    assert res['reporte'] == res['conteo']
+    assert [unidades for _, unidades in res['top']] == sorted(res['conteo'].values(), reverse=True)[:5]
+
+
+def test_rango_coincide_con_el_historial(carpeta):
+    res = carpeta.correr("""
+        from datetime import date, timedelta
+        hoy = date.fromisoformat(max(v['fecha'] for v in negocio.listar_ventas())[:10])
+        desde = hoy - timedelta(days=90)
+        conteo = {}
+        for v in negocio.listar_ventas():
+            if desde.isoformat() <= v['fecha'][:10] <= hoy.isoformat():
+                conteo[v['id_producto']] = conteo.get(v['id_producto'], 0) + v['cantidad']
+        resultado = {'conteo': conteo,
+                     'iso': negocio.generar_reporte_ventas(desde.isoformat(), hoy.isoformat()),
+                     'dd_mm': negocio.generar_reporte_ventas(desde.strftime('%d/%m/%Y'), hoy.strftime('%d/%m/%Y'))}
+    """)
+    assert res['conteo'] and res['iso']['por_producto'] == res['conteo']
+    assert res['dd_mm'] == res['iso']
+
+
+def test_migrar_y_compactar_no_cambian_reportes(carpeta_csv):
+    base = carpeta_csv.correr(_REPORTES)
+    assert base['total']['total_ventas'] > base['rango']['total_ventas'] > 0
+
+    res = carpeta_csv.correr("resultado = negocio.migrar_ventas_a_particiones()")
+    assert res['ok'], res
+    assert any((carpeta_csv.datos / 'ventas').glob('*.csv'))
+    _iguales(carpeta_csv.correr(_REPORTES), base)
+
+    res = carpeta_csv.correr("resultado = negocio.compactar_ventas()")
+    assert res['ok'] and res['archivadas'] > 0, res
+    _iguales(carpeta_csv.correr(_REPORTES), base)
+
+
+def test_copiar_a_sqlite_no_cambia_reportes(carpeta_csv):
+    base = carpeta_csv.correr(_REPORTES)
+    sqlite = type(carpeta_csv)(carpeta_csv.directorio, 'sqlite')
+    res = sqlite.correr("resultado = negocio.copiar_datos('csv', 'sqlite')")
+    assert res['ok'], res
+    _iguales(sqlite.correr(_REPORTES), base)
+
+
+_TOP_COMPLETO = "resultado = negocio.productos_mas_vendidos(len(negocio.listar_productos()))"
+
+
+def test_top_con_empates_en_orden_fijo(carpeta):
+    if carpeta.motor == 'sqlite':
+        _orden_fijo(carpeta.correr(_TOP_COMPLETO))
+        return
+    antes = carpeta.correr(_TOP_COMPLETO)
+    _orden_fijo(antes)
+    assert carpeta.correr("resultado = negocio.compactar_ventas()")['archivadas'] > 0
+    despues = carpeta.correr(_TOP_COMPLETO)
+    assert despues == antes
+
+
+def _orden_fijo(top):
+    # más unidades primero y, a igual cantidad, el id menor: hay empates en los datos de prueba
+    assert len({unidades for _, unidades in top}) < len(top)
+    assert top == sorted(top, key=lambda x: (-x[1], x[0]))
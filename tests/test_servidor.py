@@ -0,0 +1,43 @@
+"""negocio_servidor: negocio.py corre fuera del bucle de eventos y las escrituras van en orden."""
+
+
+def test_una_escritura_lenta_no_frena_al_resto(carpeta):
+    res = carpeta.correr("""
+        import asyncio, threading, time
+        import negocio_cliente, negocio_servidor
+
+        registrar = negocio.registrar_venta
+        def registrar_lento(*args, **kwargs):
+            time.sleep(1)  # un disco lento o un lote grande
+            return registrar(*args, **kwargs)
+        negocio.registrar_venta = registrar_lento
+
+        def cajas(destino):
+            # los clientes corren en otros hilos: el reloj no depende del bucle del servidor
+            p = negocio_cliente.Cliente(destino).listar_productos()[0]
+            venta = {}
+            caja = threading.Thread(target=lambda: venta.update(negocio_cliente.Cliente(destino).registrar_venta(
+                {'id_producto': p['id'], 'cantidad': 1})))
+            caja.start()
+            time.sleep(0.2)
+            inicio = time.perf_counter()
+            try:
+                negocio_cliente.Cliente(destino).llamar('no_existe')
+            except negocio_cliente.ErrorServidor:
+                pass
+            demora = time.perf_counter() - inicio
+            caja.join()
+            return {'demora': demora, 'venta': venta}
+
+        async def principal():
+            servidor = negocio_servidor.Servidor(puerto=0)
+            await servidor.iniciar()
+            try:
+                return await asyncio.to_thread(cajas, f'127.0.0.1:{servidor.puerto}')
+            finally:
+                await servidor.detener()
+
+        resultado = asyncio.run(principal())
+    """)
+    assert res['venta']['ok'], res
+    assert res['demora'] < 0.5, res
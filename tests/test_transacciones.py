@@ -0,0 +1,107 @@
+"""negocio.transaccion(): todo o nada, con validación conjunta y en orden."""
+
+
+def _foto(carpeta):
+    return carpeta.correr("""
+        resultado = {'productos': negocio.listar_productos(), 'ventas': len(negocio.listar_ventas())}
+    """)
+
+
+def test_excepcion_no_guarda_nada(carpeta):
+    antes = _foto(carpeta)
+    res = carpeta.correr("""
+        p = negocio.listar_productos()[0]
+        try:
+            with negocio.transaccion() as tx:
+                tx.agregar_producto({'nombre': 'NO DEBE QUEDAR', 'precio_unitario': 1, 'stock': 1})
+                tx.actualizar_producto(p['id'], {'precio_unitario': 1.0})
+                tx.registrar_venta({'id_producto': p['id'], 'cantidad': 1})
+                raise RuntimeError('corte')
+        except RuntimeError:
+            pass
+        resultado = tx.resultado
+    """)
+    assert res is None
+    assert _foto(carpeta) == antes
+
+
+def test_validacion_conjunta(carpeta):
+    antes = _foto(carpeta)
+    res = carpeta.correr("""
+        p = negocio.listar_productos()[0]
+        with negocio.transaccion() as tx:
+            tx.agregar_producto({'nombre': 'NO DEBE QUEDAR', 'precio_unitario': 1, 'stock': 1})
+            tx.actualizar_producto(p['id'], {'stock': 3})
+            tx.registrar_venta({'id_producto': p['id'], 'cantidad': 2})
+            # cada venta ve el stock que dejó la anterior: quedan 1, no alcanza
+            tx.registrar_venta({'id_producto': p['id'], 'cantidad': 2})
+        resultado = tx.resultado
+    """)
+    assert not res['ok'] and 'Stock insuficiente' in res['mensaje']
+    assert _foto(carpeta) == antes
+
+
+def test_confirma_todo_junto(carpeta):
+    antes = _foto(carpeta)
+    p0, p1 = antes['productos'][0], antes['productos'][1]
+    res = carpeta.correr(f"""
+        with negocio.transaccion() as tx:
+            tx.agregar_producto({{'nombre': 'ALTA UNO', 'categoria': 'Prueba', 'precio_unitario': 10, 'stock': 5}})
+            tx.agregar_producto({{'nombre': 'ALTA DOS', 'categoria': 'Prueba', 'precio_unitario': 20, 'stock': 5}})
+            tx.actualizar_producto({p0['id']}, {{'stock': 10}}, version={p0['version']})
+            tx.registrar_venta_lote([{{'id_producto': {p0['id']}, 'cantidad': 4}}], 'efectivo')
+            tx.eliminar_producto({p1['id']})
+        negocio.sincronizar()
+        resultado = tx.resultado
+    """)
+    assert res['ok'], res
+    assert len(res['ids_productos']) == 2 and len(res['ids_ventas']) == 1
+    despues = carpeta.correr(f"""
+        resultado = {{'p0': negocio.obtener_producto({p0['id']}), 'p1': negocio.obtener_producto({p1['id']}),
+                     'altas': [negocio.obtener_producto(i)['nombre'] for i in {res['ids_productos']}],
+                     'buscadas': [p['nombre'] for p in negocio.buscar_productos('alta uno', 5)],
+                     'ventas': len(negocio.listar_ventas())}}
+    """)
+    assert despues['p0']['stock'] == 6
+    assert despues['p1'] is None
+    assert despues['altas'] == ['ALTA UNO', 'ALTA DOS']
+    assert 'ALTA UNO' in despues['buscadas']
+    assert despues['ventas'] == antes['ventas'] + 1
+
+
+def test_version_vieja_es_conflicto(carpeta):
+    p = carpeta.correr("resultado = negocio.listar_productos()[0]")
+    carpeta.correr(f"assert negocio.actualizar_producto({p['id']}, {{'precio_unitario': 1.5}})")
+    res = carpeta.correr(f"""
+        with negocio.transaccion() as tx:
+            tx.actualizar_producto({p['id']}, {{'precio_unitario': 2.5}}, version={p['version']})
+        resultado = tx.resultado
+    """)
+    assert not res['ok'] and res['conflicto']
+    assert carpeta.correr(f"resultado = negocio.obtener_producto({p['id']})['precio_unitario']") == 1.5
+
+
+def test_version_vieja_despues_de_una_venta_es_conflicto(carpeta):
+    p = carpeta.correr("resultado = negocio.listar_productos()[0]")
+    carpeta.correr(f"assert negocio.actualizar_producto({p['id']}, {{'precio_unitario': 1.5}})")
+    res = carpeta.correr(f"""
+        with negocio.transaccion() as tx:
+            tx.registrar_venta({{'id_producto': {p['id']}, 'cantidad': 1}})
+            tx.actualizar_producto({p['id']}, {{'precio_unitario': 2.5}}, version={p['version']})
+        resultado = tx.resultado
+    """)
+    assert not res['ok'] and res['conflicto']
+    despues = carpeta.correr(f"resultado = negocio.obtener_producto({p['id']})")
+    assert despues['precio_unitario'] == 1.5 and despues['stock'] == p['stock']
+
+
+def test_precios_por_categoria(carpeta):
+    res = carpeta.correr("""
+        categoria = negocio.listar_productos()[0]['categoria']
+        antes = {p['id']: p['precio_unitario'] for p in negocio.listar_productos() if p['categoria'] == categoria}
+        res = negocio.actualizar_precios_categoria(categoria, factor=1.1)
+        despues = {p['id']: p['precio_unitario'] for p in negocio.listar_productos() if p['categoria'] == categoria}
+        resultado = {'res': res, 'antes': antes, 'despues': despues}
+    """)
+    assert res['res']['ok'] and res['res']['actualizados'] == len(res['antes'])
+    assert res['despues'] == {pid: round(precio * 1.1, 2) for pid, precio in res['antes'].items()}
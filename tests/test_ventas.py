@@ -0,0 +1,65 @@
+"""Tickets todo o nada y stock correcto con varias terminales vendiendo a la vez."""
+
+CAJAS = 4
+VENTAS_POR_CAJA = 25
+STOCK = 40
+
+
+def _estado(carpeta, pid):
+    return carpeta.correr(f"""
+        resultado = {{'stock': negocio.obtener_producto({pid})['stock'],
+                     'vendidas': sum(v['cantidad'] for v in negocio.listar_ventas() if v['id_producto'] == {pid}),
+                     'ventas': len(negocio.listar_ventas())}}
+    """)
+
+
+def test_lote_todo_o_nada(carpeta):
+    ids = carpeta.correr("resultado = [p['id'] for p in negocio.listar_productos()[:2]]")
+    carpeta.correr(f"assert negocio.actualizar_producto({ids[1]}, {{'stock': 5}})")
+    antes = [_estado(carpeta, pid) for pid in ids]
+    res = carpeta.correr(f"""
+        resultado = [
+            # la segunda línea no tiene stock: no se guarda ninguna
+            negocio.registrar_venta_lote([{{'id_producto': {ids[0]}, 'cantidad': 1}},
+                                          {{'id_producto': {ids[1]}, 'cantidad': 6}}], 'efectivo'),
+            # la misma unidad pedida en dos líneas cuenta junta
+            negocio.registrar_venta_lote([{{'id_producto': {ids[1]}, 'cantidad': 3}},
+                                          {{'id_producto': {ids[1]}, 'cantidad': 3}}], 'efectivo'),
+            negocio.registrar_venta_lote([{{'id_producto': {ids[0]}, 'cantidad': 1}},
+                                          {{'id_producto': 987654, 'cantidad': 1}}], 'efectivo'),
+            negocio.registrar_venta_lote([{{'id_producto': {ids[0]}, 'cantidad': 0}}], 'efectivo'),
+        ]
+    """)
+    assert [r['ok'] for r in res] == [False, False, False, False]
+    assert 'Stock insuficiente' in res[0]['mensaje']
+    assert [_estado(carpeta, pid) for pid in ids] == antes
+
+    res = carpeta.correr(f"""
+        resultado = negocio.registrar_venta_lote([{{'id_producto': {ids[0]}, 'cantidad': 2}},
+                                                  {{'id_producto': {ids[1]}, 'cantidad': 5}}], 'tarjeta')
+    """)
+    assert res['ok'] and len(res['ids']) == 2
+    despues = [_estado(carpeta, pid) for pid in ids]
+    assert despues[0]['stock'] == antes[0]['stock'] - 2
+    assert despues[1]['stock'] == 0
+    assert despues[1]['ventas'] == antes[1]['ventas'] + 2
+
+
+def test_varias_cajas_no_venden_de_mas(carpeta):
+    pid = carpeta.correr("resultado = negocio.listar_productos()[3]['id']")
+    carpeta.correr(f"assert negocio.actualizar_producto({pid}, {{'stock': {STOCK}}})")
+    antes = _estado(carpeta, pid)
+    cajas = [carpeta.lanzar(f"""
+        vendidas = 0
+        for _ in range({VENTAS_POR_CAJA}):
+            if negocio.registrar_venta({{'id_producto': {pid}, 'cantidad': 1, 'forma_pago': 'efectivo'}})['ok']:
+                vendidas += 1
+        negocio.sincronizar()
+        resultado = vendidas
+    """) for _ in range(CAJAS)]
+    vendidas = sum(carpeta.resultado(caja) for caja in cajas)
+    despues = _estado(carpeta, pid)
+    assert vendidas == STOCK  # CAJAS * VENTAS_POR_CAJA > STOCK: se agota justo
+    assert despues['stock'] == 0
+    assert despues['vendidas'] == antes['vendidas'] + STOCK
+    assert despues['ventas'] == antes['ventas'] + STOCK